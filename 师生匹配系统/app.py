@@ -2,8 +2,22 @@ import streamlit as st
 from datetime import datetime, date, time
 import pandas as pd
 import numpy as np
-from collections import defaultdict
 import hashlib
+import os
+
+from batch import SCHEDULE_WEIGHT, audit_project, match_all_projects, solve_project
+from cache import MatchCache
+from incremental import IncrementalMatcher
+from loaders import detect_format, load_profiles, validate_chunk
+from metrics import NULL_METRICS, Metrics
+from profile_store import APP_MENTOR_SCHEMA, APP_STUDENT_SCHEMA, ProfileStore, ProfileView, profile_fingerprint
+from schedule import DAYS, availability_mask, format_slots, shared_hours, to_words, week_mask
+from scoring import InterestScoreMatrix, InterestVocabulary, common_codes, skill_eligibility
+from semantic import SentenceEmbedder, TagEmbeddingCache, similar_pairs, soft_overlap
+from solvers import blocking_pairs, hospitals_residents, matching_welfare
+from storage import SQLiteStorage
+
+SKILLS = ('math', 'programming', 'english')
 
 
 # 密码验证函数 - 简化版本
@@ -32,75 +46,452 @@ def simple_password_check():
 
 
 class MatchingSystem:
-    def __init__(self, method='hybrid'):
-        self.students = {}
-        self.mentors = {}
+    def __init__(self, method='hybrid', incremental=False, storage=None, similarity='exact', embeddings=None,
+                 similarity_threshold=0.75, metrics=None, audit=False):
         self.method = method
+        # 性能指标（metrics.Metrics），默认关闭；侧边栏勾选后开始记录
+        self.metrics = metrics if metrics is not None else NULL_METRICS
+        # 匹配后检查稳定性（见 solvers.blocking_pairs），最近一次 finalize_matches 的阻塞对保存在 last_audit
+        self.audit = audit
+        self.last_audit = None
+        # 画像按列存储：技能/要求为数值列，兴趣/研究领域统一编号后保存升序编号数组
+        self.vocabulary = InterestVocabulary()
+        self.student_store = ProfileStore(APP_STUDENT_SCHEMA, self.vocabulary)
+        self.mentor_store = ProfileStore(APP_MENTOR_SCHEMA, self.vocabulary)
+        self.students = ProfileView(self.student_store, self.add_student, self.remove_student)
+        self.mentors = ProfileView(self.mentor_store, self.add_mentor, self.remove_mentor)
+        # 项目 -> 成员id 的索引，匹配时不必扫描全部画像
+        self.project_index = {'student': {}, 'mentor': {}}
+        # 增量模式：每个项目维护一份当前稳定匹配，画像变化时只更新受影响的部分；
+        # 项目的匹配器在第一次需要时由全部成员建立，之后随画像变化更新
+        self.incremental = {} if incremental else None
+        # 可选的持久化存储（如 storage.SQLiteStorage），画像变化时同步写入
+        self.storage = storage
+        self.loaded_projects = set()
+        # 跨 Streamlit 重跑保留的匹配计算缓存
+        self.match_cache = MatchCache()
+        # 兴趣匹配方式：'exact' 按标签完全相同计数，'fuzzy' 按标签向量的相似度计分（见 semantic.soft_overlap）
+        self.similarity = similarity
+        self.similarity_threshold = similarity_threshold
+        self.embeddings = embeddings if embeddings is not None else TagEmbeddingCache()
+
+    def set_similarity(self, similarity):
+        """切换兴趣匹配方式，缓存的分数矩阵随之作废"""
+        if similarity not in ('exact', 'fuzzy'):
+            raise ValueError(f"未知的兴趣匹配方式: {similarity}")
+        if similarity != self.similarity:
+            self.similarity = similarity
+            self.match_cache.clear()
+            # 增量匹配器保存的偏好按旧的打分方式计算，全部作废，下次需要时重建
+            if self.incremental is not None:
+                self.incremental = {}
+
+    def set_incremental(self, enabled):
+        """开启或关闭增量模式；关闭时丢弃已建立的匹配器"""
+        if enabled and self.incremental is None:
+            self.incremental = {}
+        elif not enabled:
+            self.incremental = None
+
+    def tag_vectors(self, codes):
+        """兴趣标签编号对应的向量，已向量化过的标签直接取缓存"""
+        return self.embeddings.vectors_for(self.vocabulary.decode(codes))
+
+    def _put(self, role, person_id, profile, fingerprint=None):
+        """只更新内存中的画像和索引，不写入持久化存储"""
+        store = self.student_store if role == 'student' else self.mentor_store
+        self._detach_incremental(role, person_id, profile)
+        self._untrack(role, person_id)
+        store.upsert(person_id, profile, fingerprint)
+        project = profile['other_info']['project']
+        self.project_index[role].setdefault(project, {})[person_id] = None
+        matcher = self.incremental.get(project) if self.incremental is not None else None
+        if matcher is not None:
+            if role == 'student':
+                matcher.add_student(person_id)
+            else:
+                matcher.add_mentor(person_id, profile['other_info']['max_students'])
+
+    def _untrack(self, role, person_id):
+        store = self.student_store if role == 'student' else self.mentor_store
+        if person_id in store:
+            project = store.object_of('other_info', person_id)['project']
+            self.project_index[role][project].pop(person_id, None)
 
     def add_student(self, student_id, profile):
-        self.students[student_id] = profile
+        self._put('student', student_id, profile)
+        if self.storage is not None:
+            self.storage.save_students([(student_id, profile)])
 
     def add_mentor(self, mentor_id, profile):
-        self.mentors[mentor_id] = profile
+        self._put('mentor', mentor_id, profile)
+        if self.storage is not None:
+            self.storage.save_mentors([(mentor_id, profile)])
+
+    def add_students(self, items):
+        """批量添加学生 [(学生id, 画像)]，持久化时整批写入"""
+        for student_id, profile in items:
+            self._put('student', student_id, profile)
+        if self.storage is not None:
+            self.storage.save_students(items)
+
+    def add_mentors(self, items):
+        """批量添加导师 [(导师id, 画像)]，持久化时整批写入"""
+        for mentor_id, profile in items:
+            self._put('mentor', mentor_id, profile)
+        if self.storage is not None:
+            self.storage.save_mentors(items)
+
+    def _changed(self, role, items):
+        """筛出内容与已保存画像不同的 [(id, 画像, 指纹)]"""
+        store = self.student_store if role == 'student' else self.mentor_store
+        changed = []
+        for person_id, profile in items:
+            fingerprint = profile_fingerprint(profile)
+            if store.fingerprint_of(person_id) != fingerprint:
+                changed.append((person_id, profile, fingerprint))
+        return changed
+
+    def upsert_student(self, student_id, profile):
+        """画像与已保存的相同时什么也不做；返回是否有新增或修改"""
+        return self.upsert_students([(student_id, profile)]) > 0
+
+    def upsert_mentor(self, mentor_id, profile):
+        """画像与已保存的相同时什么也不做；返回是否有新增或修改"""
+        return self.upsert_mentors([(mentor_id, profile)]) > 0
+
+    def upsert_students(self, items):
+        """批量新增或更新学生，跳过内容未变的画像，返回实际变化的数量"""
+        changed = self._changed('student', items)
+        for student_id, profile, fingerprint in changed:
+            self._put('student', student_id, profile, fingerprint)
+        if self.storage is not None and changed:
+            self.storage.save_students([(student_id, profile) for student_id, profile, _ in changed])
+        return len(changed)
+
+    def upsert_mentors(self, items):
+        """批量新增或更新导师，跳过内容未变的画像，返回实际变化的数量"""
+        changed = self._changed('mentor', items)
+        for mentor_id, profile, fingerprint in changed:
+            self._put('mentor', mentor_id, profile, fingerprint)
+        if self.storage is not None and changed:
+            self.storage.save_mentors([(mentor_id, profile) for mentor_id, profile, _ in changed])
+        return len(changed)
+
+    def remove_student(self, student_id):
+        """删除学生；增量模式下其导师的空缺由其他学生补位"""
+        self._detach_incremental('student', student_id)
+        self._untrack('student', student_id)
+        self.student_store.remove(student_id)
+        if self.storage is not None:
+            self.storage.delete_student(student_id)
+
+    def remove_mentor(self, mentor_id):
+        """删除导师；增量模式下其学生继续向下一位导师提议"""
+        self._detach_incremental('mentor', mentor_id)
+        self._untrack('mentor', mentor_id)
+        self.mentor_store.remove(mentor_id)
+        if self.storage is not None:
+            self.storage.delete_mentor(mentor_id)
+
+    def load_project(self, project_name):
+        """从持久化存储中只加载该项目的学生和导师，返回项目信息；每个项目只加载一次"""
+        if self.storage is None:
+            return None
+        if project_name not in self.loaded_projects:
+            for student_id, profile in self.storage.load_students(project_name):
+                self._put('student', student_id, profile)
+            for mentor_id, profile in self.storage.load_mentors(project_name):
+                self._put('mentor', mentor_id, profile)
+            self.loaded_projects.add(project_name)
+        return self.storage.load_project(project_name)
+
+    def save_project(self, project_info):
+        """保存项目信息，同名项目已有的学生和导师一并加载（未配置持久化存储时不做任何事）"""
+        if self.storage is not None:
+            self.storage.save_project(project_info)
+            self.load_project(project_info['name'])
+
+    def record_matches(self, project_name, matches):
+        """保存一次匹配结果到历史记录，返回批次号"""
+        if self.storage is None:
+            return None
+        return self.storage.record_matches(project_name, matches)
+
+    def _project_matcher(self, project_name):
+        """项目的增量匹配器，尚未建立时先加入全部导师、再加入全部学生"""
+        if project_name not in self.incremental:
+            matcher = IncrementalMatcher(self.pair_scores, self.pair_rows)
+            student_ids, mentor_ids = self.project_members(project_name)
+            for mentor_id, capacity in zip(mentor_ids, self.mentor_capacities(mentor_ids)):
+                matcher.add_mentor(mentor_id, capacity)
+            for student_id in student_ids:
+                matcher.add_student(student_id)
+            self.incremental[project_name] = matcher
+        return self.incremental[project_name]
+
+    def _detach_incremental(self, role, person_id, new_profile=None):
+        """增量模式下，人员被删除或换到其他项目时，先从原项目的匹配中移除"""
+        if self.incremental is None:
+            return
+        store = self.student_store if role == 'student' else self.mentor_store
+        if person_id not in store:
+            return
+        old_info = store.object_of('other_info', person_id)
+        if new_profile is not None and new_profile['other_info']['project'] == old_info['project']:
+            return
+        matcher = self.incremental.get(old_info['project'])
+        if matcher is None:
+            return
+        if role == 'student':
+            matcher.remove_student(person_id)
+        else:
+            matcher.remove_mentor(person_id)
+
+    def current_matches(self, project_name):
+        """增量模式下某个项目当前的稳定匹配 {学生: 导师}"""
+        if self.incremental is None:
+            return {}
+        return self._project_matcher(project_name).matches()
+
+    def project_members(self, project_name):
+        """某个项目的 (学生id列表, 导师id列表)，按加入顺序"""
+        students = self.project_index['student'].get(project_name, {})
+        mentors = self.project_index['mentor'].get(project_name, {})
+        return (sorted(students, key=self.student_store.row_of.__getitem__),
+                sorted(mentors, key=self.mentor_store.row_of.__getitem__))
+
+    def project_counts(self, project_name):
+        """某个项目的 (学生数, 导师数)"""
+        return (len(self.project_index['student'].get(project_name, {})),
+                len(self.project_index['mentor'].get(project_name, {})))
+
+    def pair_scores(self, student_id, mentor_id):
+        """单个学生与导师的双向分数 (学生对导师, 导师对学生)，None 表示不接受，规则与批量生成偏好时一致"""
+        return self.pair_rows([student_id], [mentor_id])[0]
+
+    def pair_rows(self, student_ids, mentor_ids):
+        """学生×导师 全部配对的双向分数 [(学生对导师, 导师对学生)]，按行展开；
+        由 pair_matrices 一次算出，增量匹配加入一人时用它计算整行/列"""
+        overlap, hours, skill_eligible = self.pair_matrices(student_ids, mentor_ids)
+        scores = (overlap + SCHEDULE_WEIGHT * hours).ravel().tolist()
+        compatible = (hours > 0).ravel().tolist()
+        wanted = (overlap > 0).ravel().tolist()
+        eligible = skill_eligible.ravel().tolist()
+        return [((score if want else None), (score if ok else None)) if fits else (None, None)
+                for score, fits, want, ok in zip(scores, compatible, wanted, eligible)]
+
+    def score_matrix(self, student_ids, mentor_ids):
+        """构建指定学生与导师之间的共同领域分数矩阵"""
+        return InterestScoreMatrix(
+            student_ids,
+            mentor_ids,
+            self.student_store.codes_for(student_ids),
+            self.mentor_store.codes_for(mentor_ids),
+            len(self.vocabulary)
+        )
 
-    def finalize_matches(self, student_ids, mentor_ids, student_prefs, mentor_prefs):
-        """执行稳定匹配算法"""
-        # 实现Gale-Shapley稳定匹配算法
-        matches = {}  # 存储最终匹配结果 {学生: 导师}
-        mentor_matches = defaultdict(list)  # 导师匹配的学生列表
-
-        # 创建导师偏好索引映射
-        mentor_pref_rankings = {}
-        for i, mentor_id in enumerate(mentor_ids):
-            mentor_pref_rankings[mentor_id] = {}
-            for rank, student_id in enumerate(mentor_prefs[i]):
-                mentor_pref_rankings[mentor_id][student_id] = rank
-
-        # 初始化每个学生的提案索引
-        student_proposal_index = {student_id: 0 for student_id in student_ids}
-
-        # 获取导师最多能带的学生数
-        mentor_capacities = {
-            mentor_id: self.mentors[mentor_id]['other_info']['max_students']
-            for mentor_id in mentor_ids
+    def interest_overlap(self, student_ids, mentor_ids):
+        """学生×导师 的共同领域分数：精确模式为共同标签数，模糊模式为标签相似度之和"""
+        if self.similarity == 'fuzzy':
+            return soft_overlap(self.student_store.codes_for(student_ids), self.mentor_store.codes_for(mentor_ids),
+                                self.tag_vectors, self.similarity_threshold)
+        return self.score_matrix(student_ids, mentor_ids).overlap
+
+    def shared_hours(self, student_ids, mentor_ids):
+        """学生×导师 每周共同空闲的小时数：每人的空闲时间转换一次位图，全部配对按位与后计数"""
+        student_avail = self.student_store.lookup('availability')
+        mentor_avail = self.mentor_store.lookup('availability')
+        return shared_hours(to_words([availability_mask(student_avail[sid]) for sid in student_ids]),
+                            to_words([availability_mask(mentor_avail[mid]) for mid in mentor_ids]))
+
+    def time_compatibility(self, student_ids, mentor_ids):
+        """学生×导师 的时间兼容矩阵"""
+        return self.shared_hours(student_ids, mentor_ids) > 0
+
+    def skill_eligibility(self, student_ids, mentor_ids):
+        """学生×导师 的技能要求满足矩阵；技能为1~5的档位，按档位位图求交集（见 scoring.SkillBucketIndex）"""
+        skills = self.student_store.matrix(SKILLS, self.student_store.rows(student_ids))
+        required = self.mentor_store.matrix([f'min_{skill}' for skill in SKILLS],
+                                            self.mentor_store.rows(mentor_ids))
+        return skill_eligibility(skills, required)
+
+    def pair_matrices(self, student_ids, mentor_ids):
+        """学生×导师 的 (共同领域数, 每周共同空闲小时数, 技能满足) 矩阵"""
+        with self.metrics.phase('pair_matrices'):
+            matrices = (self.interest_overlap(student_ids, mentor_ids),
+                        self.shared_hours(student_ids, mentor_ids),
+                        self.skill_eligibility(student_ids, mentor_ids))
+        self.metrics.count('pairs_scored', len(student_ids) * len(mentor_ids))
+        return matrices
+
+    def match_project(self, project_name, top_k=None, solver='stable'):
+        """生成某个项目的匹配，返回 (MatchComputation, 匹配结果)；solver 见 batch.solve_project
+
+        逐对矩阵和各算法的匹配结果都按项目内容哈希缓存：画像未变时直接返回，
+        个别画像变化时只重算对应的行/列，再由矩阵重新生成偏好和匹配。
+        增量模式下，不截断偏好的稳定匹配直接取自该项目的 IncrementalMatcher。
+        """
+        student_ids, mentor_ids = self.project_members(project_name)
+        hits = self.match_cache.hits
+        computation = self.match_cache.compute(
+            project_name,
+            student_ids,
+            mentor_ids,
+            self.student_store.fingerprints_for(student_ids),
+            self.mentor_store.fingerprints_for(mentor_ids),
+            self.pair_matrices
+        )
+        self.metrics.count('cache_hits' if self.match_cache.hits > hits else 'cache_misses')
+        key = (solver, top_k)
+        if self.incremental is not None and key == ('stable', None):
+            # 增量模式下稳定匹配直接读取增量维护的结果，只有结果变化时才重新检查稳定性
+            matches = self.current_matches(project_name)
+            if computation.results.get(key) != matches:
+                computation.results[key] = matches
+                computation.audits.pop(key, None)
+        elif key not in computation.results:
+            computation.results[key] = solve_project(*computation.matrices, student_ids, mentor_ids,
+                                                     self.mentor_capacities(mentor_ids), top_k, solver,
+                                                     self.metrics)
+        if self.audit and key not in computation.audits:
+            with self.metrics.phase('audit'):
+                computation.audits[key] = audit_project(*computation.matrices, student_ids, mentor_ids,
+                                                        self.mentor_capacities(mentor_ids),
+                                                        computation.results[key], top_k)
+            self.metrics.count('blocking_pairs', len(computation.audits[key]))
+        return computation, computation.results[key]
+
+    def welfare_report(self, project_name, top_k=None):
+        """比较稳定匹配与总分最优分配的共同领域总数，返回 {'stable', 'optimal', 'gap', 'ratio'}"""
+        computation, stable = self.match_project(project_name, top_k, 'stable')
+        _, optimal = self.match_project(project_name, top_k, 'optimal')
+        student_index = {sid: i for i, sid in enumerate(computation.student_ids)}
+        mentor_index = {mid: j for j, mid in enumerate(computation.mentor_ids)}
+        overlap = computation.matrices[0]
+        stable_welfare = matching_welfare(stable, overlap, student_index, mentor_index)
+        optimal_welfare = matching_welfare(optimal, overlap, student_index, mentor_index)
+        return {
+            'stable': stable_welfare,
+            'optimal': optimal_welfare,
+            'gap': optimal_welfare - stable_welfare,
+            'ratio': stable_welfare / optimal_welfare if optimal_welfare else 1.0,
         }
 
-        # 还有学生没有匹配且还有可选的导师
-        free_students = list(student_ids)
-        while free_students:
-            student_id = free_students.pop(0)
+    def match_all_projects(self, project_names=None, top_k=None, workers=None, solver='stable'):
+        """所有（或指定）项目一次性并行匹配，返回 ({项目名: batch.ProjectResult}, 总耗时秒数)"""
+        return match_all_projects(self, project_names, top_k, workers, solver)
+
+    def match_table(self, project_name, computation, matches):
+        """把匹配结果整理成一张表：每名学生一行，按导师分组，未匹配的学生排在最后
+
+        共同领域数直接取自打分时的共同兴趣矩阵，共同领域标签由双方升序编号数组求交集得到；
+        模糊模式下另列出相近的标签对（如 机器学习≈Machine Learning）。
+        """
+        prefix = f"{project_name}_"
+        student_position = {sid: i for i, sid in enumerate(computation.student_ids)}
+        mentor_position = {mid: j for j, mid in enumerate(computation.mentor_ids)}
+        overlap, hours = computation.matrices[:2]
+        student_info = self.student_store.lookup('other_info')
+        mentor_info = self.mentor_store.lookup('other_info')
+        student_interests = self.student_store.lookup('interests')
+        mentor_areas = self.mentor_store.lookup('interests')
+
+        # 导师 -> 学生 的索引只构建一次
+        assigned = {mid: [] for mid in computation.mentor_ids}
+        for student_id, mentor_id in matches.items():
+            assigned[mentor_id].append(student_id)
+        order = [(sid, mid) for mid, sids in assigned.items() for sid in sids]
+        order += [(sid, None) for sid in computation.student_ids if sid not in matches]
+
+        rows = []
+        for student_id, mentor_id in order:
+            row = {
+                '学生': student_id.removeprefix(prefix),
+                '学生姓名': student_info[student_id]['name'],
+                '兴趣': ', '.join(student_interests[student_id]),
+                '导师': '',
+                '导师姓名': '',
+                '指导人数': '',
+                '研究领域': '',
+                '共同领域': '',
+                '共同领域数': 0,
+                '共同时间(小时/周)': 0,
+            }
+            if mentor_id is not None:
+                info = mentor_info[mentor_id]
+                common = self.vocabulary.decode(common_codes(self.student_store.codes_of(student_id),
+                                                             self.mentor_store.codes_of(mentor_id)).tolist())
+                score = overlap[student_position[student_id], mentor_position[mentor_id]]
+                if self.similarity == 'fuzzy':
+                    common += [f"{a}≈{b}" for a, b in similar_pairs(student_interests[student_id],
+                                                                     mentor_areas[mentor_id], self.embeddings,
+                                                                     self.similarity_threshold)
+                               if a != b]
+                row.update({
+                    '导师': mentor_id.removeprefix(prefix),
+                    '导师姓名': info['name'],
+                    '指导人数': f"{len(assigned[mentor_id])}/{info['max_students']}",
+                    '研究领域': ', '.join(mentor_areas[mentor_id]),
+                    '共同领域': ', '.join(common) if common else '无',
+                    '共同领域数': round(float(score), 2) if self.similarity == 'fuzzy' else int(score),
+                    '共同时间(小时/周)': int(hours[student_position[student_id], mentor_position[mentor_id]]),
+                })
+            rows.append(row)
+        return pd.DataFrame(rows, columns=MATCH_TABLE_COLUMNS)
+
+    def mentor_capacities(self, mentor_ids):
+        """导师最多能带的学生数"""
+        return self.mentor_store.column('max_students', self.mentor_store.rows(mentor_ids)).astype(np.int64).tolist()
 
-            # 如果学生已经尝试了所有导师，跳过
-            if student_proposal_index[student_id] >= len(student_prefs[student_ids.index(student_id)]):
-                continue
-
-            # 获取学生下一个想申请的导师
-            mentor_id = student_prefs[student_ids.index(student_id)][student_proposal_index[student_id]]
-            student_proposal_index[student_id] += 1
+    def finalize_matches(self, student_ids, mentor_ids, student_prefs, mentor_prefs):
+        """执行稳定匹配算法"""
+        # 带导师容量的Gale-Shapley稳定匹配，导师最多能带的学生数作为容量
+        mentor_capacities = self.mentor_capacities(mentor_ids)
+        with self.metrics.phase('proposals'):
+            matches = hospitals_residents(student_ids, mentor_ids, student_prefs, mentor_prefs, mentor_capacities,
+                                          self.metrics)
+        if self.audit:
+            with self.metrics.phase('audit'):
+                self.last_audit = blocking_pairs(student_ids, mentor_ids, student_prefs, mentor_prefs, matches,
+                                                 mentor_capacities)
+            self.metrics.count('blocking_pairs', len(self.last_audit))
+        return matches
 
-            # 如果导师还有名额，直接匹配
-            if len(mentor_matches[mentor_id]) < mentor_capacities[mentor_id]:
-                matches[student_id] = mentor_id
-                mentor_matches[mentor_id].append(student_id)
-            else:
-                # 检查当前学生是否比已匹配的某个学生更受导师青睐
-                current_matches = mentor_matches[mentor_id]
-                for matched_student in current_matches:
-                    # 如果新学生比已匹配学生排名更高
-                    if mentor_pref_rankings[mentor_id].get(student_id, float('inf')) < \
-                            mentor_pref_rankings[mentor_id].get(matched_student, float('inf')):
-                        # 替换匹配
-                        del matches[matched_student]
-                        mentor_matches[mentor_id].remove(matched_student)
-                        matches[student_id] = mentor_id
-                        mentor_matches[mentor_id].append(student_id)
-                        free_students.append(matched_student)
-                        break
-                else:
-                    # 如果没有替换发生，学生继续保持自由
-                    free_students.append(student_id)
 
-        return matches
+def show_audit(project_name, pairs, limit=20):
+    """显示稳定性检查结果，阻塞对较多时只列出前 limit 个"""
+    if not pairs:
+        st.success("稳定性检查：没有阻塞对")
+        return
+    st.warning(f"稳定性检查：发现 {len(pairs)} 个阻塞对（学生与导师都更愿意彼此配对）")
+    prefix = f"{project_name}_"
+    st.dataframe(pd.DataFrame([{'学生': sid.removeprefix(prefix), '导师': mid.removeprefix(prefix)}
+                               for sid, mid in pairs[:limit]]), hide_index=True)
+
+
+def show_metrics_panel(system):
+    """侧边栏的性能指标：勾选后记录各阶段耗时和计数，可导出为 Prometheus 文本"""
+    enabled = st.sidebar.checkbox("记录性能指标", value=bool(system.metrics), key="metrics_enabled")
+    if enabled and not system.metrics:
+        system.metrics = Metrics()
+    elif not enabled and system.metrics:
+        system.metrics = NULL_METRICS
+    if not enabled:
+        return
+    with st.sidebar.expander("性能指标"):
+        data = system.metrics.as_dict()
+        if not data['timings'] and not data['counters']:
+            st.write("暂无记录，生成匹配后显示")
+            return
+        st.dataframe(pd.DataFrame([{'阶段': name, '次数': t['calls'], '累计耗时(秒)': round(t['seconds'], 4)}
+                                   for name, t in data['timings'].items()]), hide_index=True)
+        st.dataframe(pd.DataFrame([{'计数': name, '数值': value} for name, value in data['counters'].items()]),
+                     hide_index=True)
+        st.code(system.metrics.prometheus(), language='text')
+        if st.button("清零", key="metrics_reset"):
+            system.metrics.reset()
+            st.rerun()
 
 
 def input_project_info():
@@ -152,6 +543,21 @@ def input_project_info():
     return project_info
 
 
+def input_free_time(key_prefix):
+    """可用时间与项目不一致时填写自己每周的空闲时间，返回空闲时间位图"""
+    st.warning("如果你的可用时间与项目时间不一致，请填写每周的空闲时间，系统会按实际重合的时间匹配")
+    days = st.multiselect("空闲的日子", list(DAYS), key=f"{key_prefix}_free_days")
+    col_free1, col_free2 = st.columns(2)
+    with col_free1:
+        start = st.time_input("空闲开始时间", time(9, 0), key=f"{key_prefix}_free_start")
+    with col_free2:
+        end = st.time_input("空闲结束时间", time(12, 0), key=f"{key_prefix}_free_end")
+    slots = week_mask(days, start, end)
+    if slots:
+        st.caption(f"每周空闲 {slots.bit_count()} 小时：{format_slots(slots)}")
+    return slots
+
+
 def input_student_profile(student_idx, project_info):
     """输入单个学生信息"""
     st.subheader(f"学生 {student_idx + 1} 信息")
@@ -193,8 +599,7 @@ def input_student_profile(student_idx, project_info):
         key=f"stu_time_match_{student_idx}"
     )
 
-    if not time_match:
-        st.warning("如果你的可用时间与项目时间不一致，可能会影响匹配结果")
+    free_slots = None if time_match else input_free_time(f"stu_{student_idx}")
 
     # 验证必填项
     if not student_id or not name or not interests:
@@ -224,6 +629,8 @@ def input_student_profile(student_idx, project_info):
             'project': project_info['name']
         }
     }
+    if free_slots is not None:
+        profile['availability']['weekly_slots'] = free_slots
     return student_id, profile
 
 
@@ -273,8 +680,7 @@ def input_mentor_profile(mentor_idx, project_info):
         key=f"ment_time_match_{mentor_idx}"
     )
 
-    if not time_match:
-        st.warning("如果你的可用时间与项目时间不一致，可能会影响匹配结果")
+    free_slots = None if time_match else input_free_time(f"ment_{mentor_idx}")
 
     # 验证必填项
     if not mentor_id or not name or not research_areas:
@@ -305,19 +711,183 @@ def input_mentor_profile(mentor_idx, project_info):
             'project': project_info['name']
         }
     }
+    if free_slots is not None:
+        profile['availability']['weekly_slots'] = free_slots
     return mentor_id, profile
 
 
-def check_time_compatibility(student_avail, mentor_avail):
-    """检查学生和导师的时间兼容性"""
-    # 如果双方都确认时间与项目匹配，则时间兼容
-    if student_avail['matches_project'] and mentor_avail['matches_project']:
-        return True
+# 表格批量录入的列，与 loaders 导入文件的列名一致
+BULK_COLUMNS = {
+    'student': {
+        'id': st.column_config.TextColumn("学号", required=True),
+        'name': st.column_config.TextColumn("姓名"),
+        'grade': st.column_config.SelectboxColumn("年级", options=["大一", "大二", "大三", "大四", "研究生"]),
+        'major': st.column_config.TextColumn("专业"),
+        'email': st.column_config.TextColumn("邮箱"),
+        'phone': st.column_config.TextColumn("电话"),
+        'interests': st.column_config.TextColumn("兴趣爱好（逗号分隔）", required=True),
+        'math': st.column_config.NumberColumn("数学能力", min_value=1, max_value=5, step=1, default=3),
+        'programming': st.column_config.NumberColumn("编程能力", min_value=1, max_value=5, step=1, default=3),
+        'english': st.column_config.NumberColumn("英语能力", min_value=1, max_value=5, step=1, default=3),
+        'matches_project': st.column_config.CheckboxColumn("时间一致", default=True),
+        'free_time': st.column_config.TextColumn("每周空闲时间（如 周二 14-17; 周四 9-12）"),
+    },
+    'mentor': {
+        'id': st.column_config.TextColumn("工号", required=True),
+        'name': st.column_config.TextColumn("姓名"),
+        'title': st.column_config.SelectboxColumn(
+            "职称", options=["讲师", "助理教授", "副教授", "教授", "研究员", "高级工程师"]),
+        'department': st.column_config.TextColumn("院系"),
+        'email': st.column_config.TextColumn("邮箱"),
+        'phone': st.column_config.TextColumn("电话"),
+        'research_areas': st.column_config.TextColumn("研究领域（逗号分隔）", required=True),
+        'max_students': st.column_config.NumberColumn("最多指导学生数", min_value=1, max_value=10, step=1, default=3),
+        'min_math': st.column_config.NumberColumn("数学要求", min_value=1, max_value=5, step=1, default=2),
+        'min_programming': st.column_config.NumberColumn("编程要求", min_value=1, max_value=5, step=1, default=3),
+        'min_english': st.column_config.NumberColumn("英语要求", min_value=1, max_value=5, step=1, default=2),
+        'matches_project': st.column_config.CheckboxColumn("时间一致", default=True),
+        'free_time': st.column_config.TextColumn("每周空闲时间（如 周二 14-17; 周四 9-12）"),
+    },
+}
+
+BULK_DTYPES = {'math': 'Int64', 'programming': 'Int64', 'english': 'Int64', 'max_students': 'Int64',
+               'min_math': 'Int64', 'min_programming': 'Int64', 'min_english': 'Int64',
+               'matches_project': 'boolean'}
+
+
+def bulk_template(role):
+    """批量录入表格的空模板"""
+    return pd.DataFrame({column: pd.Series(dtype=BULK_DTYPES.get(column, 'object'))
+                         for column in BULK_COLUMNS[role]})
+
+
+def bulk_profile_editor(system, role, project_info):
+    """表格批量录入：上传文件或直接编辑表格，整批写入系统，返回表格中本次实际变化的人数
+
+    内容未变的行由 upsert 跳过，因此每次重跑的开销取决于改动的行数而不是总人数。
+    """
+    label = "学生" if role == 'student' else "导师"
+    project_name = project_info['name']
+    prefix = f"{project_name}_"
+
+    # 上传的文件只导入一次（Streamlit 重跑时文件仍在上传控件中）
+    uploaded = st.file_uploader(
+        f"上传{label}文件（CSV / JSONL / Parquet，列名与下表一致）",
+        type=['csv', 'txt', 'jsonl', 'ndjson', 'json', 'parquet', 'pq'],
+        key=f"{role}_upload"
+    )
+    if uploaded is not None:
+        imported = st.session_state.setdefault('imported_files', set())
+        marker = (project_name, role, uploaded.file_id)
+        if marker not in imported:
+            report = load_profiles(system, uploaded, role, schema='app', fmt=detect_format(uploaded.name),
+                                   project_info=project_info, id_prefix=prefix, upsert=True)
+            imported.add(marker)
+            st.success(report.summary())
+            for line, row_id, reason in report.errors[:20]:
+                st.warning(f"第 {line} 行 {row_id or ''}: {reason}")
+
+    edited = st.data_editor(
+        bulk_template(role),
+        num_rows="dynamic",
+        column_config=BULK_COLUMNS[role],
+        key=f"{role}_editor_{project_name}"
+    )
+    # 空单元格为 NaN/NA，转换为 None 后交给 loaders 的校验逻辑
+    rows = edited.astype(object).where(edited.notna(), None).to_dict('records')
+    chunk = [(line, row) for line, row in enumerate(rows, start=1)
+             if any(value not in (None, '') for value in row.values())]
+    valid, invalid = validate_chunk(chunk, role, 'app', project_info)
+    for line, row_id, reason in invalid:
+        st.warning(f"表格第 {line} 行 {row_id or ''}: {reason}")
+
+    # 表格中删除或改了id的行，从系统中移除
+    editor_ids = st.session_state.setdefault(f"{role}_editor_ids", {})
+    current = {prefix + row_id for row_id, _ in valid}
+    remove = system.remove_student if role == 'student' else system.remove_mentor
+    stale = editor_ids.get(project_name, set()) - current
+    for person_id in stale:
+        remove(person_id)
+    editor_ids[project_name] = current
+
+    upsert = system.upsert_students if role == 'student' else system.upsert_mentors
+    return len(stale) + upsert([(prefix + row_id, profile) for row_id, profile in valid])
+
+
+SOLVER_LABELS = {"稳定匹配": 'stable', "总分最优": 'optimal'}
+
+SIMILARITY_LABELS = {"精确匹配": 'exact', "模糊匹配（近义词）": 'fuzzy'}
+MATCH_TABLE_COLUMNS = ['学生', '学生姓名', '兴趣', '导师', '导师姓名', '指导人数', '研究领域', '共同领域', '共同领域数',
+                       '共同时间(小时/周)']
+
+
+def show_match_table(project_name, table):
+    """分页显示匹配结果表，支持按导师/关键字筛选和下载"""
+    st.subheader(f"项目 '{project_name}' 匹配结果")
+    matched = table['导师'] != ''
+    if not matched.any():
+        st.warning("未能找到有效的匹配！请检查时间兼容性或放宽要求。")
+
+    col1, col2, col3 = st.columns(3)
+    col1.metric("学生总数", len(table))
+    col2.metric("已匹配", int(matched.sum()))
+    col3.metric("未匹配", int((~matched).sum()))
+
+    col_filter1, col_filter2, col_filter3 = st.columns([2, 2, 1])
+    with col_filter1:
+        mentors = ['全部'] + list(dict.fromkeys(table.loc[matched, '导师']))
+        mentor = st.selectbox("按导师筛选", mentors, key="result_mentor")
+    with col_filter2:
+        keyword = st.text_input("搜索学号/姓名/兴趣", key="result_keyword")
+    with col_filter3:
+        only_unmatched = st.checkbox("只看未匹配", key="result_unmatched")
+
+    view = table
+    if mentor != '全部':
+        view = view[view['导师'] == mentor]
+    if only_unmatched:
+        view = view[view['导师'] == '']
+    if keyword:
+        hit = (view['学生'].str.contains(keyword, regex=False) |
+               view['学生姓名'].str.contains(keyword, regex=False) |
+               view['兴趣'].str.contains(keyword, regex=False))
+        view = view[hit]
+
+    col_page1, col_page2 = st.columns(2)
+    with col_page1:
+        page_size = st.selectbox("每页行数", [20, 50, 100, 500], key="result_page_size")
+    pages = max(1, -(-len(view) // page_size))
+    with col_page2:
+        page = st.number_input(f"页码（共 {pages} 页）", min_value=1, max_value=pages, value=1, key="result_page")
+    start = (min(page, pages) - 1) * page_size
+    st.dataframe(view.iloc[start:start + page_size], hide_index=True)
+
+    st.download_button(
+        "下载匹配结果（CSV）",
+        view.to_csv(index=False).encode('utf-8-sig'),
+        file_name=f"{project_name}_匹配结果.csv",
+        mime="text/csv",
+        key="result_download"
+    )
+
+
+@st.cache_resource
+def open_storage(path):
+    """打开本地数据库，同一路径在所有会话间共用一个连接（SQLiteStorage 内部加锁串行化访问）"""
+    return SQLiteStorage(path)
+
+
+def default_embeddings():
+    """兴趣标签向量缓存：MATCHING_EMBEDDING_PATH 指定缓存文件，MATCHING_EMBEDDING_MODEL 指定本地
+    sentence-transformers 模型（不设置时使用字符 n-gram 向量）"""
+    model = os.environ.get('MATCHING_EMBEDDING_MODEL')
+    return TagEmbeddingCache(SentenceEmbedder(model) if model else None, os.environ.get('MATCHING_EMBEDDING_PATH'))
 
-    # 这里可以添加更复杂的时间匹配逻辑
-    # 例如比较具体的时间段等
 
-    return False
+def default_storage():
+    """设置环境变量 MATCHING_DB_PATH 时启用持久化存储，否则数据只保存在当前会话中"""
+    path = os.environ.get('MATCHING_DB_PATH')
+    return open_storage(path) if path else None
 
 
 def main():
@@ -332,7 +902,8 @@ def main():
 
     # 初始化session_state保存状态
     if 'system' not in st.session_state:
-        st.session_state.system = MatchingSystem(method='hybrid')
+        st.session_state.system = MatchingSystem(method='hybrid', storage=default_storage(),
+                                                 embeddings=default_embeddings())
     if 'current_project' not in st.session_state:
         st.session_state.current_project = None
     if 'students_added' not in st.session_state:
@@ -342,14 +913,27 @@ def main():
 
     system = st.session_state.system
 
+    # 已保存的项目：只加载该项目的学生和导师
+    if system.storage is not None:
+        saved_projects = system.storage.list_projects()
+        if saved_projects:
+            st.sidebar.subheader("已保存的项目")
+            saved_name = st.sidebar.selectbox("选择项目", saved_projects, key="saved_project")
+            if st.sidebar.button("加载项目", key="load_project_btn"):
+                st.session_state.current_project = system.load_project(saved_name)
+                st.session_state.students_added, st.session_state.mentors_added = \
+                    system.project_counts(saved_name)
+
     # 步骤1：创建项目
     st.header("1. 创建项目")
     project_info = input_project_info()
 
     if st.button("创建项目", key="create_project_btn"):
         st.session_state.current_project = project_info
-        st.session_state.students_added = 0
-        st.session_state.mentors_added = 0
+        system.save_project(project_info)
+        # 同名项目已保存的成员会一并加载
+        st.session_state.students_added, st.session_state.mentors_added = \
+            system.project_counts(project_info['name'])
         st.success(f"项目 '{project_info['name']}' 创建成功！")
 
     # 显示当前项目信息
@@ -364,187 +948,134 @@ def main():
     # 步骤2：添加学生
     st.header("2. 添加学生")
     if st.session_state.current_project:
-        num_students = st.number_input(
-            "要添加的学生数量",
-            min_value=0,
-            max_value=st.session_state.current_project['max_participants'],
-            value=0,
-            key="num_stu"
-        )
+        entry_mode = st.radio("录入方式", ["逐个填写", "表格批量录入"], horizontal=True, key="student_entry_mode")
+        if entry_mode == "表格批量录入":
+            changed = bulk_profile_editor(system, 'student', st.session_state.current_project)
+            st.session_state.students_added = system.project_counts(st.session_state.current_project['name'])[0]
+            st.info(f"本次更新 {changed} 名学生，当前共 {st.session_state.students_added} 名学生")
+        else:
+            num_students = st.number_input(
+                "要添加的学生数量",
+                min_value=0,
+                max_value=st.session_state.current_project['max_participants'],
+                value=0,
+                key="num_stu"
+            )
 
-        if num_students > 0:
-            for i in range(num_students):
-                student_id, profile = input_student_profile(i, st.session_state.current_project)
-                if student_id and profile:  # 仅当输入有效时添加
-                    # 添加项目信息到学生ID
-                    student_id_with_project = f"{st.session_state.current_project['name']}_{student_id}"
-                    system.add_student(student_id_with_project, profile)
-                    st.session_state.students_added += 1
-            st.success(f"已为项目添加 {num_students} 名学生！当前共 {st.session_state.students_added} 名学生")
+            if num_students > 0:
+                items = []
+                for i in range(num_students):
+                    student_id, profile = input_student_profile(i, st.session_state.current_project)
+                    if student_id and profile:  # 仅当输入有效时添加
+                        # 添加项目信息到学生ID
+                        items.append((f"{st.session_state.current_project['name']}_{student_id}", profile))
+                # 每次重跑都会重新提交表单，内容未变的画像直接跳过
+                changed = system.upsert_students(items)
+                st.session_state.students_added = system.project_counts(st.session_state.current_project['name'])[0]
+                st.success(f"已为项目添加 {num_students} 名学生（本次更新 {changed} 名）！"
+                           f"当前共 {st.session_state.students_added} 名学生")
     else:
         st.warning("请先创建项目")
 
     # 步骤3：添加导师
     st.header("3. 添加导师")
     if st.session_state.current_project:
-        num_mentors = st.number_input(
-            "要添加的导师数量",
-            min_value=0,
-            max_value=10,
-            value=0,
-            key="num_ment"
-        )
+        entry_mode = st.radio("录入方式", ["逐个填写", "表格批量录入"], horizontal=True, key="mentor_entry_mode")
+        if entry_mode == "表格批量录入":
+            changed = bulk_profile_editor(system, 'mentor', st.session_state.current_project)
+            st.session_state.mentors_added = system.project_counts(st.session_state.current_project['name'])[1]
+            st.info(f"本次更新 {changed} 名导师，当前共 {st.session_state.mentors_added} 名导师")
+        else:
+            num_mentors = st.number_input(
+                "要添加的导师数量",
+                min_value=0,
+                max_value=10,
+                value=0,
+                key="num_ment"
+            )
 
-        if num_mentors > 0:
-            for i in range(num_mentors):
-                mentor_id, profile = input_mentor_profile(i, st.session_state.current_project)
-                if mentor_id and profile:  # 仅当输入有效时添加
-                    # 添加项目信息到导师ID
-                    mentor_id_with_project = f"{st.session_state.current_project['name']}_{mentor_id}"
-                    system.add_mentor(mentor_id_with_project, profile)
-                    st.session_state.mentors_added += 1
-            st.success(f"已为项目添加 {num_mentors} 名导师！当前共 {st.session_state.mentors_added} 名导师")
+            if num_mentors > 0:
+                items = []
+                for i in range(num_mentors):
+                    mentor_id, profile = input_mentor_profile(i, st.session_state.current_project)
+                    if mentor_id and profile:  # 仅当输入有效时添加
+                        # 添加项目信息到导师ID
+                        items.append((f"{st.session_state.current_project['name']}_{mentor_id}", profile))
+                changed = system.upsert_mentors(items)
+                st.session_state.mentors_added = system.project_counts(st.session_state.current_project['name'])[1]
+                st.success(f"已为项目添加 {num_mentors} 名导师（本次更新 {changed} 名）！"
+                           f"当前共 {st.session_state.mentors_added} 名导师")
     else:
         st.warning("请先创建项目")
 
     # 步骤4：生成匹配结果
     st.header("4. 匹配结果")
     if st.session_state.current_project and st.session_state.students_added > 0 and st.session_state.mentors_added > 0:
-        if st.button("生成匹配结果", key="match_btn"):
-            # 获取当前项目的学生和导师
-            project_name = st.session_state.current_project['name']
-            project_students = {sid: profile for sid, profile in system.students.items()
-                                if profile['other_info']['project'] == project_name}
-            project_mentors = {mid: profile for mid, profile in system.mentors.items()
-                               if profile['other_info']['project'] == project_name}
-
-            # 生成学生偏好（考虑时间兼容性和兴趣匹配）
-            student_prefs = []
-            student_ids = list(project_students.keys())
-
-            for student_id in student_ids:
-                scores = []
-                student_profile = project_students[student_id]
-
-                for mentor_id in project_mentors:
-                    mentor_profile = project_mentors[mentor_id]
-
-                    # 检查时间兼容性
-                    time_compatible = check_time_compatibility(
-                        student_profile['availability'],
-                        mentor_profile['availability']
-                    )
-
-                    if time_compatible:
-                        # 计算兴趣匹配度
-                        common = len(set(student_profile['interests']) &
-                                     set(mentor_profile['research_areas']))
-                        scores.append((mentor_id, common))
-                    else:
-                        # 时间不兼容，分数为0
-                        scores.append((mentor_id, 0))
-
-                # 按匹配度降序排序
-                pref = [m[0] for m in sorted(scores, key=lambda x: x[1], reverse=True) if m[1] > 0]
-                student_prefs.append(pref)
-
-            # 生成导师偏好（考虑时间兼容性和技能要求）
-            mentor_prefs = []
-            mentor_ids = list(project_mentors.keys())
-
-            for mentor_id in mentor_ids:
-                scores = []
-                mentor_profile = project_mentors[mentor_id]
-                req = mentor_profile['requirements']
-
-                for student_id in student_ids:
-                    student_profile = project_students[student_id]
-
-                    # 检查时间兼容性
-                    time_compatible = check_time_compatibility(
-                        student_profile['availability'],
-                        mentor_profile['availability']
-                    )
-
-                    if time_compatible:
-                        stu_skills = student_profile['skills']
-                        # 检查是否满足最低要求
-                        if (stu_skills['math'] >= req['min_math'] and
-                                stu_skills['programming'] >= req['min_programming'] and
-                                stu_skills['english'] >= req['min_english']):
-                            # 计算兴趣匹配度
-                            common = len(set(student_profile['interests']) &
-                                         set(mentor_profile['research_areas']))
-                            scores.append((student_id, common))
-
-                # 按匹配度降序排序
-                pref = [s[0] for s in sorted(scores, key=lambda x: x[1], reverse=True)]
-                mentor_prefs.append(pref)
-
-            # 执行稳定匹配
-            matches = system.finalize_matches(
-                student_ids,
-                mentor_ids,
-                student_prefs,
-                mentor_prefs
-            )
-
-            # 显示匹配结果
-            st.subheader(f"项目 '{project_name}' 匹配结果")
+        project_name = st.session_state.current_project['name']
+        top_k = st.number_input(
+            "每人保留的偏好数量（0 表示全部保留）",
+            min_value=0,
+            value=0,
+            key="pref_top_k"
+        )
+        solver_label = st.radio("匹配方式", list(SOLVER_LABELS), horizontal=True, key="match_solver",
+                                help="稳定匹配保证没有双方都更愿意互换的配对；总分最优使共同领域总数最大，但不保证稳定")
+        solver = SOLVER_LABELS[solver_label]
+        similarity_label = st.radio("兴趣匹配", list(SIMILARITY_LABELS), horizontal=True, key="match_similarity",
+                                    help="模糊匹配会把近义或写法不同的兴趣（如 机器学习 与 Machine Learning）视为相近")
+        system.set_similarity(SIMILARITY_LABELS[similarity_label])
+        system.audit = st.checkbox("匹配后检查稳定性", value=system.audit, key="match_audit",
+                                   help="找出双方都更愿意彼此配对的学生与导师（阻塞对），没有阻塞对即为稳定匹配")
+        system.set_incremental(st.checkbox("增量维护稳定匹配", value=system.incremental is not None,
+                                           key="match_incremental",
+                                           help="画像增删改时只更新受影响的配对；用于稳定匹配且保留全部偏好时"))
 
-            if not matches:
-                st.warning("未能找到有效的匹配！请检查时间兼容性或放宽要求。")
-            else:
-                # 统计匹配结果
-                mentor_counts = {}
-                for mentor in mentor_ids:
-                    mentor_counts[mentor] = 0
-
-                for student, mentor in matches.items():
-                    mentor_counts[mentor] += 1
-
-                # 显示匹配详情
-                for mentor_id, count in mentor_counts.items():
-                    if count > 0:
-                        mentor_profile = project_mentors[mentor_id]
-                        raw_mentor_id = mentor_id.split('_', 1)[1] if '_' in mentor_id else mentor_id
-
-                        st.write(f"### 导师 {raw_mentor_id} ({mentor_profile['other_info']['name']})")
-                        st.write(f"**指导人数**: {count}/{mentor_profile['other_info']['max_students']}")
-                        st.write(f"**研究领域**: {', '.join(mentor_profile['research_areas'])}")
-
-                        # 显示匹配的学生
-                        matched_students = [s for s, m in matches.items() if m == mentor_id]
-                        for student_id in matched_students:
-                            student_profile = project_students[student_id]
-                            raw_student_id = student_id.split('_', 1)[1] if '_' in student_id else student_id
-
-                            st.write(f"- **学生 {raw_student_id}** ({student_profile['other_info']['name']})")
-                            st.write(f"  兴趣: {', '.join(student_profile['interests'])}")
-
-                            common = set(student_profile['interests']) & set(mentor_profile['research_areas'])
-                            st.write(f"  共同领域: {', '.join(common) if common else '无'}")
-
-                        st.divider()
-
-                # 显示未匹配的学生
-                unmatched_students = set(student_ids) - set(matches.keys())
-                if unmatched_students:
-                    st.warning("以下学生未能匹配到导师:")
-                    for student_id in unmatched_students:
-                        student_profile = project_students[student_id]
-                        raw_student_id = student_id.split('_', 1)[1] if '_' in student_id else student_id
-                        st.write(f"- {raw_student_id} ({student_profile['other_info']['name']})")
+        if st.button("生成匹配结果", key="match_btn"):
+            # 项目画像未变化时直接复用上次的分数矩阵、偏好和匹配结果
+            computation, matches = system.match_project(project_name, top_k or None, solver)
+            system.record_matches(project_name, matches)
+            if solver == 'optimal':
+                report = system.welfare_report(project_name, top_k or None)
+                st.info(f"共同领域总数：总分最优 {report['optimal']:.0f}，稳定匹配 {report['stable']:.0f}，"
+                        f"差距 {report['gap']:.0f}（稳定匹配达到最优的 {report['ratio']:.1%}）")
+            if system.audit:
+                show_audit(project_name, computation.audits[(solver, top_k or None)])
+            # 结果表只在生成匹配时构建一次，翻页、筛选时直接复用
+            st.session_state.match_table = (project_name, system.match_table(project_name, computation, matches))
+
+        if st.session_state.get('match_table') and st.session_state.match_table[0] == project_name:
+            show_match_table(*st.session_state.match_table)
     else:
         st.warning("请先创建项目并添加学生和导师信息")
 
+    # 所有项目一次性并行匹配
+    if system.project_index['student'] and st.sidebar.button("全部项目批量匹配", key="batch_match_btn"):
+        results, seconds = system.match_all_projects()
+        summary = pd.DataFrame([{
+            '项目': project,
+            '学生数': len(result.student_ids),
+            '导师数': len(result.mentor_ids),
+            '已匹配': len(result.matches),
+            '耗时(秒)': round(result.timings['pack'] + result.timings['total'], 4),
+            **({} if result.blocking_pairs is None else {'阻塞对': len(result.blocking_pairs)}),
+        } for project, result in results.items()])
+        st.sidebar.write(f"共 {len(results)} 个项目，总耗时 {seconds:.3f} 秒")
+        st.sidebar.dataframe(summary, hide_index=True)
+        for project, result in results.items():
+            system.record_matches(project, result.matches)
+
+    show_metrics_panel(system)
+
     # 添加退出登录按钮
     if st.sidebar.button("退出登录"):
         st.session_state.authenticated = False
         st.session_state.current_project = None
         st.session_state.students_added = 0
         st.session_state.mentors_added = 0
-        st.session_state.system = MatchingSystem(method='hybrid')
+        st.session_state.match_table = None
+        st.session_state.system = MatchingSystem(method='hybrid', storage=system.storage,
+                                                 embeddings=system.embeddings, metrics=system.metrics,
+                                                 audit=system.audit, incremental=system.incremental is not None)
         st.rerun()
 
 
@@ -0,0 +1,253 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+from scipy import sparse
+
+from metrics import NULL_METRICS
+from schedule import availability_mask, shared_hours, to_words
+from scoring import skill_eligibility, top_k_preferences
+from semantic import soft_overlap
+from solvers import blocking_pairs, hospitals_residents, matching_welfare, optimal_assignment
+
+SKILLS = ('math', 'programming', 'english')
+# 共同空闲小时数只用于区分共同领域分数相同的配对：每周最多168小时，乘以该系数后总和小于1
+SCHEDULE_WEIGHT = 1.0 / 169
+
+
+def preference_scores(overlap, hours):
+    """排序用的分数：先比较共同领域，相同时共同空闲时间多的优先"""
+    return overlap + SCHEDULE_WEIGHT * hours
+
+
+def project_preferences(overlap, hours, skill_eligible, student_ids, mentor_ids, top_k=None):
+    """网页版的双方偏好规则，返回 (学生偏好, 导师偏好)；hours 为每周共同空闲小时数，大于0即时间兼容
+
+    学生：时间兼容且共同领域数大于0的导师，按共同领域数降序；
+    导师：时间兼容且满足技能要求的学生，按共同领域数降序。
+    """
+    time_compatible = hours > 0
+    scores = preference_scores(overlap, hours)
+    student_prefs = top_k_preferences(scores, mentor_ids, top_k, time_compatible & (overlap > 0))
+    mentor_prefs = top_k_preferences(scores.T, student_ids, top_k, (time_compatible & skill_eligible).T)
+    return student_prefs, mentor_prefs
+
+
+def solve_project(overlap, hours, skill_eligible, student_ids, mentor_ids, capacities,
+                  top_k=None, solver='stable', metrics=NULL_METRICS):
+    """按指定算法求解一个项目，返回 {学生: 导师}
+
+    solver='stable'：带容量的学生提议稳定匹配；
+    solver='optimal'：在双方都可接受的配对中最大化共同领域总数（忽略 top_k，结果不一定稳定）。
+    """
+    if solver == 'optimal':
+        with metrics.phase('assignment'):
+            acceptable = (hours > 0) & skill_eligible & (overlap > 0)
+            return optimal_assignment(student_ids, mentor_ids, preference_scores(overlap, hours), capacities,
+                                      acceptable, metrics)
+    if solver != 'stable':
+        raise ValueError(f"未知的匹配算法: {solver}")
+    with metrics.phase('preferences'):
+        student_prefs, mentor_prefs = project_preferences(overlap, hours, skill_eligible,
+                                                          student_ids, mentor_ids, top_k)
+    with metrics.phase('proposals'):
+        return hospitals_residents(student_ids, mentor_ids, student_prefs, mentor_prefs, capacities, metrics)
+
+
+def audit_project(overlap, hours, skill_eligible, student_ids, mentor_ids, capacities, matches, top_k=None):
+    """按网页版的双方偏好检查匹配结果，返回全部阻塞对 [(学生, 导师)]（见 solvers.blocking_pairs）"""
+    student_prefs, mentor_prefs = project_preferences(overlap, hours, skill_eligible, student_ids, mentor_ids, top_k)
+    return blocking_pairs(student_ids, mentor_ids, student_prefs, mentor_prefs, matches, capacities)
+
+
+class ProjectPartition:
+    """单个项目的紧凑数组，只包含该项目成员的数据，用于发送给工作进程
+
+    兴趣编号重新映射为项目内的局部编号，学生/导师都用 0..n-1 的下标代替id。
+    模糊兴趣匹配时 tag_vectors 为按局部编号排列的标签向量，否则为 None。
+    """
+
+    def __init__(self, project, student_codes, mentor_codes, skills, requirements,
+                 student_slots, mentor_slots, capacities):
+        # 兴趣编号按 CSR 格式拼接：(indptr, indices)
+        all_codes = np.concatenate([np.concatenate(student_codes or [np.zeros(0, np.int32)]),
+                                    np.concatenate(mentor_codes or [np.zeros(0, np.int32)])])
+        tags, local = np.unique(all_codes, return_inverse=True)
+        n_student_codes = sum(len(codes) for codes in student_codes)
+        self.project = project
+        self.n_tags = len(tags)
+        self.student_indptr = _indptr(student_codes)
+        self.student_indices = local[:n_student_codes].astype(np.int32)
+        self.mentor_indptr = _indptr(mentor_codes)
+        self.mentor_indices = local[n_student_codes:].astype(np.int32)
+        self.skills = skills
+        self.requirements = requirements
+        # 每周空闲时间位图，形状为 (人数, schedule.WORDS)
+        self.student_slots = student_slots
+        self.mentor_slots = mentor_slots
+        self.capacities = capacities
+        self.tags = tags
+        self.tag_vectors = None
+        self.similarity_threshold = None
+        self.pack_seconds = 0.0
+
+    @property
+    def shape(self):
+        return len(self.student_indptr) - 1, len(self.mentor_indptr) - 1
+
+
+def _indptr(codes_list):
+    indptr = np.zeros(len(codes_list) + 1, dtype=np.int64)
+    np.cumsum([len(codes) for codes in codes_list], out=indptr[1:])
+    return indptr
+
+
+def _split(indptr, indices):
+    return [indices[indptr[i]:indptr[i + 1]] for i in range(len(indptr) - 1)]
+
+
+class ProjectResult:
+    """单个项目的批量匹配结果：matches 为 {学生id: 导师id}，welfare 为配对的共同领域总数，
+    timings 为各阶段耗时（秒），blocking_pairs 为稳定性检查找到的阻塞对（未检查时为 None）"""
+
+    def __init__(self, project, student_ids, mentor_ids, matches, welfare, timings, blocking_pairs=None):
+        self.project = project
+        self.student_ids = student_ids
+        self.mentor_ids = mentor_ids
+        self.matches = matches
+        self.welfare = welfare
+        self.timings = timings
+        self.blocking_pairs = blocking_pairs
+
+    def __repr__(self):
+        return (f"ProjectResult({self.project!r}, {len(self.student_ids)}×{len(self.mentor_ids)}, "
+                f"匹配 {len(self.matches)} 人, {self.timings['total']:.3f}s)")
+
+
+def partition_projects(system, project_names=None):
+    """按项目切分 app.MatchingSystem，返回 {项目名: (学生id列表, 导师id列表, ProjectPartition)}"""
+    if project_names is None:
+        project_names = list(dict.fromkeys(list(system.project_index['student']) +
+                                           list(system.project_index['mentor'])))
+    student_store = system.student_store
+    mentor_store = system.mentor_store
+    student_avail = student_store.lookup('availability')
+    mentor_avail = mentor_store.lookup('availability')
+    partitions = {}
+    for project in project_names:
+        start = time.perf_counter()
+        student_ids, mentor_ids = system.project_members(project)
+        student_rows = student_store.rows(student_ids)
+        mentor_rows = mentor_store.rows(mentor_ids)
+        # 时间兼容与 MatchingSystem.shared_hours 一致：双方每周空闲时间有交集
+        partition = ProjectPartition(
+            project,
+            student_store.codes_for(student_ids),
+            mentor_store.codes_for(mentor_ids),
+            student_store.matrix(SKILLS, student_rows),
+            mentor_store.matrix([f'min_{skill}' for skill in SKILLS], mentor_rows),
+            to_words([availability_mask(student_avail[sid]) for sid in student_ids]),
+            to_words([availability_mask(mentor_avail[mid]) for mid in mentor_ids]),
+            mentor_store.column('max_students', mentor_rows).astype(np.int64)
+        )
+        if system.similarity == 'fuzzy':
+            partition.tag_vectors = system.tag_vectors(partition.tags)
+            partition.similarity_threshold = system.similarity_threshold
+        partition.pack_seconds = time.perf_counter() - start
+        partitions[project] = (student_ids, mentor_ids, partition)
+    return partitions
+
+
+def _exact_overlap(partition):
+    """项目内的共同兴趣数量矩阵：一次稀疏矩阵乘法"""
+    n_students, n_mentors = partition.shape
+    student_matrix = sparse.csr_matrix(
+        (np.ones(len(partition.student_indices), dtype=np.int32), partition.student_indices,
+         partition.student_indptr), shape=(n_students, partition.n_tags))
+    mentor_matrix = sparse.csr_matrix(
+        (np.ones(len(partition.mentor_indices), dtype=np.int32), partition.mentor_indices,
+         partition.mentor_indptr), shape=(n_mentors, partition.n_tags))
+    return (student_matrix @ mentor_matrix.T).toarray()
+
+
+def solve_partition(partition, top_k=None, solver='stable', audit=False):
+    """在工作进程中求解一个项目：返回 ({学生下标: 导师下标}, 总分, 各阶段耗时, 阻塞对)
+
+    audit=True 时求解后检查稳定性，阻塞对为 [(学生下标, 导师下标)]；否则为 None。
+    """
+    timings = {}
+    start = time.perf_counter()
+    n_students, n_mentors = partition.shape
+    if partition.tag_vectors is not None:
+        overlap = soft_overlap(_split(partition.student_indptr, partition.student_indices),
+                               _split(partition.mentor_indptr, partition.mentor_indices),
+                               partition.tag_vectors.__getitem__, partition.similarity_threshold)
+    else:
+        overlap = _exact_overlap(partition)
+    hours = shared_hours(partition.student_slots, partition.mentor_slots)
+    skill_eligible = skill_eligibility(partition.skills, partition.requirements)
+    timings['scores'] = time.perf_counter() - start
+
+    step = time.perf_counter()
+    students = list(range(n_students))
+    mentors = list(range(n_mentors))
+    matches = solve_project(overlap, hours, skill_eligible, students, mentors,
+                            partition.capacities.tolist(), top_k, solver)
+    timings['solve'] = time.perf_counter() - step
+    blocking = None
+    if audit:
+        step = time.perf_counter()
+        blocking = audit_project(overlap, hours, skill_eligible, students, mentors, partition.capacities,
+                                 matches, top_k)
+        timings['audit'] = time.perf_counter() - step
+    timings['total'] = time.perf_counter() - start
+    index = dict(zip(students, students))
+    return matches, matching_welfare(matches, overlap, index, index), timings, blocking
+
+
+def match_all_projects(system, project_names=None, top_k=None, workers=None, solver='stable', audit=None):
+    """一次求解多个项目的稳定匹配，各项目在进程池中并行计算
+
+    返回 ({项目名: ProjectResult}, 总耗时秒数)。workers 默认为 CPU 数；
+    只有一个项目或 workers=1 时在当前进程中直接计算。audit 默认沿用 system.audit，开启时各项目求解后检查稳定性。
+    """
+    start = time.perf_counter()
+    if audit is None:
+        audit = getattr(system, 'audit', False)
+    partitions = partition_projects(system, project_names)
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    solved = {}
+    if workers <= 1 or len(partitions) <= 1:
+        for project, (_, _, partition) in partitions.items():
+            solved[project] = solve_partition(partition, top_k, solver, audit)
+    else:
+        # 大项目先提交，减少最后只剩一个进程在算的时间
+        order = sorted(partitions, key=lambda p: -np.prod(partitions[p][2].shape))
+        with ProcessPoolExecutor(max_workers=min(workers, len(partitions))) as pool:
+            futures = {pool.submit(solve_partition, partitions[project][2], top_k, solver, audit): project
+                       for project in order}
+            for future in as_completed(futures):
+                solved[futures[future]] = future.result()
+
+    # 工作进程中的耗时随结果带回，在这里汇总到系统的性能指标
+    metrics = getattr(system, 'metrics', NULL_METRICS)
+    results = {}
+    for project, (student_ids, mentor_ids, partition) in partitions.items():
+        matches, welfare, timings, blocking = solved[project]
+        timings['pack'] = partition.pack_seconds
+        if metrics:
+            for phase in ('pack', 'scores', 'solve', 'audit'):
+                if phase in timings:
+                    metrics.add_time(f'batch.{phase}', timings[phase])
+            metrics.count('pairs_scored', int(np.prod(partition.shape)))
+            if blocking is not None:
+                metrics.count('blocking_pairs', len(blocking))
+        if blocking is not None:
+            blocking = [(student_ids[s], mentor_ids[m]) for s, m in blocking]
+        results[project] = ProjectResult(project, student_ids, mentor_ids,
+                                         {student_ids[s]: mentor_ids[m] for s, m in matches.items()},
+                                         welfare, timings, blocking)
+    return results, time.perf_counter() - start
@@ -0,0 +1,477 @@
+import argparse
+import json
+import platform
+import sys
+import time
+from datetime import datetime
+from operator import itemgetter
+
+import numpy as np
+
+from schedule import DAYS, week_mask
+from scoring import top_k_preferences
+from solvers import blocking_pairs, gale_shapley, hospitals_residents, matching_welfare, optimal_assignment
+
+
+def legacy_stable_marriage(students, mentors, student_prefs, mentor_prefs):
+    """改写前的稳定婚姻算法实现，仅用于对比基准"""
+    if not students or not mentors:
+        return {}
+
+    # 初始化所有学生和导师为自由状态
+    free_students = list(students)
+    free_mentors = list(mentors)
+
+    # 创建偏好字典
+    student_pref_dict = {s: {m: i for i, m in enumerate(prefs)}
+                         for s, prefs in zip(students, student_prefs)}
+    mentor_pref_dict = {m: {s: i for i, s in enumerate(prefs)}
+                        for m, prefs in zip(mentors, mentor_prefs)}
+
+    # 当前匹配状态
+    matches = {}
+    mentor_matches = {m: None for m in mentors}
+
+    while free_students:
+        student = free_students[0]
+        student_prefs = student_pref_dict[student]
+
+        # 找到学生尚未申请的最高优先级导师
+        for mentor in student_prefs:
+            if mentor in free_mentors:
+                # 直接匹配
+                matches[student] = mentor
+                mentor_matches[mentor] = student
+                free_students.remove(student)
+                free_mentors.remove(mentor)
+                break
+            else:
+                # 导师已经被匹配，检查是否更喜欢当前学生
+                current_match = mentor_matches[mentor]
+                if mentor_pref_dict[mentor][student] < mentor_pref_dict[mentor][current_match]:
+                    # 导师更喜欢新学生
+                    matches[student] = mentor
+                    mentor_matches[mentor] = student
+                    free_students.remove(student)
+                    free_students.append(current_match)
+                    break
+
+    return matches
+
+
+def random_complete_prefs(n_rows, n_cols, rng, chunk=1000):
+    """生成完整的随机偏好列表（每行是列编号的一个随机排列），各行共享同一批整数对象以节省内存"""
+    ids = list(range(n_cols))
+    prefs = []
+    for start in range(0, n_rows, chunk):
+        block = np.argsort(rng.random((min(chunk, n_rows - start), n_cols)), axis=1)
+        for row in block:
+            prefs.append(itemgetter(*row.tolist())(ids) if n_cols > 1 else tuple(ids))
+    return prefs
+
+
+def timed(func, *args):
+    """返回 (结果, 耗时秒数)"""
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def popular_prefs(n_rows, n_cols, rng):
+    """所有学生对导师的排序相同（热门导师），提议次数约为 n²/2，是算法的最坏情形"""
+    shared = random_complete_prefs(1, n_cols, rng)[0]
+    return [shared] * n_rows
+
+
+INSTANCES = {
+    'random': random_complete_prefs,
+    'popular': popular_prefs,
+}
+
+
+def bench_stable_marriage(sizes, legacy_max, seed, kind='random'):
+    """对比新旧稳定婚姻算法在 n×n 完整偏好下的耗时"""
+    rows = []
+    for n in sizes:
+        rng = np.random.default_rng(seed)
+        students = list(range(n))
+        mentors = list(range(n))
+        student_prefs = INSTANCES[kind](n, n, rng)
+        mentor_prefs = random_complete_prefs(n, n, rng)
+
+        new_matches, new_seconds = timed(gale_shapley, students, mentors, student_prefs, mentor_prefs)
+        row = {'kind': kind, 'n': n, 'new': new_seconds, 'legacy': None, 'same': None}
+        if n <= legacy_max:
+            old_matches, row['legacy'] = timed(legacy_stable_marriage, students, mentors,
+                                               student_prefs, mentor_prefs)
+            row['same'] = old_matches == new_matches
+        rows.append(row)
+        del student_prefs, mentor_prefs
+    return rows
+
+
+def bench_assignment(n_students, n_mentors, seed, n_tags=200):
+    """对比带容量稳定匹配与总分最优分配在 学生×导师 稠密实例上的耗时和总分"""
+    rng = np.random.default_rng(seed)
+    student_tags = rng.random((n_students, n_tags)) < 0.03
+    mentor_tags = rng.random((n_mentors, n_tags)) < 0.05
+    overlap = student_tags.astype(np.int32) @ mentor_tags.T.astype(np.int32)
+    eligible = rng.random((n_students, n_mentors)) < 0.8
+    capacities = rng.integers(1, 11, n_mentors).tolist()
+    students = list(range(n_students))
+    mentors = list(range(n_mentors))
+
+    def stable():
+        student_prefs = top_k_preferences(overlap, mentors, mask=overlap > 0)
+        mentor_prefs = top_k_preferences(overlap.T, students, mask=eligible.T)
+        return hospitals_residents(students, mentors, student_prefs, mentor_prefs, capacities)
+
+    stable_matches, stable_seconds = timed(stable)
+    optimal_matches, optimal_seconds = timed(optimal_assignment, students, mentors, overlap, capacities,
+                                             eligible & (overlap > 0))
+    index = dict(zip(students, students))
+    return {
+        'size': f"{n_students}×{n_mentors}",
+        'stable': stable_seconds,
+        'optimal': optimal_seconds,
+        'stable_welfare': matching_welfare(stable_matches, overlap, index, index),
+        'optimal_welfare': matching_welfare(optimal_matches, overlap, index, index),
+    }
+
+
+SKILL_LEVELS = (0.05, 0.20, 0.40, 0.25, 0.10)  # 网页版技能 1~5 各档的比例
+
+
+class SyntheticData:
+    """可复现的模拟画像：兴趣标签按 Zipf 分布抽取（少数热门方向、大量冷门方向），
+    每人 1~6 个兴趣，分数/技能、导师要求和指导人数也按接近真实数据的分布生成"""
+
+    def __init__(self, n_students, n_mentors=None, seed=0, n_tags=None, zipf=1.1):
+        self.n_students = n_students
+        self.n_mentors = n_mentors if n_mentors is not None else max(1, n_students // 10)
+        self.rng = np.random.default_rng(seed)
+        # 词表随规模增长但远小于人数
+        self.n_tags = n_tags if n_tags is not None else int(min(5000, max(50, 20 * np.sqrt(n_students))))
+        weights = 1.0 / np.arange(1, self.n_tags + 1) ** zipf
+        self.tag_probabilities = weights / weights.sum()
+        self.tags = [f"方向{i}" for i in range(self.n_tags)]
+
+    def interests(self, n):
+        """n 人的兴趣列表，每人的标签去重"""
+        counts = np.clip(self.rng.poisson(2.5, n), 1, 6)
+        drawn = self.rng.choice(self.n_tags, int(counts.sum()), p=self.tag_probabilities)
+        tags = self.tags
+        return [[tags[code] for code in dict.fromkeys(chunk.tolist())]
+                for chunk in np.split(drawn, np.cumsum(counts)[:-1])]
+
+    def capacities(self):
+        return np.clip(1 + self.rng.poisson(2.0, self.n_mentors), 1, 10).tolist()
+
+    def core(self):
+        """命令行版（matching_system）的 (学生列表, 导师列表)，元素为 (id, 画像)"""
+        rng = self.rng
+        scores = np.clip(rng.normal(75, 12, (self.n_students, 3)), 0, 100).round().tolist()
+        required = np.clip(rng.normal(60, 10, (self.n_mentors, 3)), 0, 100).round().tolist()
+        ages = rng.integers(18, 26, self.n_students).tolist()
+        students = [(f"s{i}", {'interests': interests,
+                               'scores': {'math': s[0], 'english': s[1], 'programming': s[2]},
+                               'other_info': {'name': f"学生{i}", 'age': age}})
+                    for i, (interests, s, age) in enumerate(zip(self.interests(self.n_students), scores, ages))]
+        mentors = [(f"m{j}", {'interests': interests,
+                              'requirements': {'min_math': r[0], 'min_english': r[1], 'min_programming': r[2]},
+                              'other_info': {'name': f"导师{j}", 'age': 45, 'max_students': capacity}})
+                   for j, (interests, r, capacity) in enumerate(zip(self.interests(self.n_mentors), required,
+                                                                    self.capacities()))]
+        return students, mentors
+
+    def _availability(self, n, project_info):
+        """约七成确认项目时间，其余填写每周两天的空闲时段"""
+        rng = self.rng
+        confirmed = rng.random(n) < 0.7
+        starts = rng.integers(8, 16, n).tolist()
+        lengths = rng.integers(2, 6, n).tolist()
+        result = []
+        for i in range(n):
+            availability = {'matches_project': bool(confirmed[i]),
+                            'project_days': project_info['activity_days'],
+                            'project_start_time': project_info['weekly_start_time'],
+                            'project_end_time': project_info['weekly_end_time']}
+            if not confirmed[i]:
+                days = [DAYS[day] for day in rng.choice(len(DAYS), 2, replace=False).tolist()]
+                availability['weekly_slots'] = week_mask(days, starts[i], starts[i] + lengths[i])
+            result.append(availability)
+        return result
+
+    def app(self, project_info):
+        """网页版（app）的 (学生列表, 导师列表)，全部属于 project_info 这个项目"""
+        rng = self.rng
+        project = project_info['name']
+        skills = (rng.choice(5, (self.n_students, 3), p=SKILL_LEVELS) + 1).tolist()
+        required = np.clip(rng.choice(5, (self.n_mentors, 3), p=SKILL_LEVELS), 1, 5).tolist()
+        students = [(f"{project}_s{i}", {'interests': interests,
+                                         'skills': {'math': k[0], 'programming': k[1], 'english': k[2]},
+                                         'availability': availability,
+                                         'other_info': {'name': f"学生{i}", 'project': project}})
+                    for i, (interests, k, availability) in enumerate(zip(
+                        self.interests(self.n_students), skills,
+                        self._availability(self.n_students, project_info)))]
+        mentors = [(f"{project}_m{j}", {'research_areas': interests,
+                                        'requirements': {'min_math': r[0], 'min_programming': r[1],
+                                                         'min_english': r[2]},
+                                        'availability': availability,
+                                        'other_info': {'name': f"导师{j}", 'max_students': capacity,
+                                                       'project': project}})
+                   for j, (interests, r, availability, capacity) in enumerate(zip(
+                       self.interests(self.n_mentors), required,
+                       self._availability(self.n_mentors, project_info), self.capacities()))]
+        return students, mentors
+
+
+def sparse_preferences(n_students, n_mentors, top_k, seed=0):
+    """不需要稠密矩阵的带容量实例：每名学生随机选 top_k 位导师、按导师热门程度排序，
+    导师只排序选了自己的学生（按统一的学生成绩），返回 (学生偏好, 导师偏好, 导师容量, 按成绩排列的学生)，编号为整数"""
+    rng = np.random.default_rng(seed)
+    popularity = rng.random(n_mentors)
+    picks = rng.integers(0, n_mentors, (n_students, top_k))
+    picks = np.take_along_axis(picks, np.argsort(-popularity[picks], axis=1, kind='stable'), axis=1)
+    # 排序后重复选中的导师相邻，只保留一次
+    keep = np.ones(picks.shape, dtype=bool)
+    keep[:, 1:] = picks[:, 1:] != picks[:, :-1]
+    lengths = keep.sum(axis=1)
+    flat = picks[keep]
+    student_prefs = [row.tolist() for row in np.split(flat, np.cumsum(lengths)[:-1])]
+
+    grades = rng.random(n_students)
+    applicants = np.repeat(np.arange(n_students), lengths)
+    order = np.lexsort((-grades[applicants], flat))
+    counts = np.bincount(flat, minlength=n_mentors)
+    mentor_prefs = [row.tolist() for row in np.split(applicants[order], np.cumsum(counts)[:-1])]
+    capacities = np.clip(1 + rng.poisson(2.0, n_mentors), 1, 10).tolist()
+    return student_prefs, mentor_prefs, capacities, np.argsort(-grades).tolist()
+
+
+def serial_dictatorship(student_prefs, capacities, ranking):
+    """按 ranking 的顺序让学生依次选择偏好中第一位还有名额的导师
+
+    导师都按同一份学生排名排序时，这就是唯一的稳定匹配，且不需要导师的名次数组。
+    """
+    remaining = list(capacities)
+    matches = {}
+    for s in ranking:
+        for m in student_prefs[s]:
+            if remaining[m] > 0:
+                remaining[m] -= 1
+                matches[s] = m
+                break
+    return matches
+
+
+SUITE_PROJECT = {'name': 'bench', 'activity_days': ["周二", "周四"],
+                 'weekly_start_time': '14:00', 'weekly_end_time': '17:00'}
+
+
+def _best_of(repeat, func, *args):
+    """重复 repeat 次取最短耗时，返回 (最后一次的结果, 秒数)"""
+    best = None
+    for _ in range(repeat):
+        result, seconds = timed(func, *args)
+        best = seconds if best is None else min(best, seconds)
+    return result, best
+
+
+def suite_size(n_students, seed=0, top_k=10, repeat=3, max_cells=5e7):
+    """对一个规模运行全部测量项，返回 [{'target', 'students', 'mentors', 'seconds', ...}]
+
+    需要 学生×导师 稠密矩阵的测量项在单元数超过 max_cells 时跳过（记录 skipped），
+    百万级规模下只测量数据生成和画像写入。
+    """
+    from matching_system import MatchingSystem, stable_marriage
+    import app
+
+    data = SyntheticData(n_students, seed=seed)
+    n_mentors = data.n_mentors
+    dense = n_students * n_mentors <= max_cells
+    rows = []
+
+    def record(target, func, *args, pairwise=True, extra=None, runs=None):
+        if pairwise and not dense:
+            rows.append({'target': target, 'students': n_students, 'mentors': n_mentors, 'seconds': None,
+                         'skipped': f"学生×导师 {n_students * n_mentors:.0f} 个单元超过 max_cells"})
+            return None
+        result, seconds = _best_of(runs or repeat, func, *args)
+        row = {'target': target, 'students': n_students, 'mentors': n_mentors, 'seconds': seconds}
+        if extra is not None:
+            row.update(extra(result))
+        rows.append(row)
+        return result
+
+    students, mentors = record('synthetic.core', data.core, pairwise=False, runs=1)
+    system = MatchingSystem(method='hybrid')
+    record('core.add_profiles', lambda: (system.add_students(students), system.add_mentors(mentors)),
+           pairwise=False, runs=1)
+    del students, mentors
+
+    def fresh_scores():
+        # score_matrix 会按画像版本缓存，计时时每次都重新计算
+        system._score_matrix_version = None
+        return system.score_matrix()
+
+    scores = record('core.score_matrix', fresh_scores)
+    record('RuleBasedMatcher.match', system.rule_based_matcher.match, system.students, system.mentors, scores)
+    record('RuleBasedMatcher.get_candidates', system.rule_based_matcher.get_candidates,
+           system.students, system.mentors, system.mentor_index, system.student_store.lookup('codes'),
+           extra=lambda candidates: {'candidates': len(candidates)})
+    record('generate_recommendations[hybrid]', system.generate_recommendations,
+           extra=lambda matches: {'matched': len(matches)})
+    if dense:
+        student_ids, mentor_ids = scores.student_ids, scores.mentor_ids
+        eligible = system.eligibility(student_ids, mentor_ids)
+        student_prefs = top_k_preferences(scores.overlap, mentor_ids, top_k)
+        mentor_prefs = top_k_preferences(scores.overlap.T, student_ids, top_k, eligible.T)
+    matches = record('stable_marriage',
+                     lambda: stable_marriage(student_ids, mentor_ids, student_prefs, mentor_prefs),
+                     extra=lambda matches: {'matched': len(matches)})
+    record('blocking_pairs[stable_marriage]',
+           lambda: blocking_pairs(student_ids, mentor_ids, student_prefs, mentor_prefs, matches,
+                                  unlisted_acceptable=True),
+           extra=lambda pairs: {'blocking_pairs': len(pairs)})
+    del system, scores
+
+    students, mentors = record('synthetic.app', data.app, SUITE_PROJECT, pairwise=False, runs=1)
+    web = app.MatchingSystem(method='hybrid')
+    # 写入画像不是幂等操作（第二次为更新），只计时一次
+    record('app.add_profiles', lambda: (web.add_students(students), web.add_mentors(mentors)),
+           pairwise=False, runs=1)
+    del students, mentors
+    student_ids, mentor_ids = web.project_members(SUITE_PROJECT['name'])
+    matrices = record('app.pair_matrices', web.pair_matrices, student_ids, mentor_ids)
+    if dense:
+        from batch import project_preferences
+        student_prefs, mentor_prefs = project_preferences(*matrices, student_ids, mentor_ids, top_k)
+    matches = record('app.finalize_matches',
+                     lambda: web.finalize_matches(student_ids, mentor_ids, student_prefs, mentor_prefs),
+                     extra=lambda matches: {'matched': len(matches)})
+    record('blocking_pairs[finalize_matches]',
+           lambda: blocking_pairs(student_ids, mentor_ids, student_prefs, mentor_prefs, matches,
+                                  web.mentor_capacities(mentor_ids)),
+           extra=lambda pairs: {'blocking_pairs': len(pairs)})
+    del web, matrices
+
+    # 稀疏偏好的带容量实例不需要稠密矩阵，百万级规模下也运行，用于测量求解和稳定性检查
+    student_prefs, mentor_prefs, capacities, ranking = record(
+        'synthetic.sparse_preferences', sparse_preferences, n_students, n_mentors, top_k, seed,
+        pairwise=False, runs=1)
+    student_ids, mentor_ids = list(range(n_students)), list(range(n_mentors))
+    matches = record('serial_dictatorship[sparse]', serial_dictatorship, student_prefs, capacities, ranking,
+                     pairwise=False, runs=1, extra=lambda matches: {'matched': len(matches)})
+    # 导师的偏好列表很短，hospitals_residents 用名次字典，百万级规模下也能运行
+    matches = record('hospitals_residents[sparse]', hospitals_residents, student_ids, mentor_ids,
+                     student_prefs, mentor_prefs, capacities, pairwise=False, runs=1,
+                     extra=lambda solved: {'matched': len(solved), 'same': solved == matches})
+    record('blocking_pairs[sparse]', blocking_pairs, student_ids, mentor_ids, student_prefs, mentor_prefs,
+           matches, capacities, pairwise=False, extra=lambda pairs: {'blocking_pairs': len(pairs)})
+    return rows
+
+
+def run_suite(sizes, seed=0, top_k=10, repeat=3, max_cells=5e7):
+    """运行基准套件，返回可直接写成 JSON 的结果"""
+    results = []
+    for n in sizes:
+        results.extend(suite_size(n, seed, top_k, repeat, max_cells))
+    return {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'seed': seed,
+        'top_k': top_k,
+        'repeat': repeat,
+        'results': results,
+    }
+
+
+def compare_results(current, baseline, tolerance=1.25, min_seconds=0.01):
+    """与基线结果比较：耗时超过 基线×tolerance（且差值超过 min_seconds）的项记为性能回退
+
+    返回 [(测量项, 学生数, 基线秒数, 当前秒数)]。
+    """
+    previous = {(row['target'], row['students']): row['seconds'] for row in baseline['results']}
+    regressions = []
+    for row in current['results']:
+        old = previous.get((row['target'], row['students']))
+        new = row['seconds']
+        if old is None or new is None:
+            continue
+        if new > old * tolerance and new - old > min_seconds:
+            regressions.append((row['target'], row['students'], old, new))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="稳定婚姻算法性能基准")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[500, 1000, 2000, 10000],
+                        help="学生数=导师数 的规模列表")
+    parser.add_argument('--legacy-max', type=int, default=2000,
+                        help="旧算法只在不超过该规模时运行（旧算法在 10000×10000 上需要数小时）")
+    parser.add_argument('--kinds', nargs='+', choices=sorted(INSTANCES), default=['random', 'popular'],
+                        help="偏好类型：random 为完全随机，popular 为所有学生偏好相同")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--assignment', type=int, nargs=2, metavar=('学生数', '导师数'),
+                        help="改为对比稳定匹配与总分最优分配，例如 --assignment 5000 500")
+    parser.add_argument('--suite', type=int, nargs='+', metavar='学生数',
+                        help="在模拟数据上运行全部匹配器的基准套件，例如 --suite 100 1000 10000 1000000")
+    parser.add_argument('--output', help="基准套件结果写入的 JSON 文件")
+    parser.add_argument('--baseline', help="与之比较的历史 JSON 结果，出现性能回退时以状态码1退出")
+    parser.add_argument('--tolerance', type=float, default=1.25, help="允许的耗时增长倍数")
+    parser.add_argument('--repeat', type=int, default=3, help="每项重复次数，取最短耗时")
+    parser.add_argument('--top-k', type=int, default=10, help="套件中每人保留的偏好数量")
+    parser.add_argument('--max-cells', type=float, default=5e7,
+                        help="学生×导师 超过该单元数时跳过需要稠密矩阵的测量项")
+    args = parser.parse_args()
+
+    if args.suite:
+        report = run_suite(args.suite, args.seed, args.top_k, args.repeat, args.max_cells)
+        print(f"{'测量项':<36} {'学生数':>9} {'导师数':>8} {'耗时(s)':>10}")
+        for row in report['results']:
+            seconds = '跳过' if row['seconds'] is None else f"{row['seconds']:.4f}"
+            print(f"{row['target']:<36} {row['students']:>9} {row['mentors']:>8} {seconds:>10}")
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+        # 稳定匹配的结果出现阻塞对说明求解器有错误
+        unstable = [row for row in report['results'] if row.get('blocking_pairs')]
+        for row in unstable:
+            print(f"稳定性检查失败: {row['target']} (学生数 {row['students']}) 发现 {row['blocking_pairs']} 个阻塞对")
+        if args.baseline:
+            with open(args.baseline, encoding='utf-8') as f:
+                baseline = json.load(f)
+            regressions = compare_results(report, baseline, args.tolerance)
+            for target, n, old, new in regressions:
+                print(f"性能回退: {target} (学生数 {n}) {old:.4f}s -> {new:.4f}s")
+            if regressions:
+                sys.exit(1)
+        if unstable:
+            sys.exit(1)
+        return
+
+    if args.assignment:
+        row = bench_assignment(*args.assignment, args.seed)
+        gap = row['optimal_welfare'] - row['stable_welfare']
+        print(f"规模 {row['size']}: 稳定匹配 {row['stable']:.3f}s 总分 {row['stable_welfare']:.0f}；"
+              f"总分最优 {row['optimal']:.3f}s 总分 {row['optimal_welfare']:.0f}；差距 {gap:.0f}")
+        return
+
+    print(f"{'偏好':>8} {'规模':>12} {'新算法(s)':>10} {'旧算法(s)':>10} {'加速比':>8} {'结果一致':>6}")
+    for kind in args.kinds:
+        for row in bench_stable_marriage(args.sizes, args.legacy_max, args.seed, kind):
+            size = f"{row['n']}×{row['n']}"
+            if row['legacy'] is None:
+                print(f"{kind:>8} {size:>12} {row['new']:>10.3f} {'-':>10} {'-':>8} {'-':>6}")
+            else:
+                speedup = row['legacy'] / row['new'] if row['new'] else float('inf')
+                print(f"{kind:>8} {size:>12} {row['new']:>10.3f} {row['legacy']:>10.3f} "
+                      f"{speedup:>7.1f}x {str(row['same']):>6}")
+
+
+if __name__ == "__main__":
+    main()
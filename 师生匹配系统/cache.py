@@ -0,0 +1,138 @@
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+
+
+class MatchComputation:
+    """一个项目一次匹配计算的中间结果
+
+    matrices 为 学生×导师 的逐对矩阵 (共同领域数, 每周共同空闲小时数, 技能满足)，
+    results 按 (求解方法, 偏好截断数 top_k) 保存匹配结果 {学生: 导师}，
+    audits 按同样的键保存稳定性检查找到的阻塞对（开启检查时）。
+    """
+
+    def __init__(self, student_ids, mentor_ids, student_fingerprints, mentor_fingerprints, matrices):
+        self.student_ids = list(student_ids)
+        self.mentor_ids = list(mentor_ids)
+        self.student_fingerprints = list(student_fingerprints)
+        self.mentor_fingerprints = list(mentor_fingerprints)
+        self.matrices = matrices
+        self.results = {}
+        self.audits = {}
+
+
+def content_key(student_ids, mentor_ids, student_fingerprints, mentor_fingerprints):
+    """项目内容的哈希：成员及其顺序、每个画像的指纹都参与计算"""
+    digest = hashlib.blake2b(digest_size=16)
+    for role, ids, fingerprints in (('S', student_ids, student_fingerprints),
+                                    ('M', mentor_ids, mentor_fingerprints)):
+        for person_id, fingerprint in zip(ids, fingerprints):
+            digest.update(f"{role}\x1f{person_id}\x1f{fingerprint}\x1e".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _reusable(previous_ids, previous_fingerprints, ids, fingerprints):
+    """返回 (可复用的新下标, 对应的旧下标, 需要重算的新下标)"""
+    old_position = {person_id: i for i, person_id in enumerate(previous_ids)}
+    kept_new, kept_old, changed = [], [], []
+    for i, (person_id, fingerprint) in enumerate(zip(ids, fingerprints)):
+        j = old_position.get(person_id)
+        if j is not None and previous_fingerprints[j] == fingerprint:
+            kept_new.append(i)
+            kept_old.append(j)
+        else:
+            changed.append(i)
+    return kept_new, kept_old, changed
+
+
+def patch_matrices(previous, student_ids, mentor_ids, student_fingerprints, mentor_fingerprints, compute):
+    """复用上一次计算中画像未变的行/列，只为新增或修改的学生（行）和导师（列）调用 compute 重算
+
+    compute(学生id列表, 导师id列表) 返回与 previous.matrices 同样排列的矩阵元组。
+    返回 (新矩阵元组, 重算的行数, 重算的列数)。
+    """
+    kept_rows, old_rows, changed_rows = _reusable(previous.student_ids, previous.student_fingerprints,
+                                                  student_ids, student_fingerprints)
+    kept_cols, old_cols, changed_cols = _reusable(previous.mentor_ids, previous.mentor_fingerprints,
+                                                  mentor_ids, mentor_fingerprints)
+    shape = (len(student_ids), len(mentor_ids))
+    patched = [np.empty(shape, dtype=old.dtype) for old in previous.matrices]
+    for new, old in zip(patched, previous.matrices):
+        new[np.ix_(kept_rows, kept_cols)] = old[np.ix_(old_rows, old_cols)]
+
+    if changed_rows and mentor_ids:
+        rows = compute([student_ids[i] for i in changed_rows], mentor_ids)
+        for new, values in zip(patched, rows):
+            new[changed_rows, :] = values
+    if changed_cols and kept_rows:
+        cols = compute([student_ids[i] for i in kept_rows], [mentor_ids[j] for j in changed_cols])
+        for new, values in zip(patched, cols):
+            new[np.ix_(kept_rows, changed_cols)] = values
+    return tuple(patched), len(changed_rows), len(changed_cols)
+
+
+class MatchCache:
+    """按项目内容哈希缓存匹配计算，超过容量时淘汰最久未使用的条目
+
+    内容完全相同时直接命中；否则以该项目最近一次的计算为基础，
+    只重算画像发生变化的行/列（见 patch_matrices）。
+    """
+
+    def __init__(self, max_entries=16):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        # 项目名 -> 最近一次计算的内容哈希
+        self.latest = {}
+        self.hits = 0
+        self.misses = 0
+        self.patched = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        """命中时把条目移到最近使用的位置"""
+        computation = self.entries.get(key)
+        if computation is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return computation
+
+    def previous(self, project_name):
+        """该项目最近一次的计算（可能已被淘汰）"""
+        return self.entries.get(self.latest.get(project_name))
+
+    def put(self, project_name, key, computation):
+        self.entries[key] = computation
+        self.entries.move_to_end(key)
+        self.latest[project_name] = key
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+        self.latest.clear()
+
+    def compute(self, project_name, student_ids, mentor_ids, student_fingerprints, mentor_fingerprints,
+                pairwise):
+        """取得项目的计算结果：命中则直接返回，否则在上一次的基础上增量重算或全部重算"""
+        key = content_key(student_ids, mentor_ids, student_fingerprints, mentor_fingerprints)
+        computation = self.get(key)
+        if computation is not None:
+            self.latest[project_name] = key
+            return computation
+
+        previous = self.previous(project_name)
+        if previous is None:
+            matrices = pairwise(student_ids, mentor_ids)
+        else:
+            matrices, _, _ = patch_matrices(previous, student_ids, mentor_ids,
+                                            student_fingerprints, mentor_fingerprints, pairwise)
+            self.patched += 1
+        computation = MatchComputation(student_ids, mentor_ids, student_fingerprints, mentor_fingerprints,
+                                       matrices)
+        self.put(project_name, key, computation)
+        return computation
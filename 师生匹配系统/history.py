@@ -0,0 +1,264 @@
+import json
+import os
+import time
+
+import numpy as np
+
+# 日志中每条匹配记录的定长二进制格式；兴趣标签编号另存于 .tags 文件，记录中保存其起始位置
+RECORD = np.dtype([
+    ('student', '<i4'),
+    ('mentor', '<i4'),
+    ('success', 'u1'),
+    ('n_student_tags', '<u2'),
+    ('n_mentor_tags', '<u2'),
+    ('tag_offset', '<i8'),
+    ('timestamp', '<f8'),
+])
+TAG = np.dtype('<i4')
+
+
+class _Counts:
+    """按编号累计 (尝试次数, 成功次数)，数组按需倍增"""
+
+    def __init__(self, attempts=None, successes=None):
+        self.attempts = np.zeros(16, dtype=np.int64) if attempts is None else attempts.astype(np.int64)
+        self.successes = np.zeros(16, dtype=np.int64) if successes is None else successes.astype(np.int64)
+
+    def _grow(self, size):
+        if size <= len(self.attempts):
+            return
+        capacity = max(size, 2 * len(self.attempts))
+        for name in ('attempts', 'successes'):
+            grown = np.zeros(capacity, dtype=np.int64)
+            old = getattr(self, name)
+            grown[:len(old)] = old
+            setattr(self, name, grown)
+
+    def add(self, codes, success):
+        """codes 可以是单个编号或编号数组"""
+        codes = np.atleast_1d(codes)
+        if len(codes) == 0:
+            return
+        self._grow(int(codes.max()) + 1)
+        np.add.at(self.attempts, codes, 1)
+        np.add.at(self.successes, codes, np.asarray(success, dtype=np.int64))
+
+    def get(self, code):
+        if code is None or code >= len(self.attempts):
+            return 0, 0
+        return int(self.attempts[code]), int(self.successes[code])
+
+
+class MatchHistory:
+    """只追加的匹配历史日志，并随每次写入更新按导师、按学生、按兴趣标签对统计的成功率
+
+    path 为 None 时只保存在内存中。保存到磁盘时使用以下文件：
+    - path：定长二进制记录（见 RECORD），重新打开时以内存映射读取；
+    - path.tags：每条记录双方的兴趣标签编号；
+    - path.ids：学生/导师id和标签的编号表（每个新值追加一行）；
+    - path.snapshot.npz：统计快照及其覆盖的记录数，启动时只需重放快照之后的记录。
+    """
+
+    def __init__(self, path=None, snapshot_every=10000):
+        self.path = path
+        self.snapshot_every = snapshot_every
+        self.codes = {'student': {}, 'mentor': {}, 'tag': {}}
+        self.names = {'student': [], 'mentor': [], 'tag': []}
+        self.students = _Counts()
+        self.mentors = _Counts()
+        # (学生兴趣标签编号, 导师兴趣标签编号) -> [尝试次数, 成功次数]
+        self.pairs = {}
+        self.count = 0
+        self.snapshot_count = 0
+        self._records = []
+        self._tags = []
+        self._n_tags = 0
+        if path is not None:
+            self._open()
+
+    def __len__(self):
+        return self.count
+
+    def _code(self, kind, value, new_ids):
+        code = self.codes[kind].get(value)
+        if code is None:
+            code = self.codes[kind][value] = len(self.names[kind])
+            self.names[kind].append(value)
+            new_ids.append({'k': kind, 'v': value})
+        return code
+
+    def append(self, student_id, mentor_id, success, student_tags=(), mentor_tags=()):
+        """追加一条匹配记录，并立即更新各项统计"""
+        new_ids = []
+        student = self._code('student', student_id, new_ids)
+        mentor = self._code('mentor', mentor_id, new_ids)
+        tags = np.array([self._code('tag', tag, new_ids) for tag in student_tags] +
+                        [self._code('tag', tag, new_ids) for tag in mentor_tags], dtype=TAG)
+        record = np.zeros(1, dtype=RECORD)
+        record[0] = (student, mentor, bool(success), len(student_tags), len(mentor_tags),
+                     self._n_tags, time.time())
+
+        if self.path is not None:
+            # 先写编号表和标签，再写记录：记录出现时它引用的数据一定已经存在
+            if new_ids:
+                with open(self.path + '.ids', 'a', encoding='utf-8') as f:
+                    f.writelines(json.dumps(item, ensure_ascii=False) + '\n' for item in new_ids)
+            with open(self.path + '.tags', 'ab') as f:
+                f.write(tags.tobytes())
+            with open(self.path, 'ab') as f:
+                f.write(record.tobytes())
+        else:
+            self._records.append(record)
+            self._tags.append(tags)
+        self._n_tags += len(tags)
+        self.count += 1
+        self._apply(record, tags)
+
+        if self.path is not None and self.count - self.snapshot_count >= self.snapshot_every:
+            self.snapshot()
+
+    def _apply(self, records, tags):
+        """把一批记录计入统计；tags 为这批记录引用的标签编号（从第一条记录的 tag_offset 开始）"""
+        if len(records) == 0:
+            return
+        success = records['success'].astype(np.int64)
+        self.students.add(records['student'], success)
+        self.mentors.add(records['mentor'], success)
+
+        # 每条记录展开为 学生标签×导师标签 的全部组合
+        n_student = records['n_student_tags'].astype(np.int64)
+        n_mentor = records['n_mentor_tags'].astype(np.int64)
+        per_record = n_student * n_mentor
+        total = int(per_record.sum())
+        if total == 0:
+            return
+        record_of = np.repeat(np.arange(len(records)), per_record)
+        position = np.arange(total) - np.repeat(np.cumsum(per_record) - per_record, per_record)
+        offset = records['tag_offset'] - records['tag_offset'][0]
+        left = tags[offset[record_of] + position // n_mentor[record_of]].astype(np.int64)
+        right = tags[offset[record_of] + n_student[record_of] + position % n_mentor[record_of]].astype(np.int64)
+        keys, inverse = np.unique(np.stack([left, right], axis=1), axis=0, return_inverse=True)
+        attempts = np.bincount(inverse.ravel(), minlength=len(keys))
+        successes = np.bincount(inverse.ravel(), weights=success[record_of], minlength=len(keys))
+        for (a, b), n, k in zip(keys.tolist(), attempts.tolist(), successes.tolist()):
+            counts = self.pairs.setdefault((a, b), [0, 0])
+            counts[0] += n
+            counts[1] += int(k)
+
+    def records(self):
+        """全部记录的结构化数组（磁盘模式下为只读内存映射）"""
+        if self.path is None:
+            return np.concatenate(self._records) if self._records else np.zeros(0, dtype=RECORD)
+        if self.count == 0:
+            return np.zeros(0, dtype=RECORD)
+        return np.memmap(self.path, dtype=RECORD, mode='r', shape=(self.count,))
+
+    def _tag_array(self):
+        if self.path is None:
+            return np.concatenate(self._tags) if self._tags else np.zeros(0, dtype=TAG)
+        if self._n_tags == 0:
+            return np.zeros(0, dtype=TAG)
+        return np.memmap(self.path + '.tags', dtype=TAG, mode='r', shape=(self._n_tags,))
+
+    def pairs_arrays(self):
+        """(学生id列表, 导师id列表, 是否成功数组)，供模型训练直接使用"""
+        records = self.records()
+        students = self.names['student']
+        mentors = self.names['mentor']
+        return ([students[code] for code in records['student'].tolist()],
+                [mentors[code] for code in records['mentor'].tolist()],
+                records['success'].astype(bool))
+
+    def __iter__(self):
+        """兼容原来的 historical_matches 列表：逐条返回 {'学生Id', '导师Id', 'success'}"""
+        for student_id, mentor_id, success in zip(*self.pairs_arrays()):
+            yield {'学生Id': student_id, '导师Id': mentor_id, 'success': bool(success)}
+
+    @staticmethod
+    def _rate(attempts, successes):
+        return (successes / attempts) if attempts else None
+
+    def student_stats(self, student_id):
+        """学生的 (尝试次数, 成功次数)"""
+        return self.students.get(self.codes['student'].get(student_id))
+
+    def mentor_stats(self, mentor_id):
+        """导师的 (尝试次数, 成功次数)"""
+        return self.mentors.get(self.codes['mentor'].get(mentor_id))
+
+    def pair_stats(self, student_tag, mentor_tag):
+        """学生兴趣标签与导师兴趣标签组合的 (尝试次数, 成功次数)"""
+        a = self.codes['tag'].get(student_tag)
+        b = self.codes['tag'].get(mentor_tag)
+        return tuple(self.pairs.get((a, b), (0, 0)))
+
+    def student_rate(self, student_id):
+        """学生的匹配成功率，没有记录时为 None"""
+        return self._rate(*self.student_stats(student_id))
+
+    def mentor_rate(self, mentor_id):
+        """导师的匹配成功率，没有记录时为 None"""
+        return self._rate(*self.mentor_stats(mentor_id))
+
+    def pair_rate(self, student_tag, mentor_tag):
+        """兴趣标签组合的匹配成功率，没有记录时为 None"""
+        return self._rate(*self.pair_stats(student_tag, mentor_tag))
+
+    def snapshot(self):
+        """保存当前统计的快照，下次打开时只重放快照之后追加的记录"""
+        if self.path is None:
+            return
+        keys = np.array(list(self.pairs.keys()), dtype=np.int64).reshape(-1, 2)
+        values = np.array(list(self.pairs.values()), dtype=np.int64).reshape(-1, 2)
+        temporary = self.path + '.snapshot.tmp'
+        with open(temporary, 'wb') as f:
+            np.savez(f, count=self.count,
+                     student_attempts=self.students.attempts, student_successes=self.students.successes,
+                     mentor_attempts=self.mentors.attempts, mentor_successes=self.mentors.successes,
+                     pair_keys=keys, pair_counts=values)
+        os.replace(temporary, self.path + '.snapshot.npz')
+        self.snapshot_count = self.count
+
+    def close(self):
+        self.snapshot()
+
+    def _open(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if os.path.exists(self.path + '.ids'):
+            with open(self.path + '.ids', encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        item = json.loads(line)
+                        self.codes[item['k']][item['v']] = len(self.names[item['k']])
+                        self.names[item['k']].append(item['v'])
+        size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        self.count = size // RECORD.itemsize
+        self._n_tags = 0
+        if self.count:
+            last = self.records()[-1]
+            self._n_tags = int(last['tag_offset']) + int(last['n_student_tags']) + int(last['n_mentor_tags'])
+        # 写入中断时末尾可能留下不完整的记录或没有记录引用的标签，截掉以保证后续追加的位置正确
+        for name, length in ((self.path, self.count * RECORD.itemsize),
+                             (self.path + '.tags', self._n_tags * TAG.itemsize)):
+            if os.path.exists(name) and os.path.getsize(name) > length:
+                os.truncate(name, length)
+        if self.count == 0:
+            return
+        records = self.records()
+
+        start = 0
+        if os.path.exists(self.path + '.snapshot.npz'):
+            with np.load(self.path + '.snapshot.npz') as data:
+                if int(data['count']) <= self.count:
+                    start = int(data['count'])
+                    self.students = _Counts(data['student_attempts'], data['student_successes'])
+                    self.mentors = _Counts(data['mentor_attempts'], data['mentor_successes'])
+                    self.pairs = {(a, b): [n, k] for (a, b), (n, k) in
+                                  zip(data['pair_keys'].tolist(), data['pair_counts'].tolist())}
+        self.snapshot_count = start
+        tail = records[start:]
+        if len(tail):
+            first = int(tail['tag_offset'][0])
+            self._apply(np.asarray(tail), np.asarray(self._tag_array()[first:]))
@@ -0,0 +1,215 @@
+import heapq
+from bisect import bisect_left, insort
+from collections import deque
+
+
+class IncrementalMatcher:
+    """增量维护的带容量稳定匹配
+
+    保存已编译的双方偏好（按分数排序的有序列表）和当前的学生最优稳定匹配（与完整求解的结果相同）。
+    增加、修改或删除一名学生/导师时，只重新计算该行/列的分数，
+    并只让匹配受影响的学生提议：
+    - 新加入学生或删除导师时，学生只会变差，原先的拒绝仍然成立，
+      新学生和被挤出的学生从上次提议的位置继续向后提议；
+    - 新加入导师或删除学生时，学生只会变好，原先的拒绝可能不再成立，
+      除已匹配到首选导师的学生外（其结果不会再变），其余学生撤回并从头重新提议。
+
+    pair_scorer(student_id, mentor_id) 返回 (学生对导师的分数, 导师对学生的分数)，
+    为 None 表示该方不接受对方。分数越高越偏好，同分按加入顺序。
+    可选的 row_scorer(student_ids, mentor_ids) 一次返回一整行/列的 [(学生分数, 导师分数)]（按配对顺序），
+    提供时加入或更新人员只调用它一次，而不是逐对调用 pair_scorer。
+    """
+
+    def __init__(self, pair_scorer, row_scorer=None):
+        self.pair_scorer = pair_scorer
+        self.row_scorer = row_scorer
+        self.capacities = {}
+        self._order = {}
+        self._next_order = 0
+        # 学生侧：升序列表 [(−分数, 导师顺序, 导师id)] 及 {导师id: (−分数, 导师顺序)}
+        self._student_list = {}
+        self._student_key = {}
+        # 导师侧：升序列表 [(−分数, 学生顺序, 学生id)] 及 {学生id: (−分数, 学生顺序)}
+        self._mentor_list = {}
+        self._mentor_key = {}
+        # 当前匹配：导师的堆 [(分数, −学生顺序, 学生id)]，堆顶为导师最不偏好的学生
+        self._held = {}
+        self.partner = {}
+        self._last_proposal = {}
+
+    def _sequence(self, key):
+        if key not in self._order:
+            self._order[key] = self._next_order
+            self._next_order += 1
+        return self._order[key]
+
+    def _row(self, student_ids, mentor_ids):
+        if self.row_scorer is not None:
+            return self.row_scorer(student_ids, mentor_ids)
+        return [self.pair_scorer(sid, mid) for sid in student_ids for mid in mentor_ids]
+
+    @property
+    def students(self):
+        return self._student_list.keys()
+
+    @property
+    def mentors(self):
+        return self._mentor_list.keys()
+
+    def matches(self):
+        """当前稳定匹配 {学生: 导师}"""
+        return {sid: mid for sid, mid in self.partner.items() if mid is not None}
+
+    def add_student(self, student_id):
+        """加入或更新一名学生：重算其所在的行和列，然后只让该学生（及被挤出者）提议"""
+        if student_id in self._student_list:
+            self.remove_student(student_id, keep_order=True)
+        seq = self._sequence(('student', student_id))
+        entries = []
+        keys = {}
+        mentor_ids = list(self._mentor_list)
+        for mentor_id, (student_score, mentor_score) in zip(mentor_ids, self._row([student_id], mentor_ids)):
+            if student_score is not None:
+                key = (-student_score, self._order[('mentor', mentor_id)])
+                keys[mentor_id] = key
+                entries.append(key + (mentor_id,))
+            if mentor_score is not None:
+                key = (-mentor_score, seq)
+                self._mentor_key[mentor_id][student_id] = key
+                insort(self._mentor_list[mentor_id], key + (student_id,))
+        entries.sort()
+        self._student_list[student_id] = entries
+        self._student_key[student_id] = keys
+        self.partner[student_id] = None
+        self._last_proposal[student_id] = None
+        self._propose(deque([student_id]))
+
+    def add_mentor(self, mentor_id, capacity):
+        """加入或更新一名导师：重算其所在的行和列，然后用空缺名额吸引更偏好该导师的学生"""
+        if mentor_id in self._mentor_list:
+            self.remove_mentor(mentor_id, keep_order=True)
+        seq = self._sequence(('mentor', mentor_id))
+        entries = []
+        keys = {}
+        student_ids = list(self._student_list)
+        for student_id, (student_score, mentor_score) in zip(student_ids, self._row(student_ids, [mentor_id])):
+            if mentor_score is not None:
+                key = (-mentor_score, self._order[('student', student_id)])
+                keys[student_id] = key
+                entries.append(key + (student_id,))
+            if student_score is not None:
+                key = (-student_score, seq)
+                self._student_key[student_id][mentor_id] = key
+                insort(self._student_list[student_id], key + (mentor_id,))
+        entries.sort()
+        self._mentor_list[mentor_id] = entries
+        self._mentor_key[mentor_id] = keys
+        self.capacities[mentor_id] = capacity
+        self._held[mentor_id] = []
+        self._repropose()
+
+    def remove_student(self, student_id, keep_order=False):
+        """删除一名学生，其他学生可能因此得到更好的导师，让他们重新提议（见 _repropose）"""
+        if student_id not in self._student_list:
+            return
+        for mentor_id in self._mentor_list:
+            key = self._mentor_key[mentor_id].pop(student_id, None)
+            if key is not None:
+                entries = self._mentor_list[mentor_id]
+                del entries[bisect_left(entries, key)]
+        mentor_id = self.partner.pop(student_id)
+        del self._student_list[student_id]
+        del self._student_key[student_id]
+        del self._last_proposal[student_id]
+        if not keep_order:
+            del self._order[('student', student_id)]
+        if mentor_id is not None:
+            self._release(mentor_id, student_id)
+        # 即使该学生未匹配，其退出也可能让其他学生得到更好的导师
+        self._repropose()
+
+    def remove_mentor(self, mentor_id, keep_order=False):
+        """删除一名导师，其学生从各自上次提议的位置继续提议"""
+        if mentor_id not in self._mentor_list:
+            return
+        for student_id in self._student_list:
+            key = self._student_key[student_id].pop(mentor_id, None)
+            if key is not None:
+                entries = self._student_list[student_id]
+                del entries[bisect_left(entries, key)]
+        freed = deque(sid for _, _, sid in self._held.pop(mentor_id))
+        for student_id in freed:
+            self.partner[student_id] = None
+        del self._mentor_list[mentor_id]
+        del self._mentor_key[mentor_id]
+        del self.capacities[mentor_id]
+        if not keep_order:
+            del self._order[('mentor', mentor_id)]
+        self._propose(freed)
+
+    def _release(self, mentor_id, student_id):
+        heap = self._held[mentor_id]
+        heap[:] = [item for item in heap if item[2] != student_id]
+        heapq.heapify(heap)
+
+    def _accept(self, mentor_id, student_id):
+        """导师接收学生，满员时挤出最差者并返回其id"""
+        negative_score, seq = self._mentor_key[mentor_id][student_id]
+        item = (-negative_score, -seq, student_id)
+        heap = self._held[mentor_id]
+        self.partner[student_id] = mentor_id
+        if len(heap) < self.capacities[mentor_id]:
+            heapq.heappush(heap, item)
+            return None
+        _, _, evicted = heapq.heapreplace(heap, item)
+        self.partner[evicted] = None
+        return evicted
+
+    def _mentor_accepts(self, mentor_id, student_id):
+        key = self._mentor_key[mentor_id].get(student_id)
+        if key is None or self.capacities[mentor_id] <= 0:
+            return False
+        heap = self._held[mentor_id]
+        if len(heap) < self.capacities[mentor_id]:
+            return True
+        worst_score, worst_seq, _ = heap[0]
+        return key < (-worst_score, -worst_seq)
+
+    def _propose(self, free):
+        """学生提议Gale-Shapley：每名学生从上次提议的位置之后继续"""
+        while free:
+            student_id = free.popleft()
+            entries = self._student_list[student_id]
+            last = self._last_proposal[student_id]
+            position = 0 if last is None else bisect_left(entries, (last[0], last[1] + 1))
+            for score, seq, mentor_id in entries[position:]:
+                self._last_proposal[student_id] = (score, seq)
+                if self._mentor_accepts(mentor_id, student_id):
+                    evicted = self._accept(mentor_id, student_id)
+                    if evicted is not None:
+                        free.append(evicted)
+                    break
+
+    def _repropose(self):
+        """学生可选范围变大后，重新求学生最优稳定匹配
+
+        新匹配中每名学生都不差于原匹配，已匹配到首选导师的学生不会再变，
+        相当于这些学生先提议并被接收；其余学生撤回并从头提议，不会重新计算任何分数。
+        """
+        free = deque()
+        for mentor_id, heap in self._held.items():
+            kept = []
+            for item in heap:
+                student_id = item[2]
+                if self._student_list[student_id][0][2] == mentor_id:
+                    kept.append(item)
+                else:
+                    self.partner[student_id] = None
+            if len(kept) < len(heap):
+                heapq.heapify(kept)
+                heap[:] = kept
+        for student_id, mentor_id in self.partner.items():
+            if mentor_id is None:
+                self._last_proposal[student_id] = None
+                free.append(student_id)
+        self._propose(free)
@@ -0,0 +1,303 @@
+import csv
+import io
+import json
+import os
+import re
+
+from schedule import parse_slots
+
+# 兴趣/研究领域在表格中可用中英文逗号、分号或竖线分隔
+INTEREST_SEPARATORS = re.compile(r'[,，;；|、]')
+
+SKILLS = ('math', 'programming', 'english')
+# 网页版技能自评和导师要求都是 1~5 的整数档位
+SKILL_RANGE = (1, 5)
+
+
+class LoadReport:
+    """批量导入结果：成功行数和出错行（行号, id, 原因），出错行不会中断导入"""
+
+    def __init__(self, source):
+        self.source = source
+        self.loaded = 0
+        self.errors = []
+
+    def __bool__(self):
+        return not self.errors
+
+    def summary(self):
+        return f"{self.source}: 导入 {self.loaded} 行，出错 {len(self.errors)} 行"
+
+
+def detect_format(name):
+    """根据文件名后缀判断格式：csv / jsonl / parquet"""
+    suffix = os.path.splitext(str(name))[1].lower()
+    if suffix in ('.csv', '.txt'):
+        return 'csv'
+    if suffix in ('.jsonl', '.ndjson', '.json'):
+        return 'jsonl'
+    if suffix in ('.parquet', '.pq'):
+        return 'parquet'
+    raise ValueError(f"无法识别的文件格式: {name}")
+
+
+def _open_text(source):
+    """返回 (文本流, 读完后的处理)：自己打开的文件要关闭，包装的二进制流要解除包装以免被一并关闭"""
+    if hasattr(source, 'read'):
+        if isinstance(source, io.TextIOBase):
+            return source, None
+        stream = io.TextIOWrapper(source, encoding='utf-8-sig', newline='')
+        return stream, stream.detach
+    stream = open(source, encoding='utf-8-sig', newline='')
+    return stream, stream.close
+
+
+def iter_row_chunks(source, fmt=None, chunk_size=1000):
+    """逐块读取文件，每块为 [(行号, 行字典)]；任意时刻内存中只有一块数据"""
+    if fmt is None:
+        fmt = detect_format(getattr(source, 'name', source))
+
+    if fmt == 'parquet':
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("读取 Parquet 文件需要安装 pyarrow") from None
+        line = 0
+        for batch in pq.ParquetFile(source).iter_batches(batch_size=chunk_size):
+            rows = batch.to_pylist()
+            yield list(enumerate(rows, start=line + 1))
+            line += len(rows)
+        return
+
+    stream, release = _open_text(source)
+    try:
+        chunk = []
+        if fmt == 'csv':
+            # 第1行为表头，数据从第2行开始
+            for line, row in enumerate(csv.DictReader(stream), start=2):
+                chunk.append((line, row))
+                if len(chunk) >= chunk_size:
+                    yield chunk
+                    chunk = []
+        elif fmt == 'jsonl':
+            for line, text in enumerate(stream, start=1):
+                if not text.strip():
+                    continue
+                try:
+                    row = json.loads(text)
+                except json.JSONDecodeError as e:
+                    row = {'__error__': f"JSON格式错误: {e.msg}"}
+                chunk.append((line, row))
+                if len(chunk) >= chunk_size:
+                    yield chunk
+                    chunk = []
+        else:
+            raise ValueError(f"不支持的格式: {fmt}")
+        if chunk:
+            yield chunk
+    finally:
+        if release is not None:
+            release()
+
+
+def parse_interests(value):
+    """把 "机器学习,人工智能" 或列表解析为去除空白后的标签列表"""
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple)):
+        items = value
+    else:
+        items = INTEREST_SEPARATORS.split(str(value))
+    return [str(i).strip() for i in items if str(i).strip()]
+
+
+def _number(row, field, errors, kind=float, required=True, default=None, bounds=None):
+    """读取数值字段；整数字段不接受小数（如 3.7），bounds=(最小值, 最大值) 时检查范围，出错记入 errors"""
+    value = row.get(field)
+    if value is None or (isinstance(value, str) and not value.strip()):
+        if required:
+            errors.append(f"缺少字段 {field}")
+        return default
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        errors.append(f"字段 {field} 不是数字: {value!r}")
+        return default
+    if kind is int:
+        if not number.is_integer():
+            errors.append(f"字段 {field} 应为整数: {value!r}")
+            return default
+        number = int(number)
+    if bounds is not None and not bounds[0] <= number <= bounds[1]:
+        errors.append(f"字段 {field} 超出范围 {bounds[0]}~{bounds[1]}: {value!r}")
+        return default
+    return number
+
+
+def _flag(row, field, default=True):
+    value = row.get(field)
+    if value is None or value == '':
+        return default
+    if isinstance(value, str):
+        return value.strip().lower() not in ('0', 'false', 'no', 'n', '否', 'f')
+    return bool(value)
+
+
+def _text(row, field):
+    value = row.get(field)
+    return '' if value is None else str(value).strip()
+
+
+def core_student(row, errors):
+    """命令行版（matching_system）学生画像"""
+    return {
+        'interests': parse_interests(row.get('interests')),
+        'scores': {skill: _number(row, skill, errors) for skill in ('math', 'english', 'programming')},
+        'other_info': {
+            'name': _text(row, 'name'),
+            'age': _number(row, 'age', errors, int, required=False)
+        }
+    }
+
+
+def core_mentor(row, errors):
+    """命令行版（matching_system）导师画像"""
+    return {
+        'interests': parse_interests(row.get('interests')),
+        'requirements': {f'min_{skill}': _number(row, f'min_{skill}', errors)
+                         for skill in ('math', 'english', 'programming')},
+        'other_info': {
+            'name': _text(row, 'name'),
+            'age': _number(row, 'age', errors, int, required=False),
+            'max_students': _number(row, 'max_students', errors, int, required=False, default=1)
+        }
+    }
+
+
+def _app_availability(row, project_info, errors):
+    availability = {
+        'matches_project': _flag(row, 'matches_project'),
+        'project_days': project_info.get('activity_days', []),
+        'project_start_time': project_info.get('weekly_start_time'),
+        'project_end_time': project_info.get('weekly_end_time')
+    }
+    # 可选的每周空闲时间，如 "周二 14-17; 周四 9-12"
+    free_time = _text(row, 'free_time')
+    if free_time:
+        slots = parse_slots(free_time)
+        if slots is None:
+            errors.append(f"字段 free_time 无法识别: {free_time!r}")
+        else:
+            availability['weekly_slots'] = slots
+    return availability
+
+
+def app_student(row, errors, project_info):
+    """网页版（app）学生画像，字段与 input_student_profile 一致"""
+    return {
+        'interests': parse_interests(row.get('interests')),
+        'skills': {skill: _number(row, skill, errors, int, bounds=SKILL_RANGE) for skill in SKILLS},
+        'availability': _app_availability(row, project_info, errors),
+        'other_info': {
+            'name': _text(row, 'name'),
+            'grade': _text(row, 'grade'),
+            'major': _text(row, 'major'),
+            'email': _text(row, 'email'),
+            'phone': _text(row, 'phone'),
+            'project': project_info['name']
+        }
+    }
+
+
+def app_mentor(row, errors, project_info):
+    """网页版（app）导师画像，字段与 input_mentor_profile 一致"""
+    areas = row.get('research_areas')
+    return {
+        'research_areas': parse_interests(areas if areas not in (None, '') else row.get('interests')),
+        'requirements': {f'min_{skill}': _number(row, f'min_{skill}', errors, int, bounds=SKILL_RANGE)
+                         for skill in SKILLS},
+        'availability': _app_availability(row, project_info, errors),
+        'other_info': {
+            'name': _text(row, 'name'),
+            'title': _text(row, 'title'),
+            'department': _text(row, 'department'),
+            'email': _text(row, 'email'),
+            'phone': _text(row, 'phone'),
+            'max_students': _number(row, 'max_students', errors, int, required=False, default=1),
+            'project': project_info['name']
+        }
+    }
+
+
+BUILDERS = {
+    ('core', 'student'): core_student,
+    ('core', 'mentor'): core_mentor,
+    ('app', 'student'): app_student,
+    ('app', 'mentor'): app_mentor,
+}
+
+
+def validate_chunk(chunk, role, schema='core', project_info=None, seen=None):
+    """整块校验并转换为 (有效的 [(id, 画像)], 出错的 [(行号, id, 原因)])，seen 用于跨块检查重复id"""
+    build = BUILDERS[(schema, role)]
+    extra = (project_info,) if schema == 'app' else ()
+    valid = []
+    invalid = []
+    if seen is None:
+        seen = set()
+    for line, row in chunk:
+        if not isinstance(row, dict):
+            # JSONL 中合法但不是对象的行，如 [1, 2] 或 "abc"
+            invalid.append((line, None, f"该行不是 JSON 对象: {type(row).__name__}"))
+            continue
+        if '__error__' in row:
+            invalid.append((line, None, row['__error__']))
+            continue
+        row_id = _text(row, 'id')
+        errors = []
+        if not row_id:
+            errors.append("缺少字段 id")
+        elif row_id in seen:
+            errors.append(f"id 重复: {row_id}")
+        profile = build(row, errors, *extra)
+        if not (profile.get('interests') or profile.get('research_areas')):
+            errors.append("兴趣/研究领域为空")
+        if errors:
+            invalid.append((line, row_id or None, '; '.join(errors)))
+        else:
+            seen.add(row_id)
+            valid.append((row_id, profile))
+    return valid, invalid
+
+
+def load_profiles(system, source, role, schema='core', fmt=None, chunk_size=1000,
+                  project_info=None, id_prefix='', upsert=False):
+    """流式导入学生或导师：逐块读取、整块校验，再调用 add_students/add_mentors 批量加入
+
+    upsert=True 时改用 upsert_students/upsert_mentors，内容未变的画像不会重复写入。
+    """
+    if schema == 'app' and project_info is None:
+        raise ValueError("网页版画像需要提供 project_info")
+    if upsert:
+        add_batch = system.upsert_students if role == 'student' else system.upsert_mentors
+    else:
+        add_batch = system.add_students if role == 'student' else system.add_mentors
+    report = LoadReport(getattr(source, 'name', source))
+    seen = set()
+    for chunk in iter_row_chunks(source, fmt, chunk_size):
+        valid, invalid = validate_chunk(chunk, role, schema, project_info, seen)
+        report.errors.extend(invalid)
+        if valid:
+            add_batch([(id_prefix + row_id, profile) for row_id, profile in valid])
+            report.loaded += len(valid)
+    return report
+
+
+def load_students(system, source, **kwargs):
+    """从 CSV/JSONL/Parquet 文件流式导入学生"""
+    return load_profiles(system, source, 'student', **kwargs)
+
+
+def load_mentors(system, source, **kwargs):
+    """从 CSV/JSONL/Parquet 文件流式导入导师"""
+    return load_profiles(system, source, 'mentor', **kwargs)
@@ -1,159 +1,17 @@
-class RuleBasedMatcher:
-    def match(self, students, mentors):
-        """基于规则的匹配：简单匹配共同兴趣"""
-        matches = {}
-        for student_id, student_profile in students.items():
-            best_match = None
-            best_score = -1
-            for mentor_id, mentor_profile in mentors.items():
-                # 计算匹配分数：共同兴趣的数量
-                common_interests = set(student_profile.get('interests', [])) & set(mentor_profile.get('interests', []))
-                score = len(common_interests)
-                if score > best_score:
-                    best_score = score
-                    best_match = mentor_id
-            matches[student_id] = best_match
-        return matches
-
-    def get_candidates(self, students, mentors):
-        """获取候选匹配对"""
-        candidates = []
-        for student_id, student_profile in students.items():
-            for mentor_id, mentor_profile in mentors.items():
-                common_interests = set(student_profile.get('interests', [])) & set(mentor_profile.get('interests', []))
-                if len(common_interests) > 0:  # 至少有1个共同兴趣才作为候选
-                    candidates.append({
-                        '学生id': student_id,
-                        '导师id': mentor_id,
-                        'student_profile': student_profile,
-                        'mentor_profile': mentor_profile
-                    })
-        return candidates
-
-
-class MLBasedMatcher:
-    def recommend_matches(self, students, mentors):
-        """基于机器学习的匹配：这里简化为随机推荐"""
-        import random
-        mentor_ids = list(mentors.keys())
-        matches = {}
-        for student_id in students.keys():
-            matches[student_id] = random.choice(mentor_ids)
-        return matches
-
-    def rank_candidates(self, candidates):
-        """对候选匹配进行排序：这里简化为随机排序"""
-        import random
-        random.shuffle(candidates)
-        return candidates
-
-
-def stable_marriage(students, mentors, student_prefs, mentor_prefs):
-    """稳定婚姻问题算法实现"""
-    if not students or not mentors:
-        return {}
-
-    # 初始化所有学生和导师为自由状态
-    free_students = list(students)
-    free_mentors = list(mentors)
-
-    # 创建偏好字典
-    student_pref_dict = {s: {m: i for i, m in enumerate(prefs)}
-                         for s, prefs in zip(students, student_prefs)}
-    mentor_pref_dict = {m: {s: i for i, s in enumerate(prefs)}
-                        for m, prefs in zip(mentors, mentor_prefs)}
-
-    # 当前匹配状态
-    matches = {}
-    mentor_matches = {m: None for m in mentors}
-
-    while free_students:
-        student = free_students[0]
-        student_prefs = student_pref_dict[student]
-
-        # 找到学生尚未申请的最高优先级导师
-        for mentor in student_prefs:
-            if mentor in free_mentors:
-                # 直接匹配
-                matches[student] = mentor
-                mentor_matches[mentor] = student
-                free_students.remove(student)
-                free_mentors.remove(mentor)
-                break
-            else:
-                # 导师已经被匹配，检查是否更喜欢当前学生
-                current_match = mentor_matches[mentor]
-                if mentor_pref_dict[mentor][student] < mentor_pref_dict[mentor][current_match]:
-                    # 导师更喜欢新学生
-                    matches[student] = mentor
-                    mentor_matches[mentor] = student
-                    free_students.remove(student)
-                    free_students.append(current_match)
-                    break
-
-    return matches
-
-
-class MatchingSystem:
-    def __init__(self, method='hybrid'):
-        self.method = method
-        self.students = {}
-        self.mentors = {}
-        self.historical_matches = []
-        self.rule_based_matcher = RuleBasedMatcher()
-        self.ml_matcher = MLBasedMatcher()
-
-    def add_student(self, student_id, profile):
-        """添加学生信息"""
-        self.students[student_id] = {
-            'interests': profile.get('interests', []),
-            'scores': profile.get('scores', {}),
-            'other_info': profile.get('other_info', {})
-        }
-
-    def add_mentor(self, mentor_id, profile):
-        """添加导师信息"""
-        self.mentors[mentor_id] = {
-            'interests': profile.get('interests', []),
-            'requirements': profile.get('requirements', {}),
-            'other_info': profile.get('other_info', {})
-        }
-
-    def record_match(self, student_id, mentor_id, success):
-        """记录匹配结果"""
-        self.historical_matches.append({
-            '学生Id': student_id,
-            '导师Id': mentor_id,
-            'success': success
-        })
-
-    def generate_recommendations(self):
-        """生成推荐匹配"""
-        if self.method == 'rule_based':
-            return self.rule_based_matcher.match(self.students, self.mentors)
-        elif self.method == 'ml':
-            return self.ml_matcher.recommend_matches(self.students, self.mentors)
-        else:
-            # 混合方法：先用规则筛选，再用ML排序
-            candidates = self.rule_based_matcher.get_candidates(self.students, self.mentors)
-            ranked_candidates = self.ml_matcher.rank_candidates(candidates)
-            # 将列表转换为字典格式以便统一处理
-            matches = {}
-            for candidate in ranked_candidates:
-                student_id = candidate['学生id']
-                mentor_id = candidate['导师id']
-                if student_id not in matches:  # 只保留每个学生的第一个推荐
-                    matches[student_id] = mentor_id
-            return matches
-
-    def finalize_matches(self, student_preferences, mentor_preferences):
-        """使用稳定婚姻算法进行最终匹配"""
-        return stable_marriage(
-            list(self.students.keys()),
-            list(self.mentors.keys()),
-            student_preferences,
-            mentor_preferences
-        )
+import argparse
+import sys
+import time
+
+from loaders import load_mentors, load_students
+from matching_system import MatchingSystem
+from metrics import Metrics
+from scoring import top_k_preferences
+from writers import RowWriter
+
+MATCH_COLUMNS = ('student_id', 'student_name', 'mentor_id', 'mentor_name', 'common_count', 'common_interests',
+                 'meets_requirements', 'explanation')
+# Parquet 输出的列类型，其余列为字符串
+MATCH_TYPES = {'common_count': 'int64', 'meets_requirements': 'bool'}
 
 
 def input_profile(role):
@@ -192,274 +50,25 @@ def input_profile(role):
     return profile_id, profile
 
 
-def main():
-    system = MatchingSystem(method='hybrid')
-
-    # 添加学生
-    num_students = int(input("要添加多少学生? "))
-    for _ in range(num_students):
-        student_id, profile = input_profile('学生')
-        system.add_student(student_id, profile)
-
-    # 添加导师
-    num_mentors = int(input("要添加多少导师? "))
-    for _ in range(num_mentors):
-        mentor_id, profile = input_profile('导师')
-        system.add_mentor(mentor_id, profile)
-
-    # 生成推荐
-    print("\n生成推荐匹配...")
-    recommendations = system.generate_recommendations()
-    print("推荐结果:")
-    for student, mentor in recommendations.items():
-        print(f"学生 {student} -> 导师 {mentor}")
-
-    # 稳定婚姻算法匹配
-    print("\n使用稳定婚姻算法进行匹配...")
+def stable_preferences(system, top_k=None):
+    """稳定匹配用的双方偏好，返回 (学生偏好, 导师偏好)"""
+    # 共同兴趣分数矩阵只计算一次，学生和导师偏好都从中读取
+    score_matrix = system.score_matrix()
+    student_ids = score_matrix.student_ids
+    mentor_ids = score_matrix.mentor_ids
 
     # 模拟学生偏好(实际应用中可以从历史数据或用户输入获取)
-    student_prefs = []
-    for student_id in system.students:
-        # 这里简化为按共同兴趣数量排序
-        pref = []
-        scores = []
-        for mentor_id in system.mentors:
-            common = len(set(system.students[student_id]['interests']) &
-                     set(system.mentors[mentor_id]['interests']))
-            scores.append((mentor_id, common))
-        # 按共同兴趣数量降序排列
-        pref = [m[0] for m in sorted(scores, key=lambda x: x[1], reverse=True)]
-        student_prefs.append(pref)
-
-    # 模拟导师偏好(同样简化)
-    mentor_prefs = []
-    for mentor_id in system.mentors:
-        pref = []
-        scores = []
-        for student_id in system.students:
-            # 检查是否满足最低要求
-            req = system.mentors[mentor_id]['requirements']
-            stu_scores = system.students[student_id]['scores']
-            if (stu_scores['math'] >= req['min_math'] and
-                    stu_scores['english'] >= req['min_english'] and
-                    stu_scores['programming'] >= req['min_programming']):
-                common = len(set(system.students[student_id]['interests']) &
-                             set(system.mentors[mentor_id]['interests']))
-                scores.append((student_id, common))
-        # 按共同兴趣数量降序排列
-        pref = [s[0] for s in sorted(scores, key=lambda x: x[1], reverse=True)]
-        mentor_prefs.append(pref)
-
-    # 进行稳定匹配
-    matches = system.finalize_matches(student_prefs, mentor_prefs)
-    print("\n最终匹配结果:")
-    for student, mentor in matches.items():
-        print(f"学生 {student} 匹配到 导师 {mentor}")
-
-        # 显示匹配详情
-        stu = system.students[student]
-        ment = system.mentors[mentor]
-        print(f"  学生兴趣: {', '.join(stu['interests'])}")
-        print(f"  导师兴趣: {', '.join(ment['interests'])}")
-        print(f"  共同兴趣: {', '.join(set(stu['interests']) & set(ment['interests']))}")
-        print()
-
-class RuleBasedMatcher:
-    def match(self, students, mentors):
-        """基于规则的匹配：简单匹配共同兴趣"""
-        matches = {}
-        for student_id, student_profile in students.items():
-            best_match = None
-            best_score = -1
-            for mentor_id, mentor_profile in mentors.items():
-                # 计算匹配分数：共同兴趣的数量
-                common_interests = set(student_profile.get('interests', [])) & set(mentor_profile.get('interests', []))
-                score = len(common_interests)
-                if score > best_score:
-                    best_score = score
-                    best_match = mentor_id
-            matches[student_id] = best_match
-        return matches
-
-    def get_candidates(self, students, mentors):
-        """获取候选匹配对"""
-        candidates = []
-        for student_id, student_profile in students.items():
-            for mentor_id, mentor_profile in mentors.items():
-                common_interests = set(student_profile.get('interests', [])) & set(mentor_profile.get('interests', []))
-                if len(common_interests) > 0:  # 至少有1个共同兴趣才作为候选
-                    candidates.append({
-                        '学生id': student_id,
-                        '导师id': mentor_id,
-                        'student_profile': student_profile,
-                        'mentor_profile': mentor_profile
-                    })
-        return candidates
-
-
-class MLBasedMatcher:
-    def recommend_matches(self, students, mentors):
-        """基于机器学习的匹配：这里简化为随机推荐"""
-        import random
-        mentor_ids = list(mentors.keys())
-        matches = {}
-        for student_id in students.keys():
-            matches[student_id] = random.choice(mentor_ids)
-        return matches
-
-    def rank_candidates(self, candidates):
-        """对候选匹配进行排序：这里简化为随机排序"""
-        import random
-        random.shuffle(candidates)
-        return candidates
-
-
-def stable_marriage(students, mentors, student_prefs, mentor_prefs):
-    """稳定婚姻问题算法实现"""
-    if not students or not mentors:
-        return {}
-
-    # 初始化所有学生和导师为自由状态
-    free_students = list(students)
-    free_mentors = list(mentors)
-
-    # 创建偏好字典
-    student_pref_dict = {s: {m: i for i, m in enumerate(prefs)}
-                         for s, prefs in zip(students, student_prefs)}
-    mentor_pref_dict = {m: {s: i for i, s in enumerate(prefs)}
-                        for m, prefs in zip(mentors, mentor_prefs)}
-
-    # 当前匹配状态
-    matches = {}
-    mentor_matches = {m: None for m in mentors}
-
-    while free_students:
-        student = free_students[0]
-        student_prefs = student_pref_dict[student]
-
-        # 找到学生尚未申请的最高优先级导师
-        for mentor in student_prefs:
-            if mentor in free_mentors:
-                # 直接匹配
-                matches[student] = mentor
-                mentor_matches[mentor] = student
-                free_students.remove(student)
-                free_mentors.remove(mentor)
-                break
-            else:
-                # 导师已经被匹配，检查是否更喜欢当前学生
-                current_match = mentor_matches[mentor]
-                if mentor_pref_dict[mentor][student] < mentor_pref_dict[mentor][current_match]:
-                    # 导师更喜欢新学生
-                    matches[student] = mentor
-                    mentor_matches[mentor] = student
-                    free_students.remove(student)
-                    free_students.append(current_match)
-                    break
-
-    return matches
-
-
-class MatchingSystem:
-    def __init__(self, method='hybrid'):
-        self.method = method
-        self.students = {}
-        self.mentors = {}
-        self.historical_matches = []
-        self.rule_based_matcher = RuleBasedMatcher()
-        self.ml_matcher = MLBasedMatcher()
-
-    def add_student(self, student_id, profile):
-        """添加学生信息"""
-        self.students[student_id] = {
-            'interests': profile.get('interests', []),
-            'scores': profile.get('scores', {}),
-            'other_info': profile.get('other_info', {})
-        }
-
-    def add_mentor(self, mentor_id, profile):
-        """添加导师信息"""
-        self.mentors[mentor_id] = {
-            'interests': profile.get('interests', []),
-            'requirements': profile.get('requirements', {}),
-            'other_info': profile.get('other_info', {})
-        }
-
-    def record_match(self, student_id, mentor_id, success):
-        """记录匹配结果"""
-        self.historical_matches.append({
-            '学生Id': student_id,
-            '导师Id': mentor_id,
-            'success': success
-        })
-
-    def generate_recommendations(self):
-        """生成推荐匹配"""
-        if self.method == 'rule_based':
-            return self.rule_based_matcher.match(self.students, self.mentors)
-        elif self.method == 'ml':
-            return self.ml_matcher.recommend_matches(self.students, self.mentors)
-        else:
-            # 混合方法：先用规则筛选，再用ML排序
-            candidates = self.rule_based_matcher.get_candidates(self.students, self.mentors)
-            ranked_candidates = self.ml_matcher.rank_candidates(candidates)
-            # 将列表转换为字典格式以便统一处理
-            matches = {}
-            for candidate in ranked_candidates:
-                student_id = candidate['学生id']
-                mentor_id = candidate['导师id']
-                if student_id not in matches:  # 只保留每个学生的第一个推荐
-                    matches[student_id] = mentor_id
-            return matches
-
-    def finalize_matches(self, student_preferences, mentor_preferences):
-        """使用稳定婚姻算法进行最终匹配"""
-        return stable_marriage(
-            list(self.students.keys()),
-            list(self.mentors.keys()),
-            student_preferences,
-            mentor_preferences
-        )
+    # 这里简化为按共同兴趣数量降序排列，top_k 不为 None 时每人只保留前 top_k 位
+    student_prefs = top_k_preferences(score_matrix.overlap, mentor_ids, top_k)
 
+    # 模拟导师偏好(同样简化)：只保留满足最低要求的学生，直接读取分数列与要求列比较
+    eligible = system.eligibility(student_ids, mentor_ids)
+    mentor_prefs = top_k_preferences(score_matrix.overlap.T, student_ids, top_k, eligible.T)
+    return student_prefs, mentor_prefs
 
-def input_profile(role):
-    """输入学生或导师的信息"""
-    profile = {}
-    profile_id = input(f"请输入{role}ID: ")
-
-    # 输入兴趣爱好
-    interests = input(f"请输入{role}的兴趣爱好(用逗号分隔): ").split(',')
-    profile['interests'] = [i.strip() for i in interests if i.strip()]
-
-    # 输入分数或要求
-    scores = {}
-    if role == '学生':
-        print("请输入学生分数:")
-        scores['math'] = float(input("数学分数: "))
-        scores['english'] = float(input("英语分数: "))
-        scores['programming'] = float(input("编程分数: "))
-    else:
-        print("请输入导师要求:")
-        scores['min_math'] = float(input("最低数学要求: "))
-        scores['min_english'] = float(input("最低英语要求: "))
-        scores['min_programming'] = float(input("最低编程要求: "))
 
-    profile['scores' if role == '学生' else 'requirements'] = scores
-
-    # 其他信息
-    other_info = {}
-    other_info['name'] = input(f"{role}姓名: ")
-    other_info['age'] = int(input(f"{role}年龄: "))
-    if role == '导师':
-        other_info['max_students'] = int(input("最多指导学生数: "))
-
-    profile['other_info'] = other_info
-
-    return profile_id, profile
-
-
-def main():
-    system = MatchingSystem(method='hybrid')
+def main(top_k=None):
+    system = MatchingSystem(method='hybrid', audit=True)
 
     # 添加学生
     num_students = int(input("要添加多少学生? "))
@@ -483,38 +92,7 @@ def main():
     # 稳定婚姻算法匹配
     print("\n使用稳定婚姻算法进行匹配...")
 
-    # 模拟学生偏好(实际应用中可以从历史数据或用户输入获取)
-    student_prefs = []
-    for student_id in system.students:
-        # 这里简化为按共同兴趣数量排序
-        pref = []
-        scores = []
-        for mentor_id in system.mentors:
-            common = len(set(system.students[student_id]['interests']) &
-                     set(system.mentors[mentor_id]['interests']))
-            scores.append((mentor_id, common))
-        # 按共同兴趣数量降序排列
-        pref = [m[0] for m in sorted(scores, key=lambda x: x[1], reverse=True)]
-        student_prefs.append(pref)
-
-    # 模拟导师偏好(同样简化)
-    mentor_prefs = []
-    for mentor_id in system.mentors:
-        pref = []
-        scores = []
-        for student_id in system.students:
-            # 检查是否满足最低要求
-            req = system.mentors[mentor_id]['requirements']
-            stu_scores = system.students[student_id]['scores']
-            if (stu_scores['math'] >= req['min_math'] and
-                    stu_scores['english'] >= req['min_english'] and
-                    stu_scores['programming'] >= req['min_programming']):
-                common = len(set(system.students[student_id]['interests']) &
-                             set(system.mentors[mentor_id]['interests']))
-                scores.append((student_id, common))
-        # 按共同兴趣数量降序排列
-        pref = [s[0] for s in sorted(scores, key=lambda x: x[1], reverse=True)]
-        mentor_prefs.append(pref)
+    student_prefs, mentor_prefs = stable_preferences(system, top_k)
 
     # 进行稳定匹配
     matches = system.finalize_matches(student_prefs, mentor_prefs)
@@ -527,9 +105,140 @@ def main():
         ment = system.mentors[mentor]
         print(f"  学生兴趣: {', '.join(stu['interests'])}")
         print(f"  导师兴趣: {', '.join(ment['interests'])}")
-        print(f"  共同兴趣: {', '.join(set(stu['interests']) & set(ment['interests']))}")
+        print(f"  共同兴趣: {', '.join(system.common_interest_tags(student, mentor))}")
         print()
 
+    if system.last_audit:
+        print(f"稳定性检查：发现 {len(system.last_audit)} 个阻塞对")
+        for student, mentor in system.last_audit:
+            print(f"  学生 {student} 与 导师 {mentor} 都更愿意彼此配对")
+    else:
+        print("稳定性检查：没有阻塞对")
+
+
+def log(message):
+    """进度和汇总写到标准错误，标准输出可以留给匹配结果"""
+    print(message, file=sys.stderr)
+
+
+def load_all(system, args):
+    """导入学生和导师文件，返回导入报告列表"""
+    reports = []
+    with system.metrics.phase('load'):
+        reports.append(load_students(system, args.students, fmt=args.input_format, chunk_size=args.chunk_size))
+        reports.append(load_mentors(system, args.mentors, fmt=args.input_format, chunk_size=args.chunk_size))
+    for report in reports:
+        log(report.summary())
+        for line, row_id, reason in report.errors[:args.show_errors]:
+            log(f"  第 {line} 行 {row_id or ''}: {reason}")
+        if len(report.errors) > args.show_errors:
+            log(f"  ……另有 {len(report.errors) - args.show_errors} 行出错")
+    return reports
+
+
+def solve(system, solver, top_k=None):
+    """按指定算法生成匹配，返回 {学生: 导师}"""
+    if solver == 'recommend':
+        # 每名学生独立推荐（按 --method），不考虑导师名额
+        return {sid: mid for sid, mid in system.generate_recommendations().items() if mid is not None}
+    if solver == 'optimal':
+        return system.optimal_matches()
+    with system.metrics.phase('preferences'):
+        student_prefs, mentor_prefs = stable_preferences(system, top_k)
+    return system.finalize_matches(student_prefs, mentor_prefs)
+
+
+def print_summary(metrics, seconds):
+    """打印各阶段耗时和计数"""
+    log(f"{'阶段':<24} {'次数':>6} {'耗时(s)':>10}")
+    for name, (calls, phase_seconds) in metrics.timings.items():
+        log(f"{name:<24} {calls:>6} {phase_seconds:>10.4f}")
+    for name, value in metrics.counters.items():
+        log(f"{name:<24} {value:>17}")
+    log(f"{'总计':<24} {'':>6} {seconds:>10.4f}")
+
+
+def run_match(args):
+    """match 子命令：导入 -> 匹配 -> 逐块写出匹配结果和逐对说明"""
+    start = time.perf_counter()
+    metrics = Metrics()
+    system = MatchingSystem(method=args.method, model_path=args.model, metrics=metrics, audit=args.audit)
+    reports = load_all(system, args)
+    if args.strict and not all(reports):
+        log("导入有出错行，未进行匹配（去掉 --strict 可跳过出错行继续）")
+        return 1
+
+    matches = solve(system, args.solver, args.top_k)
+
+    # 结果按学生分块生成、逐块写出，不在内存中保留整张结果表
+    student_ids = system.student_store.live_ids()
+    with metrics.phase('write'), RowWriter(args.output, MATCH_COLUMNS, args.format, MATCH_TYPES) as writer:
+        for chunk_start in range(0, len(student_ids), args.chunk_size):
+            chunk = student_ids[chunk_start:chunk_start + args.chunk_size]
+            writer.write(system.explain_pairs(chunk, [matches.get(sid) for sid in chunk]))
+    metrics.count('matched', len(matches))
+    metrics.count('rows_written', writer.rows_written)
+
+    if args.prometheus:
+        with open(args.prometheus, 'w', encoding='utf-8') as f:
+            f.write(metrics.prometheus())
+    print_summary(metrics, time.perf_counter() - start)
+    if system.last_audit:
+        log(f"稳定性检查：发现 {len(system.last_audit)} 个阻塞对")
+        return 1
+    return 0
+
+
+def run_validate(args):
+    """validate 子命令：只导入并报告出错行，不做匹配"""
+    reports = load_all(MatchingSystem(), args)
+    return 0 if all(reports) else 1
+
+
+def add_input_arguments(parser):
+    parser.add_argument('--students', required=True, help="学生文件（CSV / JSONL / Parquet）")
+    parser.add_argument('--mentors', required=True, help="导师文件（CSV / JSONL / Parquet）")
+    parser.add_argument('--input-format', choices=('csv', 'jsonl', 'parquet'),
+                        help="输入文件格式，默认按文件名后缀判断")
+    parser.add_argument('--chunk-size', type=int, default=1000, help="每块读取和写出的行数")
+    parser.add_argument('--show-errors', type=int, default=20, help="最多显示的出错行数")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="师生匹配系统（命令行版），不带子命令时进入交互模式")
+    commands = parser.add_subparsers(dest='command')
+
+    match = commands.add_parser('match', help="从文件导入学生和导师，匹配结果写入文件，不需要交互")
+    add_input_arguments(match)
+    match.add_argument('--output', required=True, help="结果文件（CSV / JSONL / Parquet），'-' 表示标准输出")
+    match.add_argument('--format', choices=('csv', 'jsonl', 'parquet'), help="结果格式，默认按文件名后缀判断，输出到标准输出时默认为 CSV")
+    match.add_argument('--method', choices=('rule_based', 'ml', 'hybrid'), default='hybrid',
+                       help="推荐方法（--solver recommend 时使用）")
+    match.add_argument('--solver', choices=('stable', 'optimal', 'recommend'), default='stable',
+                       help="stable：一对一稳定匹配；optimal：共同兴趣总数最大的分配；recommend：每名学生独立推荐")
+    match.add_argument('--top-k', type=int, help="稳定匹配时每人保留的偏好数量，默认全部保留")
+    match.add_argument('--model', help="已训练的排序模型文件")
+    match.add_argument('--audit', action='store_true', help="稳定匹配后检查阻塞对，发现时以状态码1退出")
+    match.add_argument('--strict', action='store_true', help="导入有出错行时不匹配，以状态码1退出")
+    match.add_argument('--prometheus', help="把性能指标以 Prometheus 文本格式写入该文件")
+    match.set_defaults(run=run_match)
+
+    validate = commands.add_parser('validate', help="只检查学生和导师文件，报告出错行")
+    add_input_arguments(validate)
+    validate.set_defaults(run=run_validate)
+
+    interactive = commands.add_parser('interactive', help="逐项输入学生和导师信息（默认）")
+    interactive.add_argument('--top-k', type=int, help="每人保留的偏好数量，默认全部保留")
+    interactive.set_defaults(run=lambda args: main(args.top_k))
+    return parser
+
+
+def cli(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command is None:
+        return main()
+    return args.run(args)
+
 
 if __name__ == "__main__":
-    main()
+    sys.exit(cli())
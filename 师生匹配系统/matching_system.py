@@ -1,269 +1,347 @@
+import os
+
+import numpy as np
+
+from history import MatchHistory
+from metrics import NULL_METRICS
+from profile_store import CORE_MENTOR_SCHEMA, CORE_STUDENT_SCHEMA, ProfileStore, ProfileView
+from scoring import (InterestIndex, InterestScoreMatrix, InterestVocabulary, common_codes, common_count,
+                     skill_eligibility)
+from ranker import LogisticRanker, grid_features, pair_features
+from solvers import blocking_pairs, gale_shapley, optimal_assignment
+
+SKILL_FIELDS = ('math', 'english', 'programming')
+SKILL_NAMES = {'math': '数学', 'english': '英语', 'programming': '编程'}
+
+
 class RuleBasedMatcher:
-    def match(self, students, mentors):
+    def score_matrix(self, students, mentors):
+        """一次性构建学生×导师的共同兴趣分数矩阵"""
+        return InterestScoreMatrix.from_profiles(students, mentors)
+
+    def match(self, students, mentors, scores=None):
         """基于规则的匹配：简单匹配共同兴趣"""
-        matches = {}
-        for student_id, student_profile in students.items():
-            best_match = None
-            best_score = -1
-            for mentor_id, mentor_profile in mentors.items():
-                # 计算匹配分数：共同兴趣的数量
-                common_interests = set(student_profile.get('interests', [])) & set(mentor_profile.get('interests', []))
-                score = len(common_interests)
-                if score > best_score:
-                    best_score = score
-                    best_match = mentor_id
-            matches[student_id] = best_match
-        return matches
+        if scores is None:
+            scores = self.score_matrix(students, mentors)
+        # 每个学生取共同兴趣数量最多的导师
+        return scores.best_mentors()
 
-    def get_candidates(self, students, mentors):
+    def get_candidates(self, students, mentors, index=None, student_codes=None):
         """获取候选匹配对"""
+        if index is None:
+            index = InterestIndex.from_profiles(mentors)
         candidates = []
+        mentor_profiles = {}
         for student_id, student_profile in students.items():
-            for mentor_id, mentor_profile in mentors.items():
-                common_interests = set(student_profile.get('interests', [])) & set(mentor_profile.get('interests', []))
-                if len(common_interests) > 0:  # 至少有1个共同兴趣才作为候选
-                    candidates.append({
-                        '学生id': student_id,
-                        '导师id': mentor_id,
-                        'student_profile': student_profile,
-                        'mentor_profile': mentor_profile
-                    })
+            if student_codes is not None:
+                codes = student_codes[student_id]
+            else:
+                codes = index.vocabulary.lookup(student_profile.get('interests', []))
+            # 倒排索引只返回至少有1个共同兴趣的导师
+            for mentor_id, _ in index.candidates(codes):
+                if mentor_id not in mentor_profiles:
+                    mentor_profiles[mentor_id] = mentors[mentor_id]
+                candidates.append({
+                    '学生id': student_id,
+                    '导师id': mentor_id,
+                    'student_profile': student_profile,
+                    'mentor_profile': mentor_profiles[mentor_id]
+                })
         return candidates
 
 
 class MLBasedMatcher:
-    def recommend_matches(self, students, mentors):
-        """基于机器学习的匹配：这里简化为随机推荐"""
-        import random
-        mentor_ids = list(mentors.keys())
-        matches = {}
-        for student_id in students.keys():
-            matches[student_id] = random.choice(mentor_ids)
-        return matches
-
-    def rank_candidates(self, candidates):
-        """对候选匹配进行排序：这里简化为随机排序"""
-        import random
-        random.shuffle(candidates)
-        return candidates
+    """基于历史匹配训练的逻辑回归排序模型；未训练时使用先验权重（共同兴趣、满足要求优先）"""
 
+    def __init__(self, model=None):
+        self.model = model if model is not None else LogisticRanker.prior()
+        self.trained = model is not None
 
-def stable_marriage(students, mentors, student_prefs, mentor_prefs):
-    """稳定婚姻问题算法实现"""
-    if not students or not mentors:
-        return {}
-
-    # 初始化所有学生和导师为自由状态
-    free_students = list(students)
-    free_mentors = list(mentors)
-
-    # 创建偏好字典
-    student_pref_dict = {s: {m: i for i, m in enumerate(prefs)}
-                         for s, prefs in zip(students, student_prefs)}
-    mentor_pref_dict = {m: {s: i for i, s in enumerate(prefs)}
-                        for m, prefs in zip(mentors, mentor_prefs)}
-
-    # 当前匹配状态
-    matches = {}
-    mentor_matches = {m: None for m in mentors}
-
-    while free_students:
-        student = free_students[0]
-        student_prefs = student_pref_dict[student]
-
-        # 找到学生尚未申请的最高优先级导师
-        for mentor in student_prefs:
-            if mentor in free_mentors:
-                # 直接匹配
-                matches[student] = mentor
-                mentor_matches[mentor] = student
-                free_students.remove(student)
-                free_mentors.remove(mentor)
-                break
-            else:
-                # 导师已经被匹配，检查是否更喜欢当前学生
-                current_match = mentor_matches[mentor]
-                if mentor_pref_dict[mentor][student] < mentor_pref_dict[mentor][current_match]:
-                    # 导师更喜欢新学生
-                    matches[student] = mentor
-                    mentor_matches[mentor] = student
-                    free_students.remove(student)
-                    free_students.append(current_match)
-                    break
+    def fit(self, student_store, mentor_store, records):
+        """用历史记录（MatchHistory 或 [{'学生Id', '导师Id', 'success'}]）训练，画像已删除的记录会被跳过"""
+        if isinstance(records, MatchHistory):
+            records = zip(*records.pairs_arrays())
+        else:
+            records = ((r['学生Id'], r['导师Id'], r['success']) for r in records)
+        pairs = [(sid, mid, success) for sid, mid, success in records
+                 if sid in student_store and mid in mentor_store]
+        if not pairs:
+            raise ValueError("没有可用于训练的历史匹配记录")
+        student_ids, mentor_ids, labels = zip(*pairs)
+        features = pair_features(student_store, mentor_store, list(student_ids), list(mentor_ids))
+        self.model = LogisticRanker().fit(features, np.array(labels, dtype=np.float64))
+        self.trained = True
+        return self
+
+    def save(self, path):
+        self.model.save(path)
+
+    @classmethod
+    def load(cls, path):
+        return cls(LogisticRanker.load(path))
+
+    def score_grid(self, student_store, mentor_store, student_ids, mentor_ids, block_rows=1024):
+        """学生×导师 全部配对的模型得分，按行分块计算以限制内存"""
+        scores = np.empty((len(student_ids), len(mentor_ids)))
+        for start in range(0, len(student_ids), block_rows):
+            block = student_ids[start:start + block_rows]
+            features = grid_features(student_store, mentor_store, block, mentor_ids)
+            scores[start:start + len(block)] = self.model.decision_function(features)
+        return scores
 
-    return matches
+    def recommend_matches(self, students, mentors):
+        """基于机器学习的匹配：每个学生推荐模型得分最高的导师（同分时取先添加的导师）"""
+        student_store, mentor_store = _stores(students, mentors)
+        student_ids = list(students.keys())
+        mentor_ids = list(mentors.keys())
+        if not mentor_ids:
+            return {sid: None for sid in student_ids}
+        best = self.score_grid(student_store, mentor_store, student_ids, mentor_ids).argmax(axis=1)
+        return {sid: mentor_ids[j] for sid, j in zip(student_ids, best.tolist())}
+
+    def rank_candidates(self, candidates, student_store=None, mentor_store=None):
+        """对候选匹配按模型得分降序排序（同分保持原顺序），全部候选一次打分"""
+        if not candidates:
+            return candidates
+        if student_store is None or mentor_store is None:
+            student_store, mentor_store = _stores(
+                {c['学生id']: c['student_profile'] for c in candidates},
+                {c['导师id']: c['mentor_profile'] for c in candidates})
+        features = pair_features(student_store, mentor_store,
+                                 [c['学生id'] for c in candidates], [c['导师id'] for c in candidates])
+        order = np.argsort(-self.model.decision_function(features), kind='stable')
+        return [candidates[i] for i in order.tolist()]
+
+
+def _stores(students, mentors):
+    """取得画像的列式存储；传入普通 dict 时临时建一份"""
+    if isinstance(students, ProfileView) and isinstance(mentors, ProfileView):
+        return students.store, mentors.store
+    vocabulary = InterestVocabulary()
+    student_store = ProfileStore(CORE_STUDENT_SCHEMA, vocabulary)
+    mentor_store = ProfileStore(CORE_MENTOR_SCHEMA, vocabulary)
+    for student_id, profile in students.items():
+        student_store.upsert(student_id, profile)
+    for mentor_id, profile in mentors.items():
+        mentor_store.upsert(mentor_id, profile)
+    return student_store, mentor_store
+
+
+def stable_marriage(students, mentors, student_prefs, mentor_prefs, metrics=None):
+    """稳定婚姻问题算法实现（线性时间的Gale-Shapley，见 solvers.gale_shapley）"""
+    return gale_shapley(students, mentors, student_prefs, mentor_prefs, metrics)
 
 
 class MatchingSystem:
-    def __init__(self, method='hybrid'):
+    def __init__(self, method='hybrid', model_path=None, history_path=None, metrics=None, audit=False):
         self.method = method
-        self.students = {}
-        self.mentors = {}
-        self.historical_matches = []
+        # 性能指标（metrics.Metrics），默认关闭
+        self.metrics = metrics if metrics is not None else NULL_METRICS
+        # 匹配后检查稳定性，最近一次 finalize_matches 的阻塞对保存在 last_audit
+        self.audit = audit
+        self.last_audit = None
+        # 画像按列存储：数值字段为 float64 列，兴趣标签按系统统一编号
+        self.vocabulary = InterestVocabulary()
+        self.student_store = ProfileStore(CORE_STUDENT_SCHEMA, self.vocabulary)
+        self.mentor_store = ProfileStore(CORE_MENTOR_SCHEMA, self.vocabulary)
+        # 兼容旧代码的 dict 风格访问
+        self.students = ProfileView(self.student_store, self.add_student, self.remove_student)
+        self.mentors = ProfileView(self.mentor_store, self.add_mentor, self.remove_mentor)
+        # 只追加的匹配历史，history_path 为 None 时只保存在内存中
+        self.historical_matches = MatchHistory(history_path)
         self.rule_based_matcher = RuleBasedMatcher()
-        self.ml_matcher = MLBasedMatcher()
+        # 已训练的排序模型从磁盘加载，推理时不会重新训练
+        self.model_path = model_path
+        if model_path is not None and os.path.exists(model_path):
+            self.ml_matcher = MLBasedMatcher.load(model_path)
+        else:
+            self.ml_matcher = MLBasedMatcher()
+        # 兴趣标签 -> 导师 的倒排索引，add_mentor时增量更新
+        self.mentor_index = InterestIndex(self.vocabulary)
+        self._score_matrix = None
+        self._score_matrix_version = None
+
+    def score_matrix(self):
+        """获取共同兴趣分数矩阵，画像未变化时复用上次的结果"""
+        version = (self.student_store.version, self.mentor_store.version)
+        if self._score_matrix_version != version:
+            student_ids = self.student_store.live_ids()
+            mentor_ids = self.mentor_store.live_ids()
+            with self.metrics.phase('score_matrix'):
+                self._score_matrix = InterestScoreMatrix(
+                    student_ids,
+                    mentor_ids,
+                    self.student_store.codes_for(student_ids),
+                    self.mentor_store.codes_for(mentor_ids),
+                    len(self.vocabulary)
+                )
+            self.metrics.count('pairs_scored', len(student_ids) * len(mentor_ids))
+            self._score_matrix_version = version
+        return self._score_matrix
+
+    def common_interests(self, student_id, mentor_id):
+        """单个学生与导师的共同兴趣数量（两个升序编号数组求交集）"""
+        return common_count(self.student_store.codes_of(student_id), self.mentor_store.codes_of(mentor_id))
+
+    def common_interest_tags(self, student_id, mentor_id):
+        """单个学生与导师的共同兴趣标签"""
+        return self.vocabulary.decode(common_codes(self.student_store.codes_of(student_id),
+                                                   self.mentor_store.codes_of(mentor_id)).tolist())
+
+    def explain_pairs(self, student_ids, mentor_ids):
+        """逐对说明匹配结果：共同兴趣、是否满足导师最低要求及未满足的科目，返回与 student_ids 对应的行
+
+        mentor_ids[i] 为 student_ids[i] 匹配到的导师，None 表示未匹配；整块配对的分数与要求一次比较。
+        """
+        matched = [i for i, mentor_id in enumerate(mentor_ids) if mentor_id is not None]
+        skills = self.student_store.matrix(SKILL_FIELDS, self.student_store.rows([student_ids[i] for i in matched]))
+        required = self.mentor_store.matrix([f'min_{skill}' for skill in SKILL_FIELDS],
+                                            self.mentor_store.rows([mentor_ids[i] for i in matched]))
+        short = skills < required
+        student_info = self.student_store.lookup('other_info')
+        mentor_info = self.mentor_store.lookup('other_info')
+
+        rows = [{
+            'student_id': student_id,
+            'student_name': student_info[student_id].get('name', ''),
+            'mentor_id': None,
+            'mentor_name': None,
+            'common_count': 0,
+            'common_interests': '',
+            'meets_requirements': None,
+            'explanation': '未匹配',
+        } for student_id in student_ids]
+        for k, i in enumerate(matched):
+            student_id, mentor_id = student_ids[i], mentor_ids[i]
+            tags = self.common_interest_tags(student_id, mentor_id)
+            missing = [f"{SKILL_NAMES[SKILL_FIELDS[c]]} {skills[k, c]:g} < {required[k, c]:g}"
+                       for c in np.flatnonzero(short[k]).tolist()]
+            reasons = [f"共同兴趣 {len(tags)} 项（{'、'.join(tags)}）" if tags else "没有共同兴趣",
+                       f"未满足导师最低要求：{'，'.join(missing)}" if missing else "满足导师最低要求"]
+            rows[i].update({
+                'mentor_id': mentor_id,
+                'mentor_name': mentor_info[mentor_id].get('name', ''),
+                'common_count': len(tags),
+                'common_interests': '、'.join(tags),
+                'meets_requirements': not missing,
+                'explanation': '；'.join(reasons),
+            })
+        return rows
+
+    def eligibility(self, student_ids, mentor_ids):
+        """学生×导师 的最低要求满足矩阵：整数分数按分数档位图求交集，否则做一次广播比较"""
+        with self.metrics.phase('eligibility'):
+            skills = self.student_store.matrix(SKILL_FIELDS, self.student_store.rows(student_ids))
+            required = self.mentor_store.matrix([f'min_{skill}' for skill in SKILL_FIELDS],
+                                                self.mentor_store.rows(mentor_ids))
+            return skill_eligibility(skills, required)
 
     def add_student(self, student_id, profile):
         """添加学生信息"""
-        self.students[student_id] = {
+        self.student_store.upsert(student_id, {
             'interests': profile.get('interests', []),
             'scores': profile.get('scores', {}),
             'other_info': profile.get('other_info', {})
-        }
+        })
 
     def add_mentor(self, mentor_id, profile):
         """添加导师信息"""
-        self.mentors[mentor_id] = {
+        self.mentor_store.upsert(mentor_id, {
             'interests': profile.get('interests', []),
             'requirements': profile.get('requirements', {}),
             'other_info': profile.get('other_info', {})
-        }
+        })
+        self.mentor_index.add(mentor_id, self.mentor_store.codes_of(mentor_id))
+
+    def remove_student(self, student_id):
+        """删除学生信息"""
+        self.student_store.remove(student_id)
+
+    def remove_mentor(self, mentor_id):
+        """删除导师信息"""
+        self.mentor_store.remove(mentor_id)
+        self.mentor_index.remove(mentor_id)
+
+    def add_students(self, items):
+        """批量添加学生 [(学生id, 画像)]"""
+        for student_id, profile in items:
+            self.add_student(student_id, profile)
+
+    def add_mentors(self, items):
+        """批量添加导师 [(导师id, 画像)]"""
+        for mentor_id, profile in items:
+            self.add_mentor(mentor_id, profile)
 
     def record_match(self, student_id, mentor_id, success):
-        """记录匹配结果"""
-        self.historical_matches.append({
-            '学生Id': student_id,
-            '导师Id': mentor_id,
-            'success': success
-        })
+        """记录匹配结果，同时更新按导师、学生和兴趣标签对统计的成功率"""
+        student_tags = self.students[student_id]['interests'] if student_id in self.students else ()
+        mentor_tags = self.mentors[mentor_id]['interests'] if mentor_id in self.mentors else ()
+        self.historical_matches.append(student_id, mentor_id, success, student_tags, mentor_tags)
+
+    def train_ranker(self, path=None):
+        """用历史匹配记录训练排序模型，并保存到 path（默认为 model_path）"""
+        self.ml_matcher.fit(self.student_store, self.mentor_store, self.historical_matches)
+        path = path if path is not None else self.model_path
+        if path is not None:
+            self.ml_matcher.save(path)
+        return self.ml_matcher
 
     def generate_recommendations(self):
         """生成推荐匹配"""
+        metrics = self.metrics
         if self.method == 'rule_based':
-            return self.rule_based_matcher.match(self.students, self.mentors)
+            scores = self.score_matrix()
+            with metrics.phase('rule_match'):
+                return self.rule_based_matcher.match(self.students, self.mentors, scores)
         elif self.method == 'ml':
-            return self.ml_matcher.recommend_matches(self.students, self.mentors)
+            with metrics.phase('ml_scoring'):
+                matches = self.ml_matcher.recommend_matches(self.students, self.mentors)
+            metrics.count('pairs_scored', len(self.students) * len(self.mentors))
+            return matches
         else:
             # 混合方法：先用规则筛选，再用ML排序
-            candidates = self.rule_based_matcher.get_candidates(self.students, self.mentors)
-            ranked_candidates = self.ml_matcher.rank_candidates(candidates)
+            with metrics.phase('candidates'):
+                candidates = self.rule_based_matcher.get_candidates(self.students, self.mentors, self.mentor_index,
+                                                                    self.student_store.lookup('codes'))
+            metrics.count('candidates_emitted', len(candidates))
+            with metrics.phase('ranking'):
+                ranked_candidates = self.ml_matcher.rank_candidates(candidates, self.student_store,
+                                                                    self.mentor_store)
+            metrics.count('pairs_scored', len(candidates))
             # 将列表转换为字典格式以便统一处理
-            matches = {}
-            for candidate in ranked_candidates:
-                student_id = candidate['学生id']
-                mentor_id = candidate['导师id']
-                if student_id not in matches:  # 只保留每个学生的第一个推荐
-                    matches[student_id] = mentor_id
+            with metrics.phase('selection'):
+                matches = {}
+                for candidate in ranked_candidates:
+                    student_id = candidate['学生id']
+                    mentor_id = candidate['导师id']
+                    if student_id not in matches:  # 只保留每个学生的第一个推荐
+                        matches[student_id] = mentor_id
             return matches
 
     def finalize_matches(self, student_preferences, mentor_preferences):
         """使用稳定婚姻算法进行最终匹配"""
-        return stable_marriage(
-            list(self.students.keys()),
-            list(self.mentors.keys()),
-            student_preferences,
-            mentor_preferences
-        )
-
-
-def input_profile(role):
-    """输入学生或导师的信息"""
-    profile = {}
-    profile_id = input(f"请输入{role}ID: ")
-
-    # 输入兴趣爱好
-    interests = input(f"请输入{role}的兴趣爱好(用逗号分隔): ").split(',')
-    profile['interests'] = [i.strip() for i in interests if i.strip()]
-
-    # 输入分数或要求
-    scores = {}
-    if role == '学生':
-        print("请输入学生分数:")
-        scores['math'] = float(input("数学分数: "))
-        scores['english'] = float(input("英语分数: "))
-        scores['programming'] = float(input("编程分数: "))
-    else:
-        print("请输入导师要求:")
-        scores['min_math'] = float(input("最低数学要求: "))
-        scores['min_english'] = float(input("最低英语要求: "))
-        scores['min_programming'] = float(input("最低编程要求: "))
-
-    profile['scores' if role == '学生' else 'requirements'] = scores
-
-    # 其他信息
-    other_info = {}
-    other_info['name'] = input(f"{role}姓名: ")
-    other_info['age'] = int(input(f"{role}年龄: "))
-    if role == '导师':
-        other_info['max_students'] = int(input("最多指导学生数: "))
-
-    profile['other_info'] = other_info
-
-    return profile_id, profile
-
-
-def main():
-    system = MatchingSystem(method='hybrid')
-
-    # 添加学生
-    num_students = int(input("要添加多少学生? "))
-    for _ in range(num_students):
-        student_id, profile = input_profile('学生')
-        system.add_student(student_id, profile)
-
-    # 添加导师
-    num_mentors = int(input("要添加多少导师? "))
-    for _ in range(num_mentors):
-        mentor_id, profile = input_profile('导师')
-        system.add_mentor(mentor_id, profile)
-
-    # 生成推荐
-    print("\n生成推荐匹配...")
-    recommendations = system.generate_recommendations()
-    print("推荐结果:")
-    for student, mentor in recommendations.items():
-        print(f"学生 {student} -> 导师 {mentor}")
-
-    # 稳定婚姻算法匹配
-    print("\n使用稳定婚姻算法进行匹配...")
-
-    # 模拟学生偏好(实际应用中可以从历史数据或用户输入获取)
-    student_prefs = []
-    for student_id in system.students:
-        # 这里简化为按共同兴趣数量排序
-        pref = []
-        scores = []
-        for mentor_id in system.mentors:
-            common = len(set(system.students[student_id]['interests']) &
-                     set(system.mentors[mentor_id]['interests']))
-            scores.append((mentor_id, common))
-        # 按共同兴趣数量降序排列
-        pref = [m[0] for m in sorted(scores, key=lambda x: x[1], reverse=True)]
-        student_prefs.append(pref)
-
-    # 模拟导师偏好(同样简化)
-    mentor_prefs = []
-    for mentor_id in system.mentors:
-        pref = []
-        scores = []
-        for student_id in system.students:
-            # 检查是否满足最低要求
-            req = system.mentors[mentor_id]['requirements']
-            stu_scores = system.students[student_id]['scores']
-            if (stu_scores['math'] >= req['min_math'] and
-                    stu_scores['english'] >= req['min_english'] and
-                    stu_scores['programming'] >= req['min_programming']):
-                common = len(set(system.students[student_id]['interests']) &
-                             set(system.mentors[mentor_id]['interests']))
-                scores.append((student_id, common))
-        # 按共同兴趣数量降序排列
-        pref = [s[0] for s in sorted(scores, key=lambda x: x[1], reverse=True)]
-        mentor_prefs.append(pref)
-
-    # 进行稳定匹配
-    matches = system.finalize_matches(student_prefs, mentor_prefs)
-    print("\n最终匹配结果:")
-    for student, mentor in matches.items():
-        print(f"学生 {student} 匹配到 导师 {mentor}")
-
-        # 显示匹配详情
-        stu = system.students[student]
-        ment = system.mentors[mentor]
-        print(f"  学生兴趣: {', '.join(stu['interests'])}")
-        print(f"  导师兴趣: {', '.join(ment['interests'])}")
-        print(f"  共同兴趣: {', '.join(set(stu['interests']) & set(ment['interests']))}")
-        print()
-
-
-if __name__ == "__main__":
-    main()
+        students = list(self.students.keys())
+        mentors = list(self.mentors.keys())
+        with self.metrics.phase('proposals'):
+            matches = stable_marriage(students, mentors, student_preferences, mentor_preferences, self.metrics)
+        if self.audit:
+            # 一对一，空闲导师接受任何学生（与 gale_shapley 一致）
+            with self.metrics.phase('audit'):
+                self.last_audit = blocking_pairs(students, mentors, student_preferences, mentor_preferences,
+                                                 matches, unlisted_acceptable=True)
+            self.metrics.count('blocking_pairs', len(self.last_audit))
+        return matches
+
+    def optimal_matches(self, capacities=None):
+        """共同兴趣总数最大的分配（只考虑满足导师最低要求且有共同兴趣的配对）
+
+        默认每位导师一个名额，与 finalize_matches 的一对一稳定匹配可直接比较。
+        """
+        score_matrix = self.score_matrix()
+        mentor_ids = score_matrix.mentor_ids
+        if capacities is None:
+            capacities = [1] * len(mentor_ids)
+        acceptable = self.eligibility(score_matrix.student_ids, mentor_ids) & (score_matrix.overlap > 0)
+        with self.metrics.phase('assignment'):
+            return optimal_assignment(score_matrix.student_ids, mentor_ids, score_matrix.overlap, capacities,
+                                      acceptable, self.metrics)
@@ -0,0 +1,104 @@
+import re
+import time
+from contextlib import contextmanager, nullcontext
+
+
+class Metrics:
+    """匹配过程的性能指标：各阶段的调用次数和累计耗时，以及计数器（打分的配对数、候选数、提议次数等）
+
+    计数在各阶段结束后一次性累加，不在求解器的内层循环中逐次调用。
+    """
+
+    enabled = True
+
+    def __init__(self):
+        # 阶段名 -> [调用次数, 累计秒数]
+        self.timings = {}
+        self.counters = {}
+
+    def __bool__(self):
+        return True
+
+    @contextmanager
+    def phase(self, name):
+        """计时一个阶段：with metrics.phase('score_matrix'): ..."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def add_time(self, name, seconds, calls=1):
+        entry = self.timings.setdefault(name, [0, 0.0])
+        entry[0] += calls
+        entry[1] += seconds
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + int(n)
+
+    def reset(self):
+        self.timings.clear()
+        self.counters.clear()
+
+    def as_dict(self):
+        """{'timings': {阶段: {'calls', 'seconds'}}, 'counters': {名称: 数值}}"""
+        return {
+            'timings': {name: {'calls': calls, 'seconds': seconds}
+                        for name, (calls, seconds) in self.timings.items()},
+            'counters': dict(self.counters),
+        }
+
+    def prometheus(self, prefix='matching'):
+        """Prometheus 文本格式（exposition format 0.0.4）"""
+        lines = []
+        if self.timings:
+            lines += [f"# HELP {prefix}_phase_seconds_total 各阶段累计耗时（秒）",
+                      f"# TYPE {prefix}_phase_seconds_total counter"]
+            lines += [f'{prefix}_phase_seconds_total{{phase="{_label(name)}"}} {seconds:.6f}'
+                      for name, (_, seconds) in self.timings.items()]
+            lines += [f"# HELP {prefix}_phase_calls_total 各阶段调用次数",
+                      f"# TYPE {prefix}_phase_calls_total counter"]
+            lines += [f'{prefix}_phase_calls_total{{phase="{_label(name)}"}} {calls}'
+                      for name, (calls, _) in self.timings.items()]
+        for name, value in self.counters.items():
+            metric = f"{prefix}_{_metric_name(name)}_total"
+            lines += [f"# TYPE {metric} counter", f"{metric} {value}"]
+        return '\n'.join(lines) + '\n' if lines else ''
+
+
+class NullMetrics:
+    """关闭时使用的空实现：所有记录操作都不做任何事，求解器据其布尔值为 False 跳过统计"""
+
+    enabled = False
+
+    def __bool__(self):
+        return False
+
+    def phase(self, name):
+        return nullcontext()
+
+    def add_time(self, name, seconds, calls=1):
+        pass
+
+    def count(self, name, n=1):
+        pass
+
+    def reset(self):
+        pass
+
+    def as_dict(self):
+        return {'timings': {}, 'counters': {}}
+
+    def prometheus(self, prefix='matching'):
+        return ''
+
+
+NULL_METRICS = NullMetrics()
+
+
+def _metric_name(name):
+    return re.sub(r'[^a-zA-Z0-9_]', '_', name)
+
+
+def _label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
@@ -0,0 +1,260 @@
+import hashlib
+import json
+from collections.abc import MutableMapping
+
+import numpy as np
+
+from scoring import InterestVocabulary
+
+
+class ProfileSchema:
+    """画像字段的列式布局
+
+    interest_field: 兴趣/研究领域字段，存为升序的词表编号数组
+    numeric: {分组: (字段, ...)}，例如 {'scores': ('math', ...)}，每个字段存为一列 float64
+    objects: 原样保存的字段（如 other_info、availability），按行存对象引用
+    integer: 数值字段还原为字典时是否转换回 int（网页版的技能分为 1-5 的整数）
+    """
+
+    def __init__(self, interest_field, numeric, objects=(), integer=False):
+        self.interest_field = interest_field
+        self.numeric = {group: tuple(fields) for group, fields in numeric.items()}
+        self.objects = tuple(objects)
+        self.integer = integer
+        self.columns = [(group, field) for group, fields in self.numeric.items() for field in fields]
+
+
+CORE_STUDENT_SCHEMA = ProfileSchema('interests', {'scores': ('math', 'english', 'programming')},
+                                    ('other_info',))
+CORE_MENTOR_SCHEMA = ProfileSchema('interests',
+                                   {'requirements': ('min_math', 'min_english', 'min_programming'),
+                                    'other_info': ('max_students',)},
+                                   ('other_info',))
+APP_STUDENT_SCHEMA = ProfileSchema('interests', {'skills': ('math', 'programming', 'english')},
+                                   ('availability', 'other_info'), integer=True)
+APP_MENTOR_SCHEMA = ProfileSchema('research_areas',
+                                  {'requirements': ('min_math', 'min_programming', 'min_english'),
+                                   'other_info': ('max_students',)},
+                                  ('availability', 'other_info'), integer=True)
+
+
+def profile_fingerprint(profile):
+    """画像内容的指纹：字段顺序无关，内容相同则指纹相同"""
+    text = json.dumps(profile, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+
+class ProfileStore:
+    """列式画像存储：数值字段为定长 float64 列，兴趣为编号数组，按 id -> 行号 映射访问
+
+    行号按首次加入的顺序分配；更新画像时保留原行号，删除后该行作废，
+    因此存活行的顺序与原来 dict 的插入顺序一致。
+    作废行达到 compact_min_dead 行且超过总行数一半时整体压缩：存活行按原顺序前移，
+    id -> 行号 映射随之更新，version 加1使按版本缓存的矩阵失效；行号只应在两次修改之间使用。
+    """
+
+    compact_min_dead = 64
+
+    def __init__(self, schema, vocabulary=None, capacity=64):
+        self.schema = schema
+        self.initial_capacity = capacity
+        self.vocabulary = vocabulary if vocabulary is not None else InterestVocabulary()
+        self.row_of = {}
+        self.ids = []
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.columns = {field: np.full(capacity, np.nan) for _, field in schema.columns}
+        self.interests = []
+        self.codes = []
+        self.fingerprints = []
+        self.objects = {name: [] for name in schema.objects}
+        self.version = 0
+
+    def __len__(self):
+        return len(self.row_of)
+
+    def __contains__(self, profile_id):
+        return profile_id in self.row_of
+
+    def _grow(self, needed):
+        capacity = len(self.alive)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        alive = np.zeros(capacity, dtype=bool)
+        alive[:len(self.alive)] = self.alive
+        self.alive = alive
+        for field, column in self.columns.items():
+            grown = np.full(capacity, np.nan)
+            grown[:len(column)] = column
+            self.columns[field] = grown
+
+    def upsert(self, profile_id, profile, fingerprint=None):
+        """加入或更新一条画像，返回行号；fingerprint 为调用方已算好的画像指纹"""
+        row = self.row_of.get(profile_id)
+        if row is None:
+            row = len(self.ids)
+            self._grow(row + 1)
+            self.row_of[profile_id] = row
+            self.ids.append(profile_id)
+            self.interests.append(None)
+            self.codes.append(None)
+            self.fingerprints.append(None)
+            for values in self.objects.values():
+                values.append(None)
+        self.alive[row] = True
+
+        interests = profile.get(self.schema.interest_field, [])
+        codes = self.vocabulary.encode(interests)
+        self.interests[row] = interests
+        self.codes[row] = codes
+        self.fingerprints[row] = profile_fingerprint(profile) if fingerprint is None else fingerprint
+        for group, field in self.schema.columns:
+            value = profile.get(group, {}).get(field)
+            self.columns[field][row] = np.nan if value is None else value
+        for name, values in self.objects.items():
+            values[row] = profile.get(name, {})
+        self.version += 1
+        return row
+
+    def remove(self, profile_id):
+        """删除一条画像（行作废，不移动其他行）"""
+        row = self.row_of.pop(profile_id, None)
+        if row is None:
+            return
+        self.alive[row] = False
+        self.ids[row] = None
+        self.interests[row] = self.codes[row] = None
+        self.fingerprints[row] = None
+        for values in self.objects.values():
+            values[row] = None
+        self.version += 1
+        dead = len(self.ids) - len(self.row_of)
+        if dead >= self.compact_min_dead and dead * 2 > len(self.ids):
+            self.compact()
+
+    def compact(self):
+        """丢弃作废行并按原顺序重新编号；列表和映射原地修改，已取得的 RowLookup 仍然有效"""
+        live = np.flatnonzero(self.alive[:len(self.ids)])
+        rows = live.tolist()
+        capacity = max(self.initial_capacity, 2 * len(rows))
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.alive[:len(rows)] = True
+        for field, column in self.columns.items():
+            compacted = np.full(capacity, np.nan)
+            compacted[:len(rows)] = column[live]
+            self.columns[field] = compacted
+        for values in (self.ids, self.interests, self.codes, self.fingerprints, *self.objects.values()):
+            values[:] = [values[row] for row in rows]
+        self.row_of.clear()
+        self.row_of.update((profile_id, row) for row, profile_id in enumerate(self.ids))
+        self.version += 1
+
+    def live_ids(self):
+        """按加入顺序排列的所有存活id"""
+        return [self.ids[row] for row in np.flatnonzero(self.alive[:len(self.ids)]).tolist()]
+
+    def rows(self, profile_ids):
+        """id 列表对应的行号数组"""
+        return np.fromiter(map(self.row_of.__getitem__, profile_ids), dtype=np.int64, count=len(profile_ids))
+
+    def column(self, field, rows=None):
+        """读取一列数值；rows 为 None 时返回全部存活行"""
+        values = self.columns[field]
+        if rows is None:
+            rows = np.flatnonzero(self.alive[:len(self.ids)])
+        return values[rows]
+
+    def matrix(self, fields, rows=None):
+        """多列数值拼成 (行数, 字段数) 的矩阵"""
+        return np.column_stack([self.column(field, rows) for field in fields])
+
+    def lookup(self, name):
+        """按 id 读取某个按行保存的字段（'codes' 或对象字段名）"""
+        values = self.objects[name] if name in self.objects else getattr(self, name)
+        return RowLookup(self.row_of, values)
+
+    def codes_for(self, profile_ids):
+        return [self.codes[self.row_of[profile_id]] for profile_id in profile_ids]
+
+    def fingerprint_of(self, profile_id):
+        """已保存画像的指纹，不存在时返回 None"""
+        row = self.row_of.get(profile_id)
+        return None if row is None else self.fingerprints[row]
+
+    def fingerprints_for(self, profile_ids):
+        return [self.fingerprints[self.row_of[profile_id]] for profile_id in profile_ids]
+
+    def codes_of(self, profile_id):
+        return self.codes[self.row_of[profile_id]]
+
+    def object_of(self, name, profile_id):
+        return self.objects[name][self.row_of[profile_id]]
+
+    def profile(self, profile_id):
+        """按原来的嵌套字典格式还原一条画像"""
+        row = self.row_of[profile_id]
+        profile = {self.schema.interest_field: self.interests[row]}
+        for group, fields in self.schema.numeric.items():
+            if group in self.objects:
+                continue
+            values = {}
+            for field in fields:
+                value = self.columns[field][row]
+                if not np.isnan(value):
+                    values[field] = int(value) if self.schema.integer else value.item()
+            profile[group] = values
+        for name, values in self.objects.items():
+            profile[name] = values[row]
+        return profile
+
+
+class RowLookup:
+    """只读映射：id -> 按行保存的某个字段"""
+
+    def __init__(self, row_of, values):
+        self.row_of = row_of
+        self.values = values
+
+    def __getitem__(self, profile_id):
+        return self.values[self.row_of[profile_id]]
+
+    def __contains__(self, profile_id):
+        return profile_id in self.row_of
+
+
+class ProfileView(MutableMapping):
+    """兼容旧代码的 dict 风格视图：system.students[sid] 返回还原后的嵌套字典
+
+    赋值和删除交给 setter/remover（通常是 MatchingSystem 的 add_*/remove_*），以便同步维护索引。
+    """
+
+    def __init__(self, store, setter=None, remover=None):
+        self.store = store
+        self.setter = setter if setter is not None else store.upsert
+        self.remover = remover if remover is not None else store.remove
+
+    def __getitem__(self, profile_id):
+        if profile_id not in self.store.row_of:
+            raise KeyError(profile_id)
+        return self.store.profile(profile_id)
+
+    def __setitem__(self, profile_id, profile):
+        self.setter(profile_id, profile)
+
+    def __delitem__(self, profile_id):
+        if profile_id not in self.store.row_of:
+            raise KeyError(profile_id)
+        self.remover(profile_id)
+
+    def __iter__(self):
+        return iter(self.store.live_ids())
+
+    def __len__(self):
+        return len(self.store)
+
+    def __contains__(self, profile_id):
+        return profile_id in self.store.row_of
+
+    def __repr__(self):
+        return f"ProfileView({len(self)} profiles)"
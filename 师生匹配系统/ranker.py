@@ -0,0 +1,143 @@
+import numpy as np
+
+from schedule import FULL_WEEK, WEEK_SLOTS, availability_mask, shared_hours, to_words
+from scoring import build_incidence
+
+SKILL_FIELDS = ('math', 'english', 'programming')
+
+FEATURES = ('common', 'jaccard', 'margin_math', 'margin_english', 'margin_programming',
+            'min_margin', 'eligible', 'shared_hours')
+
+
+def _slot_words(store, rows):
+    """每行画像的每周空闲时间位图（见 schedule.availability_mask），没有 availability 字段的画像视为整周有空"""
+    if 'availability' not in store.objects:
+        return np.repeat(to_words([FULL_WEEK]), len(rows), axis=0)
+    values = store.objects['availability']
+    return to_words([availability_mask(values[row]) for row in rows.tolist()])
+
+
+def _skill_columns(student_store, mentor_store, student_rows, mentor_rows):
+    """(学生技能, 导师要求) 两个矩阵，缺失值按0处理"""
+    skills = np.nan_to_num(student_store.matrix(SKILL_FIELDS, student_rows))
+    required = np.nan_to_num(mentor_store.matrix([f'min_{field}' for field in SKILL_FIELDS], mentor_rows))
+    return skills, required
+
+
+def _assemble(common, student_sizes, mentor_sizes, margins, hours):
+    """把逐对的中间量拼成特征数组，最后一维按 FEATURES 排列"""
+    union = student_sizes + mentor_sizes - common
+    jaccard = np.divide(common, union, out=np.zeros(common.shape), where=union > 0)
+    min_margin = margins.min(axis=-1)
+    return np.concatenate([
+        common[..., None],
+        jaccard[..., None],
+        margins,
+        min_margin[..., None],
+        (min_margin >= 0)[..., None],
+        hours[..., None],
+    ], axis=-1).astype(np.float64)
+
+
+def pair_features(student_store, mentor_store, student_ids, mentor_ids):
+    """成对特征：第k行为 (student_ids[k], mentor_ids[k]) 的特征，一次向量化计算全部配对"""
+    student_rows = student_store.rows(student_ids)
+    mentor_rows = mentor_store.rows(mentor_ids)
+    n_tags = len(student_store.vocabulary)
+    students = build_incidence(student_store.codes_for(student_ids), n_tags)
+    mentors = build_incidence(mentor_store.codes_for(mentor_ids), n_tags)
+    common = np.asarray(students.multiply(mentors).sum(axis=1), dtype=np.float64).ravel()
+    student_sizes = np.diff(students.indptr).astype(np.float64)
+    mentor_sizes = np.diff(mentors.indptr).astype(np.float64)
+    skills, required = _skill_columns(student_store, mentor_store, student_rows, mentor_rows)
+    # 逐对按位与后计数，得到每周共同空闲的小时数
+    hours = np.bitwise_count(_slot_words(student_store, student_rows) &
+                             _slot_words(mentor_store, mentor_rows)).sum(axis=1)
+    return _assemble(common, student_sizes, mentor_sizes, skills - required, hours)
+
+
+def grid_features(student_store, mentor_store, student_ids, mentor_ids):
+    """学生×导师 全部配对的特征，形状为 (学生数, 导师数, 特征数)"""
+    student_rows = student_store.rows(student_ids)
+    mentor_rows = mentor_store.rows(mentor_ids)
+    n_tags = len(student_store.vocabulary)
+    students = build_incidence(student_store.codes_for(student_ids), n_tags)
+    mentors = build_incidence(mentor_store.codes_for(mentor_ids), n_tags)
+    common = (students @ mentors.T).toarray().astype(np.float64)
+    student_sizes = np.diff(students.indptr).astype(np.float64)[:, None]
+    mentor_sizes = np.diff(mentors.indptr).astype(np.float64)[None, :]
+    skills, required = _skill_columns(student_store, mentor_store, student_rows, mentor_rows)
+    hours = shared_hours(_slot_words(student_store, student_rows), _slot_words(mentor_store, mentor_rows))
+    return _assemble(common, student_sizes, mentor_sizes, skills[:, None, :] - required[None, :, :], hours)
+
+
+class LogisticRanker:
+    """带L2正则的逻辑回归（牛顿法/IRLS求解），特征先标准化
+
+    预测值为配对成功的概率；排序时只需比较线性得分 decision_function，二者单调一致。
+    """
+
+    def __init__(self, weights=None, bias=0.0, mean=None, scale=None, l2=1.0):
+        n = len(FEATURES)
+        self.weights = np.zeros(n) if weights is None else np.asarray(weights, dtype=np.float64)
+        self.bias = float(bias)
+        self.mean = np.zeros(n) if mean is None else np.asarray(mean, dtype=np.float64)
+        self.scale = np.ones(n) if scale is None else np.asarray(scale, dtype=np.float64)
+        self.l2 = l2
+
+    @classmethod
+    def prior(cls):
+        """未训练时使用的先验模型：共同兴趣越多、越满足要求越好，与规则匹配的排序方向一致"""
+        weights = np.zeros(len(FEATURES))
+        weights[FEATURES.index('common')] = 1.0
+        weights[FEATURES.index('jaccard')] = 0.5
+        weights[FEATURES.index('eligible')] = 1.0
+        # 每周共同空闲时间越多越好，整周都有空时贡献1
+        weights[FEATURES.index('shared_hours')] = 1.0 / WEEK_SLOTS
+        return cls(weights)
+
+    def fit(self, features, labels, iterations=50, tol=1e-8):
+        """用牛顿法拟合，features 形状为 (样本数, 特征数)，labels 为 0/1"""
+        X = np.asarray(features, dtype=np.float64)
+        y = np.asarray(labels, dtype=np.float64)
+        if len(np.unique(y)) < 2:
+            raise ValueError("训练数据中需要同时包含成功和失败的匹配")
+        self.mean = X.mean(axis=0)
+        self.scale = X.std(axis=0)
+        self.scale[self.scale == 0] = 1.0
+        Z = np.hstack([(X - self.mean) / self.scale, np.ones((len(X), 1))])
+        theta = np.zeros(Z.shape[1])
+        penalty = np.full(Z.shape[1], self.l2)
+        penalty[-1] = 0.0  # 截距不加正则
+        for _ in range(iterations):
+            p = 1.0 / (1.0 + np.exp(-Z @ theta))
+            gradient = Z.T @ (p - y) + penalty * theta
+            hessian = (Z * (p * (1 - p))[:, None]).T @ Z + np.diag(penalty)
+            step = np.linalg.solve(hessian, gradient)
+            theta -= step
+            if np.abs(step).max() < tol:
+                break
+        self.weights = theta[:-1]
+        self.bias = float(theta[-1])
+        return self
+
+    def decision_function(self, features):
+        """线性得分，features 的最后一维为特征"""
+        return ((np.asarray(features) - self.mean) / self.scale) @ self.weights + self.bias
+
+    def predict_proba(self, features):
+        """配对成功的概率"""
+        return 1.0 / (1.0 + np.exp(-self.decision_function(features)))
+
+    def save(self, path):
+        """保存为 npz 格式（文件名按原样使用，不追加后缀）"""
+        with open(path, 'wb') as f:
+            np.savez(f, weights=self.weights, bias=self.bias, mean=self.mean, scale=self.scale,
+                     l2=self.l2, features=np.array(FEATURES))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            if tuple(data['features'].tolist()) != FEATURES:
+                raise ValueError(f"模型文件 {path} 的特征与当前版本不一致，请重新训练")
+            return cls(data['weights'], float(data['bias']), data['mean'], data['scale'], float(data['l2']))
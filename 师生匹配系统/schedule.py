@@ -0,0 +1,111 @@
+import re
+
+import numpy as np
+
+DAYS = ("周一", "周二", "周三", "周四", "周五", "周六", "周日")
+HOURS_PER_DAY = 24
+WEEK_SLOTS = len(DAYS) * HOURS_PER_DAY
+# 每周 168 个小时按位保存在 3 个 uint64 中，第 day*24+hour 位表示该小时有空
+WORDS = (WEEK_SLOTS + 63) // 64
+FULL_WEEK = (1 << WEEK_SLOTS) - 1
+
+
+def _hour(value, round_up=False):
+    """datetime.time / 'HH:MM' / 数字 -> 小时数；结束时间不足整点时向上取整"""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        hours, _, minutes = value.strip().partition(':')
+        hours, minutes = int(hours), int(minutes or 0)
+    elif isinstance(value, (int, float)):
+        hours, minutes = int(value), 0
+    else:
+        hours, minutes = value.hour, value.minute
+    return hours + (1 if round_up and minutes else 0)
+
+
+def week_mask(days, start, end):
+    """每周固定时段的位图（Python整数）：days 中的每一天从 start 到 end 的各个小时"""
+    start_hour = _hour(start)
+    end_hour = _hour(end, round_up=True)
+    if start_hour is None or end_hour is None or end_hour <= start_hour:
+        return 0
+    hours = ((1 << min(end_hour, HOURS_PER_DAY)) - 1) & ~((1 << start_hour) - 1)
+    mask = 0
+    for day in days:
+        if day in DAYS:
+            mask |= hours << (DAYS.index(day) * HOURS_PER_DAY)
+    return mask
+
+
+_SLOT = re.compile(r'(周[一二三四五六日])\s*(\d{1,2}(?::\d{2})?)\s*[-~～到至]\s*(\d{1,2}(?::\d{2})?)')
+
+
+def parse_slots(text):
+    """解析 '周二 14-17; 周四 9:00-12:00' 形式的空闲时间，返回位图；无法识别时返回 None"""
+    if text is None or not str(text).strip():
+        return None
+    found = _SLOT.findall(str(text))
+    if not found:
+        return None
+    mask = 0
+    for day, start, end in found:
+        mask |= week_mask([day], start, end)
+    return mask
+
+
+def format_slots(mask):
+    """位图 -> '周二 14-17; 周四 9-12'，用于显示"""
+    parts = []
+    for day_index, day in enumerate(DAYS):
+        hours = mask >> (day_index * HOURS_PER_DAY) & ((1 << HOURS_PER_DAY) - 1)
+        hour = 0
+        while hour < HOURS_PER_DAY:
+            if hours >> hour & 1:
+                end = hour
+                while end < HOURS_PER_DAY and hours >> end & 1:
+                    end += 1
+                parts.append(f"{day} {hour}-{end}")
+                hour = end
+            else:
+                hour += 1
+    return '; '.join(parts)
+
+
+def availability_mask(availability):
+    """画像中 availability 字段对应的空闲时间位图
+
+    填写了 weekly_slots（每周空闲时间位图）时直接使用；否则沿用原来的确认方式：
+    确认与项目时间一致视为项目活动时间内有空（项目未设置活动时间时视为整周有空），未确认视为没有空闲时间。
+    """
+    if not availability:
+        return 0
+    slots = availability.get('weekly_slots')
+    if slots is not None:
+        return int(slots)
+    if not availability.get('matches_project'):
+        return 0
+    project = week_mask(availability.get('project_days') or [], availability.get('project_start_time'),
+                        availability.get('project_end_time'))
+    return project or FULL_WEEK
+
+
+def to_words(masks):
+    """位图列表 -> (人数, WORDS) 的 uint64 数组"""
+    words = np.zeros((len(masks), WORDS), dtype=np.uint64)
+    for i, mask in enumerate(masks):
+        for w in range(WORDS):
+            words[i, w] = (mask >> (64 * w)) & 0xFFFFFFFFFFFFFFFF
+    return words
+
+
+def shared_hours(student_words, mentor_words, block_rows=4096):
+    """学生×导师 每周共同空闲的小时数：按字按位与后计数，一次处理一块学生"""
+    n_students, n_mentors = len(student_words), len(mentor_words)
+    hours = np.zeros((n_students, n_mentors), dtype=np.int16)
+    for start in range(0, n_students, block_rows):
+        stop = min(start + block_rows, n_students)
+        for w in range(WORDS):
+            common = student_words[start:stop, w][:, None] & mentor_words[:, w][None, :]
+            hours[start:stop] += np.bitwise_count(common).astype(np.int16)
+    return hours
@@ -0,0 +1,325 @@
+import numpy as np
+from scipy import sparse
+
+
+class InterestVocabulary:
+    """兴趣标签词表：每个标签只哈希一次，之后以整数编号参与计算"""
+
+    def __init__(self):
+        self.index = {}
+        self.tags = []
+
+    def __len__(self):
+        return len(self.tags)
+
+    def intern(self, tag):
+        """返回标签的整数编号，新标签追加到词表末尾"""
+        code = self.index.get(tag)
+        if code is None:
+            code = self.index[tag] = len(self.tags)
+            self.tags.append(tag)
+        return code
+
+    def encode(self, interests):
+        """把标签列表编码为去重后升序的int32数组"""
+        codes = {self.intern(tag) for tag in interests}
+        return np.array(sorted(codes), dtype=np.int32)
+
+    def lookup(self, interests):
+        """只查询已有标签的编号（不向词表添加新标签），返回升序int32数组"""
+        codes = {self.index[tag] for tag in interests if tag in self.index}
+        return np.array(sorted(codes), dtype=np.int32)
+
+    def decode(self, codes):
+        """把编号数组还原为标签列表"""
+        return [self.tags[code] for code in codes]
+
+
+
+class InterestIndex:
+    """倒排索引：兴趣标签编号 -> 拥有该标签的导师，随导师的添加增量维护"""
+
+    def __init__(self, vocabulary=None):
+        self.vocabulary = vocabulary if vocabulary is not None else InterestVocabulary()
+        self.postings = {}
+        self.mentor_codes = {}
+        # 导师首次加入的顺序，候选结果按此排序，与遍历导师字典的顺序一致
+        self.order = {}
+        self._next_order = 0
+
+    def __len__(self):
+        return len(self.mentor_codes)
+
+    def add(self, mentor_id, codes):
+        """加入（或更新）一位导师的标签编号"""
+        if mentor_id in self.mentor_codes:
+            self._unlink(mentor_id)
+        else:
+            self.order[mentor_id] = self._next_order
+            self._next_order += 1
+        self.mentor_codes[mentor_id] = codes
+        for code in codes.tolist():
+            self.postings.setdefault(code, set()).add(mentor_id)
+
+    def remove(self, mentor_id):
+        """从索引中移除一位导师"""
+        if mentor_id in self.mentor_codes:
+            self._unlink(mentor_id)
+            del self.mentor_codes[mentor_id]
+            del self.order[mentor_id]
+
+    def _unlink(self, mentor_id):
+        for code in self.mentor_codes[mentor_id].tolist():
+            posting = self.postings[code]
+            posting.discard(mentor_id)
+            if not posting:
+                del self.postings[code]
+
+    def candidates(self, codes):
+        """返回与给定标签至少有1个共同标签的 [(导师id, 共同标签数)]，按导师加入顺序排列"""
+        counts = {}
+        for code in codes.tolist():
+            for mentor_id in self.postings.get(code, ()):
+                counts[mentor_id] = counts.get(mentor_id, 0) + 1
+        order = self.order
+        return sorted(counts.items(), key=lambda item: order[item[0]])
+
+    @classmethod
+    def from_profiles(cls, mentors, field='interests', vocabulary=None):
+        """从导师画像字典一次性建立索引"""
+        index = cls(vocabulary)
+        for mentor_id, profile in mentors.items():
+            index.add(mentor_id, index.vocabulary.encode(profile.get(field, [])))
+        return index
+
+
+def common_codes(codes_a, codes_b):
+    """两个升序编号数组的共同标签编号（升序）"""
+    return np.intersect1d(codes_a, codes_b, assume_unique=True)
+
+
+def common_count(codes_a, codes_b):
+    """两个升序编号数组的共同兴趣数量"""
+    return len(common_codes(codes_a, codes_b))
+
+
+def build_incidence(codes_list, n_tags):
+    """把每个人的标签编号数组拼接为稀疏关联矩阵（行=人，列=标签，值为0/1）"""
+    lengths = [len(codes) for codes in codes_list]
+    indptr = np.zeros(len(codes_list) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=indptr[1:])
+    if codes_list:
+        indices = np.concatenate(codes_list).astype(np.int32, copy=False)
+    else:
+        indices = np.zeros(0, dtype=np.int32)
+    data = np.ones(len(indices), dtype=np.int32)
+    return sparse.csr_matrix((data, indices, indptr), shape=(len(codes_list), n_tags))
+
+
+class SkillBucketIndex:
+    """按技能分档的位图索引：每项技能、每个整数档位保存“该项技能不低于此档”的学生位图（按位打包）
+
+    查询满足某位导师全部要求的学生时，只需取出每项技能对应档位的位图做按位与，
+    每位导师的代价为 技能数×学生数/8 字节，不再逐个比较分数。
+    """
+
+    def __init__(self, skills, low, high):
+        self.n = len(skills)
+        self.low = low
+        # 最后一档高于所有学生的分数，对应的位图全为0
+        levels = np.arange(low, high + 2)
+        at_least = skills.T[:, None, :] >= levels[None, :, None]
+        self.bits = np.packbits(at_least, axis=-1)
+
+    @classmethod
+    def build(cls, skills, max_levels=128):
+        """分数全部为整数且档位不多时建立索引，否则返回 None（由调用方改用逐对比较）"""
+        skills = np.asarray(skills, dtype=np.float64)
+        if skills.size == 0 or not np.isfinite(skills).all() or (skills != np.round(skills)).any():
+            return None
+        low, high = int(skills.min()), int(skills.max())
+        if high - low + 1 > max_levels:
+            return None
+        return cls(skills, low, high)
+
+    def _levels(self, required):
+        """要求分数 -> 档位下标：整数分数满足 x >= r 等价于 x >= ceil(r)；缺失的要求视为无人满足"""
+        n_levels = self.bits.shape[1]
+        levels = np.ceil(np.asarray(required, dtype=np.float64)) - self.low
+        levels = np.where(np.isnan(levels), n_levels - 1, levels)
+        return np.clip(levels, 0, n_levels - 1).astype(np.int64)
+
+    def packed(self, required):
+        """每位导师（required 的每一行）满足要求的学生位图，形状为 (导师数, 打包后的字节数)"""
+        levels = self._levels(required)
+        skills = np.arange(self.bits.shape[0])
+        return np.bitwise_and.reduce(self.bits[skills[None, :], levels], axis=1)
+
+    def eligible(self, required):
+        """导师×学生 的布尔矩阵"""
+        return np.unpackbits(self.packed(required), axis=-1, count=self.n).astype(bool)
+
+    def students_for(self, requirement):
+        """满足单个导师要求的学生下标"""
+        return np.flatnonzero(self.eligible(np.asarray(requirement)[None, :])[0])
+
+
+def skill_eligibility(skills, required):
+    """学生×导师 的技能要求满足矩阵：分数为离散档位时走位图索引，否则做一次广播比较"""
+    skills = np.asarray(skills, dtype=np.float64)
+    required = np.asarray(required, dtype=np.float64)
+    if len(required) == 0:
+        return np.zeros((len(skills), 0), dtype=bool)
+    index = SkillBucketIndex.build(skills)
+    if index is not None:
+        return index.eligible(required).T
+    return (skills[:, None, :] >= required[None, :, :]).all(axis=2)
+
+
+class InterestScoreMatrix:
+    """共同兴趣分数矩阵：一次稀疏矩阵乘法得到全部 学生×导师 的共同兴趣数量"""
+
+    def __init__(self, student_ids, mentor_ids, student_codes, mentor_codes, n_tags):
+        self.student_ids = list(student_ids)
+        self.mentor_ids = list(mentor_ids)
+        self.student_index = {sid: i for i, sid in enumerate(self.student_ids)}
+        self.mentor_index = {mid: j for j, mid in enumerate(self.mentor_ids)}
+
+        student_matrix = build_incidence(student_codes, n_tags)
+        mentor_matrix = build_incidence(mentor_codes, n_tags)
+        # overlap[i, j] = 学生i与导师j的共同兴趣数量
+        self.overlap = (student_matrix @ mentor_matrix.T).toarray()
+
+    @classmethod
+    def from_profiles(cls, students, mentors, student_field='interests', mentor_field='interests',
+                      vocabulary=None):
+        """直接从画像字典构建，标签在临时（或传入的）词表中编号"""
+        if vocabulary is None:
+            vocabulary = InterestVocabulary()
+        student_codes = [vocabulary.encode(p.get(student_field, [])) for p in students.values()]
+        mentor_codes = [vocabulary.encode(p.get(mentor_field, [])) for p in mentors.values()]
+        return cls(students.keys(), mentors.keys(), student_codes, mentor_codes, len(vocabulary))
+
+    @property
+    def shape(self):
+        return self.overlap.shape
+
+    def score(self, student_id, mentor_id):
+        """查询单个学生与导师的共同兴趣数量"""
+        return int(self.overlap[self.student_index[student_id], self.mentor_index[mentor_id]])
+
+    def best_mentors(self):
+        """每个学生得分最高的导师（同分时取先添加的导师）"""
+        if not self.mentor_ids:
+            return {sid: None for sid in self.student_ids}
+        best = self.overlap.argmax(axis=1)
+        return {sid: self.mentor_ids[j] for sid, j in zip(self.student_ids, best.tolist())}
+
+    def nonzero_pairs(self):
+        """返回共同兴趣数大于0的 (学生下标, 导师下标) 数组，按学生、导师的添加顺序排列"""
+        return np.nonzero(self.overlap)
+
+
+class PreferenceRow:
+    """偏好表中一行的只读视图，按位置取值为 O(1)，不复制整行"""
+
+    __slots__ = ('table', 'start', 'stop')
+
+    def __init__(self, table, row):
+        self.table = table
+        self.start = int(table.indptr[row])
+        self.stop = int(table.indptr[row + 1])
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return list(self)[position]
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError(position)
+        return self.table.ids[self.table.indices[self.start + position]]
+
+    def __iter__(self):
+        ids = self.table.ids
+        return iter([ids[j] for j in self.table.indices[self.start:self.stop].tolist()])
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+class PreferenceTable:
+    """紧凑存储的偏好列表：CSR格式，indices[indptr[r]:indptr[r+1]] 为第r行按偏好排列的列下标"""
+
+    def __init__(self, indptr, indices, ids):
+        self.indptr = indptr
+        self.indices = indices
+        self.ids = ids
+
+    def __len__(self):
+        return len(self.indptr) - 1
+
+    def __getitem__(self, row):
+        return PreferenceRow(self, row)
+
+    def __iter__(self):
+        return (PreferenceRow(self, row) for row in range(len(self)))
+
+    def row_indices(self, row):
+        """第row行的列下标数组"""
+        return self.indices[self.indptr[row]:self.indptr[row + 1]]
+
+    @property
+    def nbytes(self):
+        return self.indptr.nbytes + self.indices.nbytes
+
+
+def _select_top_k(work, k):
+    """在每行中选出分数最高的k列（同分取列下标小的），返回按偏好排列的列下标矩阵"""
+    n_rows, n_cols = work.shape
+    if k >= n_cols:
+        return np.argsort(-work, axis=1, kind='stable')
+    # argpartition 只保证第k大的值就位，边界上的同分项再按列下标补齐，与完整稳定排序截断后的结果一致
+    part = np.argpartition(-work, k - 1, axis=1)[:, :k]
+    threshold = np.take_along_axis(work, part, axis=1).min(axis=1)[:, None]
+    above = work > threshold
+    tied = work == threshold
+    need = k - above.sum(axis=1, keepdims=True)
+    keep = above | (tied & (np.cumsum(tied, axis=1) <= need))
+    columns = np.nonzero(keep)[1].reshape(n_rows, k)
+    order = np.argsort(-np.take_along_axis(work, columns, axis=1), axis=1, kind='stable')
+    return np.take_along_axis(columns, order, axis=1)
+
+
+def top_k_preferences(scores, ids, k=None, mask=None, block_rows=4096):
+    """按分数降序（同分保持原顺序）为每一行生成偏好列表，只保留前k项
+
+    mask 为 False 的位置被剔除；k 为 None 时保留全部。
+    使用 argpartition 做部分选择，代价约为 O(行数×列数)，而不是完整排序的 O(行数×列数×log 列数)。
+    """
+    n_rows, n_cols = scores.shape
+    if k is None or k > n_cols:
+        k = n_cols
+    indptr = np.zeros(n_rows + 1, dtype=np.int64)
+    if k == 0 or n_rows == 0:
+        return PreferenceTable(indptr, np.zeros(0, dtype=np.int32), list(ids))
+
+    chunks = []
+    lengths = []
+    for start in range(0, n_rows, block_rows):
+        stop = min(start + block_rows, n_rows)
+        work = scores[start:stop].astype(np.float64)
+        if mask is not None:
+            work[~mask[start:stop]] = -np.inf
+        columns = _select_top_k(work, k)
+        # 被剔除的项分数为 -inf，排序后位于每行末尾
+        valid = np.isfinite(np.take_along_axis(work, columns, axis=1))
+        chunks.append(columns[valid].astype(np.int32))
+        lengths.append(valid.sum(axis=1))
+    np.cumsum(np.concatenate(lengths), out=indptr[1:])
+    return PreferenceTable(indptr, np.concatenate(chunks), list(ids))
@@ -0,0 +1,201 @@
+import os
+import re
+import unicodedata
+import zlib
+
+import numpy as np
+from scipy import sparse
+
+# 同义标签组：组内任一写法都归一为第一个标签再参与向量化，解决跨语言和缩写无法靠字符相似识别的问题
+ALIAS_GROUPS = (
+    ('人工智能', 'artificial intelligence', 'ai'),
+    ('机器学习', 'machine learning', 'ml'),
+    ('深度学习', 'deep learning', 'dl'),
+    ('强化学习', 'reinforcement learning', 'rl'),
+    ('自然语言处理', 'natural language processing', 'nlp'),
+    ('计算机视觉', 'computer vision', 'cv'),
+    ('图像处理', 'image processing'),
+    ('数据挖掘', 'data mining'),
+    ('数据科学', 'data science'),
+    ('大数据', 'big data'),
+    ('数据库', 'database', 'databases', 'db'),
+    ('推荐系统', 'recommender systems', 'recommender system', 'recommendation system'),
+    ('网络安全', 'cybersecurity', 'cyber security', '信息安全', 'information security'),
+    ('软件工程', 'software engineering'),
+    ('云计算', 'cloud computing'),
+    ('物联网', 'internet of things', 'iot'),
+    ('区块链', 'blockchain'),
+    ('机器人', 'robotics'),
+    ('嵌入式系统', 'embedded systems', 'embedded system'),
+    ('生物信息学', 'bioinformatics'),
+)
+
+_SEPARATORS = re.compile(r'[\s_\-/·]+')
+
+
+def normalize_tag(tag):
+    """统一全角/半角、大小写和分隔符，如 'Machine-Learning' -> 'machine learning'"""
+    text = unicodedata.normalize('NFKC', str(tag)).casefold()
+    return _SEPARATORS.sub(' ', text).strip()
+
+
+ALIASES = {normalize_tag(alias): group[0] for group in ALIAS_GROUPS for alias in group}
+
+
+def canonical_tag(tag):
+    """标签的归一形式：命中同义词表时取该组的第一个标签"""
+    text = normalize_tag(tag)
+    return ALIASES.get(text, text)
+
+
+class NgramEmbedder:
+    """字符 n-gram 哈希向量，完全离线；拼写相近的标签（如 'data mining' 与 'datamining'）余弦相似度高"""
+
+    def __init__(self, ngram_range=(1, 3), dim=1024):
+        self.ngram_range = ngram_range
+        self.dim = dim
+        self.signature = f"ngram:{ngram_range[0]}-{ngram_range[1]}:{dim}"
+
+    def _grams(self, text):
+        padded = f" {text} "
+        low, high = self.ngram_range
+        return [padded[i:i + n] for n in range(low, high + 1) for i in range(len(padded) - n + 1)
+                if padded[i:i + n].strip()]
+
+    def embed(self, texts):
+        """返回 (标签数, dim) 的单位向量矩阵"""
+        rows, cols, signs = [], [], []
+        for row, text in enumerate(texts):
+            for gram in self._grams(text):
+                # 使用与进程无关的稳定哈希，向量才能跨进程缓存
+                h = zlib.crc32(gram.encode('utf-8'))
+                rows.append(row)
+                cols.append(h % self.dim)
+                signs.append(1.0 if h >> 31 else -1.0)
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        np.add.at(vectors, (np.array(rows, dtype=np.int64), np.array(cols, dtype=np.int64)),
+                  np.array(signs, dtype=np.float32))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms > 0, norms, 1.0)
+
+
+class SentenceEmbedder:
+    """本地 sentence-transformers 模型（只从本地读取，不联网下载），适合语义相近但字面不同的标签"""
+
+    def __init__(self, model='paraphrase-multilingual-MiniLM-L12-v2'):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError:
+            raise ImportError("语义向量需要安装 sentence-transformers") from None
+        self.model = SentenceTransformer(model, local_files_only=True)
+        self.signature = f"sentence:{model}"
+
+    def embed(self, texts):
+        return np.asarray(self.model.encode(list(texts), normalize_embeddings=True), dtype=np.float32)
+
+
+class TagEmbeddingCache:
+    """标签向量缓存：每个归一后的标签只向量化一次，可保存为 npz 文件供下次启动直接读取
+
+    缓存文件记录向量化方法的签名，签名不一致（换了模型或参数）时整体作废重新计算。
+    """
+
+    def __init__(self, embedder=None, path=None):
+        self.embedder = embedder if embedder is not None else NgramEmbedder()
+        self.path = path
+        self.index = {}
+        self.texts = []
+        self.vectors = np.zeros((0, 0), dtype=np.float32)
+        self.embedded = 0
+        if path is not None and os.path.exists(path):
+            with np.load(path) as data:
+                if str(data['signature']) == self.embedder.signature:
+                    self.texts = data['texts'].tolist()
+                    self.vectors = data['vectors'].astype(np.float32)
+                    self.index = {text: i for i, text in enumerate(self.texts)}
+
+    def __len__(self):
+        return len(self.texts)
+
+    def vectors_for(self, tags):
+        """按顺序返回标签的向量矩阵，只有缓存中没有的标签才会调用向量化"""
+        canonical = [canonical_tag(tag) for tag in tags]
+        missing = list(dict.fromkeys(text for text in canonical if text not in self.index))
+        if missing:
+            new_vectors = self.embedder.embed(missing)
+            self.vectors = new_vectors if len(self.texts) == 0 else np.vstack([self.vectors, new_vectors])
+            for text in missing:
+                self.index[text] = len(self.texts)
+                self.texts.append(text)
+            self.embedded += len(missing)
+            self.save()
+        if not canonical:
+            return np.zeros((0, self.vectors.shape[1]), dtype=np.float32)
+        return self.vectors[[self.index[text] for text in canonical]]
+
+    def save(self):
+        if self.path is None:
+            return
+        temporary = self.path + '.tmp'
+        with open(temporary, 'wb') as f:
+            np.savez(f, signature=self.embedder.signature, texts=np.array(self.texts), vectors=self.vectors)
+        os.replace(temporary, self.path)
+
+
+def tag_similarity(row_tags, row_vectors, column_tags, column_vectors, threshold=0.75):
+    """两组标签（升序编号）之间的余弦相似度，低于阈值的置0（避免大量弱相似累加成高分）"""
+    similarity = row_vectors @ column_vectors.T
+    similarity[similarity < threshold] = 0.0
+    # 同一标签的相似度精确为1，避免浮点误差使完全相同的兴趣得分略低于1
+    _, rows, columns = np.intersect1d(row_tags, column_tags, assume_unique=True, return_indices=True)
+    similarity[rows, columns] = 1.0
+    return np.minimum(similarity, 1.0)
+
+
+def soft_overlap(student_codes, mentor_codes, vectors_of, threshold=0.75, block=1024):
+    """模糊共同兴趣矩阵：学生每个标签取与导师各标签的最大相似度后求和
+
+    vectors_of(编号数组) 返回这些标签的向量。标签完全相同的相似度为1，因此没有近似标签时结果等于精确的共同兴趣数量。
+    只对双方实际出现的标签计算相似度；导师按块处理，中间矩阵大小为 学生标签数×块内导师标签数。
+    """
+    n_students, n_mentors = len(student_codes), len(mentor_codes)
+    overlap = np.zeros((n_students, n_mentors), dtype=np.float64)
+    empty = np.zeros(0, dtype=np.int32)
+    student_flat = np.concatenate(student_codes) if student_codes else empty
+    mentor_flat = np.concatenate(mentor_codes) if mentor_codes else empty
+    if len(student_flat) == 0 or len(mentor_flat) == 0:
+        return overlap
+    student_tags, student_local = np.unique(student_flat, return_inverse=True)
+    student_vectors = np.asarray(vectors_of(student_tags), dtype=np.float32)
+
+    # 学生×标签 的稀疏 0/1 矩阵（学生侧局部编号）
+    student_indptr = np.zeros(n_students + 1, dtype=np.int64)
+    np.cumsum([len(codes) for codes in student_codes], out=student_indptr[1:])
+    incidence = sparse.csr_matrix((np.ones(len(student_local), dtype=np.float32), student_local, student_indptr),
+                                  shape=(n_students, len(student_tags)))
+
+    mentor_lengths = np.array([len(codes) for codes in mentor_codes], dtype=np.int64)
+    mentor_indptr = np.zeros(n_mentors + 1, dtype=np.int64)
+    np.cumsum(mentor_lengths, out=mentor_indptr[1:])
+    for start in range(0, n_mentors, block):
+        stop = min(start + block, n_mentors)
+        nonempty = np.flatnonzero(mentor_lengths[start:stop]) + start
+        if len(nonempty) == 0:
+            continue
+        block_tags, block_local = np.unique(mentor_flat[mentor_indptr[start]:mentor_indptr[stop]], return_inverse=True)
+        similarity = tag_similarity(student_tags, student_vectors, block_tags,
+                                    np.asarray(vectors_of(block_tags), dtype=np.float32), threshold)
+        # best[t, j] = 学生标签t与导师j各标签的最大相似度
+        best = np.maximum.reduceat(similarity[:, block_local], mentor_indptr[nonempty] - mentor_indptr[start], axis=1)
+        overlap[:, nonempty] = incidence @ best
+    return overlap
+
+
+def similar_pairs(student_tags, mentor_tags, cache, threshold=0.75):
+    """双方标签中相似度不低于阈值的 [(学生标签, 导师标签)]，用于在结果中说明匹配依据"""
+    if not student_tags or not mentor_tags:
+        return []
+    vectors = cache.vectors_for(list(student_tags) + list(mentor_tags))
+    similarity = vectors[:len(student_tags)] @ vectors[len(student_tags):].T
+    rows, cols = np.nonzero(similarity >= threshold)
+    return [(student_tags[i], mentor_tags[j]) for i, j in zip(rows.tolist(), cols.tolist())]
@@ -0,0 +1,335 @@
+import heapq
+from collections import deque
+from itertools import chain
+
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+
+class SparseRank(dict):
+    """短偏好列表的名次字典：rank[i] 为编号i的名次，不在列表中的编号返回 size（与名次数组的约定一致）"""
+
+    __slots__ = ('size',)
+
+    def __missing__(self, key):
+        return self.size
+
+
+def positional(index):
+    """编号字典的键是否恰好依次为 0..n-1（如 batch 中按下标求解），此时编号无需逐个查字典"""
+    return all(type(key) is int and key == i for i, key in enumerate(index))
+
+
+def build_rank_array(prefs, index, size, by_position=False):
+    """把偏好列表转换为名次查询：rank[i] 为编号i在列表中的名次，不在列表中的为 size
+
+    列表长度不到 size 的 1/16 时返回 SparseRank 字典，内存只与列表长度成正比；
+    否则返回长度为 size 的 int32 名次数组。by_position=True 表示 index 满足 positional(index)。
+    """
+    if len(prefs) * 16 < size:
+        rank = SparseRank()
+        rank.size = size
+        # 同一编号重复出现时以最后一次的名次为准（与 {s: i for i, s in enumerate(prefs)} 一致）
+        for position, x in enumerate(prefs):
+            i = index.get(x)
+            if i is not None:
+                rank[i] = position
+        return rank
+    codes = None
+    if by_position:
+        try:
+            codes = np.fromiter(prefs, dtype=np.int64, count=len(prefs))
+            codes[codes >= size] = -1
+        except (TypeError, ValueError):
+            codes = None
+    if codes is None:
+        try:
+            codes = np.fromiter(map(index.__getitem__, prefs), dtype=np.int64, count=len(prefs))
+        except KeyError:
+            # 列表中含有未知编号时退回逐个查询
+            codes = np.fromiter((index.get(x, -1) for x in prefs), dtype=np.int64, count=len(prefs))
+    positions = np.arange(len(prefs), dtype=np.int32)
+    valid = codes >= 0
+    rank = np.full(size, size, dtype=np.int32)
+    # 同一编号重复出现时以最后一次的名次为准
+    rank[codes[valid]] = positions[valid]
+    return rank
+
+
+def gale_shapley(students, mentors, student_prefs, mentor_prefs, metrics=None):
+    """线性时间的学生提议Gale-Shapley算法（一对一）
+
+    使用自由学生队列、每个学生的下一次提议指针和导师名次数组，
+    总工作量与提议次数成正比。空闲导师接受任何提议；偏好列表用尽的学生保持未匹配。
+    返回 {学生: 导师}，按学生首次被接受的先后排列。
+    传入 metrics（见 metrics.Metrics）时，结束后根据提议指针等状态累加提议、拒绝和挤出次数。
+    """
+    students = list(students)
+    mentors = list(mentors)
+    if not students or not mentors:
+        return {}
+
+    student_index = {s: i for i, s in enumerate(students)}
+    mentor_index = {m: j for j, m in enumerate(mentors)}
+    n_students = len(students)
+    by_position = positional(student_index)
+
+    # 名次数组按需构建：导师第一次需要比较两名学生时才转换其偏好列表
+    mentor_rank = [None] * len(mentors)
+    held = [-1] * len(mentors)
+    partner = [-1] * n_students
+    next_proposal = [0] * n_students
+    first_matched = []
+
+    prefs_of = list(student_prefs)
+    mentor_prefs = list(mentor_prefs)
+    free = deque(range(min(len(prefs_of), n_students)))
+
+    while free:
+        s = free.popleft()
+        prefs = prefs_of[s]
+        p = next_proposal[s]
+        while p < len(prefs):
+            j = mentor_index.get(prefs[p])
+            p += 1
+            if j is None:
+                continue
+            current = held[j]
+            if current < 0:
+                # 导师空闲，直接匹配
+                held[j] = s
+                partner[s] = j
+                first_matched.append(s)
+                break
+            rank = mentor_rank[j]
+            if rank is None:
+                rank = mentor_rank[j] = build_rank_array(mentor_prefs[j], student_index, n_students, by_position)
+            if rank[s] < rank[current]:
+                # 导师更喜欢新学生，原学生重新进入自由队列
+                held[j] = s
+                partner[s] = j
+                partner[current] = -1
+                free.append(current)
+                first_matched.append(s)
+                break
+        next_proposal[s] = p
+
+    if metrics:
+        # 每次提议都使指针前进一位；每次接受都记入 first_matched，接受时导师已有学生即为挤出
+        proposals = sum(next_proposal)
+        accepted = len(first_matched)
+        metrics.count('proposals', proposals)
+        metrics.count('rejections', proposals - accepted)
+        metrics.count('evictions', accepted - sum(1 for s in held if s >= 0))
+
+    matches = {}
+    for s in first_matched:
+        if partner[s] >= 0 and students[s] not in matches:
+            matches[students[s]] = mentors[partner[s]]
+    return matches
+
+
+def hospitals_residents(students, mentors, student_prefs, mentor_prefs, capacities, metrics=None):
+    """带导师容量的学生提议稳定匹配（医院/住院医师问题）
+
+    每位导师用按名次排序的最大堆保存已接收的学生，满员时与堆顶（最差者）比较，
+    替换代价为 O(log 容量)。不在导师偏好列表中的学生视为不满足导师要求，不会被接收。
+    返回 {学生: 导师}，按学生顺序排列。
+    """
+    students = list(students)
+    mentors = list(mentors)
+    if not students or not mentors:
+        return {}
+
+    student_index = {s: i for i, s in enumerate(students)}
+    mentor_index = {m: j for j, m in enumerate(mentors)}
+    n_students = len(students)
+    by_position = positional(student_index)
+    mentor_prefs = list(mentor_prefs)
+    capacities = list(capacities)
+
+    mentor_rank = [None] * len(mentors)
+    # held[j] 为导师j的最大堆，元素为 (-名次, 学生下标)，堆顶是当前最差的学生
+    held = [[] for _ in mentors]
+    partner = [-1] * n_students
+    next_proposal = [0] * n_students
+
+    prefs_of = list(student_prefs)
+    free = deque(range(min(len(prefs_of), n_students)))
+    evictions = 0
+
+    while free:
+        s = free.popleft()
+        prefs = prefs_of[s]
+        p = next_proposal[s]
+        while p < len(prefs):
+            j = mentor_index.get(prefs[p])
+            p += 1
+            if j is None or capacities[j] <= 0:
+                continue
+            rank = mentor_rank[j]
+            if rank is None:
+                rank = mentor_rank[j] = build_rank_array(mentor_prefs[j], student_index, n_students, by_position)
+            r = int(rank[s])
+            if r >= n_students:
+                continue
+            heap = held[j]
+            if len(heap) < capacities[j]:
+                # 导师还有名额，直接接收
+                heapq.heappush(heap, (-r, s))
+                partner[s] = j
+                break
+            if r < -heap[0][0]:
+                # 新学生优于最差的已接收学生，替换之
+                _, evicted = heapq.heapreplace(heap, (-r, s))
+                partner[evicted] = -1
+                partner[s] = j
+                free.append(evicted)
+                evictions += 1
+                break
+        next_proposal[s] = p
+
+    matches = {students[s]: mentors[j] for s, j in enumerate(partner) if j >= 0}
+    if metrics:
+        # 每次接受要么最终保留，要么之后被挤出
+        proposals = sum(next_proposal)
+        metrics.count('proposals', proposals)
+        metrics.count('rejections', proposals - len(matches) - evictions)
+        metrics.count('evictions', evictions)
+    return matches
+
+
+def optimal_assignment(students, mentors, scores, capacities, acceptable=None, metrics=None):
+    """总分最大的带容量分配（不保证稳定）
+
+    把每位导师按容量展开为若干名额列，在 学生×名额 的稠密矩阵上求最大权匹配
+    （scipy.optimize.linear_sum_assignment）。scores[i, j] 为学生i与导师j配对的分数，
+    acceptable 为 False 的配对不会出现在结果中。返回 {学生: 导师}，按学生顺序排列。
+    """
+    students = list(students)
+    mentors = list(mentors)
+    scores = np.asarray(scores, dtype=np.float64)
+    n_students = len(students)
+    if n_students == 0 or not mentors:
+        return {}
+    if acceptable is None:
+        acceptable = np.ones(scores.shape, dtype=bool)
+    # 不可接受的配对分数记为0：与不分配等价，求解后再剔除
+    weights = np.where(acceptable, scores, 0.0)
+    # 每位导师的名额不超过学生数，也不超过可接受的学生数
+    slots = np.minimum(np.maximum(np.asarray(capacities, dtype=np.int64), 0), acceptable.sum(axis=0))
+    slot_mentor = np.repeat(np.arange(len(mentors)), slots)
+    if len(slot_mentor) == 0:
+        return {}
+    if metrics:
+        metrics.count('assignment_cells', n_students * len(slot_mentor))
+    rows, cols = linear_sum_assignment(weights[:, slot_mentor], maximize=True)
+    assigned = slot_mentor[cols]
+    keep = acceptable[rows, assigned]
+    return {students[i]: mentors[j] for i, j in zip(rows[keep].tolist(), assigned[keep].tolist())}
+
+
+def _flatten_prefs(prefs, index, n_owners):
+    """偏好列表 -> (所属者下标, 对方下标, 名次) 三个平行数组，按所属者、名次排列；不认识的编号被丢弃"""
+    prefs = list(prefs)[:n_owners]
+    lengths = np.fromiter(map(len, prefs), dtype=np.int64, count=len(prefs))
+    total = int(lengths.sum())
+    codes = None
+    if positional(index):
+        try:
+            codes = np.fromiter(chain.from_iterable(prefs), dtype=np.int64, count=total)
+            codes[codes >= len(index)] = -1
+        except (TypeError, ValueError):
+            codes = None
+    if codes is None:
+        try:
+            codes = np.fromiter(map(index.__getitem__, chain.from_iterable(prefs)), dtype=np.int64, count=total)
+        except KeyError:
+            codes = np.fromiter((index.get(x, -1) for x in chain.from_iterable(prefs)), dtype=np.int64,
+                                count=total)
+    owners = np.repeat(np.arange(len(prefs), dtype=np.int64), lengths)
+    positions = np.arange(total, dtype=np.int64) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    valid = codes >= 0
+    return owners[valid], codes[valid], positions[valid]
+
+
+def blocking_pairs(students, mentors, student_prefs, mentor_prefs, matches, capacities=None,
+                   unlisted_acceptable=False):
+    """找出匹配结果中的全部阻塞对，返回 [(学生, 导师)]，按学生顺序、学生偏好顺序排列；为空即稳定
+
+    阻塞对指学生偏好列表中的导师 m：学生未匹配或更喜欢 m，且 m 接受该学生，
+    并且 m 未满员或更喜欢该学生而非其已接收学生中最差的一名。名次相同不构成阻塞。
+    capacities 默认每位导师一个名额（与 gale_shapley 对应）。unlisted_acceptable=True 时
+    导师也接受不在其列表中的学生、视为排在最后（gale_shapley 的空闲导师接受任何提议）；
+    默认与 hospitals_residents 一致，导师只接受列表中的学生。
+    双方偏好先展开为名次数组，全部比较都是整块的数组运算，不逐对循环。
+    """
+    students = list(students)
+    mentors = list(mentors)
+    n_students, n_mentors = len(students), len(mentors)
+    if not students or not mentors:
+        return []
+    student_index = {s: i for i, s in enumerate(students)}
+    mentor_index = {m: j for j, m in enumerate(mentors)}
+    if capacities is None:
+        capacities = np.ones(n_mentors, dtype=np.int64)
+    capacities = np.asarray(capacities, dtype=np.int64)
+
+    partner = np.full(n_students, -1, dtype=np.int64)
+    if matches:
+        rows = np.fromiter(map(student_index.__getitem__, matches.keys()), dtype=np.int64, count=len(matches))
+        partner[rows] = np.fromiter(map(mentor_index.__getitem__, matches.values()), dtype=np.int64,
+                                    count=len(matches))
+
+    # 导师的名次用 导师*学生数+学生 的有序键查找；同一学生重复出现时以最后一次为准（与 build_rank_array 一致）
+    owners, codes, positions = _flatten_prefs(mentor_prefs, student_index, n_mentors)
+    keys = owners * n_students + codes
+    order = np.argsort(keys, kind='stable')
+    keys, mentor_positions = keys[order], positions[order]
+
+    def mentor_rank(mentor, student):
+        # 不在导师列表中的学生名次记为学生数
+        rank = np.full(len(student), n_students, dtype=np.int64)
+        query = mentor * n_students + student
+        # 查询先排序再二分查找，访存连续，大规模时比乱序查找快数倍
+        order = np.argsort(query)
+        found = np.empty_like(order)
+        found[order] = np.searchsorted(keys, query[order], side='right') - 1
+        hit = found >= 0
+        hit[hit] = keys[found[hit]] == query[hit]
+        rank[hit] = mentor_positions[found[hit]]
+        return rank
+
+    # 每位导师已接收的人数和最差名次
+    matched = np.flatnonzero(partner >= 0)
+    held = np.bincount(partner[matched], minlength=n_mentors)
+    worst = np.full(n_mentors, -1, dtype=np.int64)
+    np.maximum.at(worst, partner[matched], mentor_rank(partner[matched], matched))
+
+    # 学生一侧：排在当前导师之前的导师都是候选（未匹配的学生则是整张列表）
+    owners, codes, positions = _flatten_prefs(student_prefs, mentor_index, n_students)
+    partner_position = np.full(n_students, np.iinfo(np.int64).max, dtype=np.int64)
+    current = codes == partner[owners]
+    # 反向赋值使重复出现时保留第一次的名次
+    partner_position[owners[current][::-1]] = positions[current][::-1]
+    better = positions < partner_position[owners]
+    candidate_students, candidate_mentors = owners[better], codes[better]
+
+    rank = mentor_rank(candidate_mentors, candidate_students)
+    blocking = (held[candidate_mentors] < capacities[candidate_mentors]) | (rank < worst[candidate_mentors])
+    if not unlisted_acceptable:
+        blocking &= rank < n_students
+    pair_keys = candidate_students[blocking] * n_mentors + candidate_mentors[blocking]
+    _, first = np.unique(pair_keys, return_index=True)
+    pair_keys = pair_keys[np.sort(first)]
+    return [(students[i], mentors[j])
+            for i, j in zip((pair_keys // n_mentors).tolist(), (pair_keys % n_mentors).tolist())]
+
+
+def matching_welfare(matches, scores, student_index, mentor_index):
+    """匹配的总分：所有配对的 scores[学生, 导师] 之和"""
+    if not matches:
+        return 0.0
+    rows = np.fromiter(map(student_index.__getitem__, matches.keys()), dtype=np.int64, count=len(matches))
+    cols = np.fromiter(map(mentor_index.__getitem__, matches.values()), dtype=np.int64, count=len(matches))
+    return float(np.asarray(scores)[rows, cols].sum())
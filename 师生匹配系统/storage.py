@@ -0,0 +1,178 @@
+import json
+import sqlite3
+import threading
+from datetime import date, datetime, time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS projects (
+    name TEXT PRIMARY KEY,
+    info TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS students (
+    id TEXT PRIMARY KEY,
+    project TEXT NOT NULL,
+    profile TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS mentors (
+    id TEXT PRIMARY KEY,
+    project TEXT NOT NULL,
+    profile TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS match_history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id INTEGER NOT NULL,
+    project TEXT NOT NULL,
+    student_id TEXT NOT NULL,
+    mentor_id TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_students_project ON students(project);
+CREATE INDEX IF NOT EXISTS idx_mentors_project ON mentors(project);
+CREATE INDEX IF NOT EXISTS idx_history_project ON match_history(project, run_id);
+CREATE INDEX IF NOT EXISTS idx_history_student ON match_history(student_id);
+"""
+
+# 画像和项目信息中的日期/时间对象在 JSON 中带类型标记保存，读取时还原
+_TEMPORAL_TYPES = (('__datetime__', datetime), ('__date__', date), ('__time__', time))
+
+
+def _encode(value):
+    for tag, kind in _TEMPORAL_TYPES:
+        if isinstance(value, kind):
+            return {tag: value.isoformat()}
+    raise TypeError(f"无法保存的类型: {type(value).__name__}")
+
+
+def _decode(obj):
+    if len(obj) == 1:
+        for tag, kind in _TEMPORAL_TYPES:
+            if tag in obj:
+                return kind.fromisoformat(obj[tag])
+    return obj
+
+
+def dumps(value):
+    return json.dumps(value, ensure_ascii=False, default=_encode)
+
+
+def loads(text):
+    return json.loads(text, object_hook=_decode)
+
+
+def _now():
+    return datetime.now().isoformat(timespec='seconds')
+
+
+class SQLiteStorage:
+    """本地 SQLite 持久化：项目、学生、导师和历史匹配各一张表，按项目建索引
+
+    画像整体以 JSON 保存，所属项目单独成列，按项目加载时只读取该项目的行。
+    同一实例可在多个线程（Streamlit 会话）间共用，对连接的每次访问都由一把锁串行化。
+    """
+
+    def __init__(self, path='matching.db'):
+        self.path = path
+        # Streamlit 每次重跑可能在不同线程中执行，多个会话共用同一连接，访问时须持有 self.lock
+        self.lock = threading.RLock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+    def save_project(self, project_info):
+        """保存或更新项目信息"""
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT INTO projects (name, info, created_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET info = excluded.info",
+                (project_info['name'], dumps(project_info), _now())
+            )
+
+    def load_project(self, name):
+        """读取项目信息，不存在时返回 None"""
+        with self.lock:
+            row = self.connection.execute("SELECT info FROM projects WHERE name = ?", (name,)).fetchone()
+        return None if row is None else loads(row[0])
+
+    def list_projects(self):
+        """按创建时间排列的项目名称"""
+        with self.lock:
+            rows = self.connection.execute("SELECT name FROM projects ORDER BY created_at, rowid").fetchall()
+        return [name for name, in rows]
+
+    def _save_profiles(self, table, items):
+        now = _now()
+        with self.lock, self.connection:
+            self.connection.executemany(
+                f"INSERT INTO {table} (id, project, profile, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET project = excluded.project, "
+                "profile = excluded.profile, updated_at = excluded.updated_at",
+                ((profile_id, profile['other_info']['project'], dumps(profile), now)
+                 for profile_id, profile in items)
+            )
+
+    def _delete_profile(self, table, profile_id):
+        with self.lock, self.connection:
+            self.connection.execute(f"DELETE FROM {table} WHERE id = ?", (profile_id,))
+
+    def _load_profiles(self, table, project):
+        with self.lock:
+            rows = self.connection.execute(
+                f"SELECT id, profile FROM {table} WHERE project = ? ORDER BY rowid", (project,)).fetchall()
+        return [(profile_id, loads(profile)) for profile_id, profile in rows]
+
+    def save_students(self, items):
+        """批量保存学生 [(学生id, 画像)]，已存在的id覆盖更新"""
+        self._save_profiles('students', items)
+
+    def save_mentors(self, items):
+        """批量保存导师 [(导师id, 画像)]，已存在的id覆盖更新"""
+        self._save_profiles('mentors', items)
+
+    def delete_student(self, student_id):
+        self._delete_profile('students', student_id)
+
+    def delete_mentor(self, mentor_id):
+        self._delete_profile('mentors', mentor_id)
+
+    def load_students(self, project):
+        """某个项目的全部学生 [(学生id, 画像)]，按首次保存的顺序"""
+        return self._load_profiles('students', project)
+
+    def load_mentors(self, project):
+        """某个项目的全部导师 [(导师id, 画像)]，按首次保存的顺序"""
+        return self._load_profiles('mentors', project)
+
+    def record_matches(self, project, matches):
+        """记录一次匹配结果 {学生: 导师}，返回本次的批次号"""
+        with self.lock, self.connection:
+            row = self.connection.execute(
+                "SELECT COALESCE(MAX(run_id), 0) + 1 FROM match_history WHERE project = ?", (project,)).fetchone()
+            run_id = row[0]
+            now = _now()
+            self.connection.executemany(
+                "INSERT INTO match_history (run_id, project, student_id, mentor_id, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                ((run_id, project, student_id, mentor_id, now) for student_id, mentor_id in matches.items())
+            )
+        return run_id
+
+    def match_history(self, project, run_id=None):
+        """读取某个项目的匹配记录 {学生: 导师}，默认最近一次"""
+        with self.lock:
+            if run_id is None:
+                row = self.connection.execute(
+                    "SELECT MAX(run_id) FROM match_history WHERE project = ?", (project,)).fetchone()
+                run_id = row[0]
+                if run_id is None:
+                    return {}
+            rows = self.connection.execute(
+                "SELECT student_id, mentor_id FROM match_history WHERE project = ? AND run_id = ? ORDER BY id",
+                (project, run_id)).fetchall()
+        return dict(rows)
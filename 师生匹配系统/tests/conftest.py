@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 模块都在上一级目录中，按平铺方式导入
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
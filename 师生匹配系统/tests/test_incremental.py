@@ -0,0 +1,156 @@
+import random
+
+import pytest
+
+import app
+from batch import solve_project
+from benchmark import SUITE_PROJECT, SyntheticData
+from incremental import IncrementalMatcher
+from solvers import hospitals_residents
+
+PROJECT = SUITE_PROJECT['name']
+
+
+def build(incremental, n_students=80, seed=3):
+    system = app.MatchingSystem(incremental=incremental)
+    students, mentors = SyntheticData(n_students, seed=seed).app(SUITE_PROJECT)
+    system.add_mentors(mentors)
+    system.add_students(students)
+    return system
+
+
+def full_match(system):
+    """不经过增量匹配器，直接由逐对矩阵求解"""
+    student_ids, mentor_ids = system.project_members(PROJECT)
+    return solve_project(*system.pair_matrices(student_ids, mentor_ids), student_ids, mentor_ids,
+                         system.mentor_capacities(mentor_ids))
+
+
+def test_match_project_uses_incremental_matcher():
+    system = build(incremental=True)
+    _, matches = system.match_project(PROJECT)
+    assert PROJECT in system.incremental
+    assert matches == full_match(system)
+
+
+def test_incremental_follows_profile_changes():
+    system = build(incremental=True)
+    system.match_project(PROJECT)
+    student_ids, _ = system.project_members(PROJECT)
+    system.remove_student(student_ids[0])
+    students, _ = SyntheticData(5, seed=9).app(SUITE_PROJECT)
+    system.add_students([(f"{sid}_new", profile) for sid, profile in students])
+    _, matches = system.match_project(PROJECT)
+    assert matches == full_match(system)
+
+
+def test_switching_similarity_rebuilds_incremental_matchers():
+    system = build(incremental=True)
+    system.match_project(PROJECT)
+    system.set_similarity('fuzzy')
+    assert system.incremental == {}
+    _, matches = system.match_project(PROJECT)
+    assert matches == full_match(system)
+
+    reference = build(incremental=False)
+    reference.set_similarity('fuzzy')
+    assert matches == reference.match_project(PROJECT)[1]
+
+
+def test_set_incremental_toggles_mode():
+    system = build(incremental=False)
+    expected = system.match_project(PROJECT)[1]
+    system.set_incremental(True)
+    assert system.match_project(PROJECT)[1] == expected
+    system.set_incremental(False)
+    assert system.incremental is None
+    assert system.current_matches(PROJECT) == {}
+
+
+def same_scores(rows, expected):
+    return len(rows) == len(expected) and all(
+        (a is None and b is None) or (a is not None and b is not None and abs(a - b) < 1e-6)
+        for row, other in zip(rows, expected) for a, b in zip(row, other))
+
+
+@pytest.mark.parametrize('similarity', ['exact', 'fuzzy'])
+def test_pair_rows_agree_with_pair_scores(similarity):
+    system = build(incremental=False, n_students=20)
+    system.set_similarity(similarity)
+    student_ids, mentor_ids = system.project_members(PROJECT)
+    rows = system.pair_rows(student_ids[:1], mentor_ids)
+    assert same_scores(rows, [system.pair_scores(student_ids[0], mentor_id) for mentor_id in mentor_ids])
+    columns = system.pair_rows(student_ids, mentor_ids[:1])
+    assert same_scores(columns, [system.pair_scores(student_id, mentor_ids[0]) for student_id in student_ids])
+
+
+@pytest.mark.parametrize('seed', range(40))
+def test_random_updates_match_full_solve(seed):
+    """随机增删学生/导师，每一步后增量结果都与完整求解完全相同（不只是稳定）"""
+    rng = random.Random(seed)
+    system = build(incremental=True, n_students=rng.randint(5, 30), seed=seed)
+    system.match_project(PROJECT)
+    extra_students, extra_mentors = SyntheticData(30, n_mentors=10, seed=1000 + seed).app(SUITE_PROJECT)
+    for step in range(12):
+        student_ids, mentor_ids = system.project_members(PROJECT)
+        operation = rng.choice(['add_student', 'add_mentor', 'update_student', 'update_mentor',
+                                'remove_student', 'remove_mentor'])
+        if operation == 'add_student':
+            student_id, profile = extra_students[step]
+            system.add_students([(f"{student_id}_new", profile)])
+        elif operation == 'add_mentor':
+            mentor_id, profile = extra_mentors[step % len(extra_mentors)]
+            system.add_mentors([(f"{mentor_id}_new{step}", profile)])
+        elif operation == 'update_student' and student_ids:
+            system.add_students([(rng.choice(student_ids), extra_students[step][1])])
+        elif operation == 'update_mentor' and mentor_ids:
+            system.add_mentors([(rng.choice(mentor_ids), extra_mentors[step % len(extra_mentors)][1])])
+        elif operation == 'remove_student' and student_ids:
+            system.remove_student(rng.choice(student_ids))
+        elif operation == 'remove_mentor' and mentor_ids:
+            system.remove_mentor(rng.choice(mentor_ids))
+        assert system.match_project(PROJECT)[1] == full_match(system), (step, operation)
+
+
+def random_scorer(rng):
+    """双方分数相互独立（网页版双方用同一分数，偏好对称，稳定匹配几乎唯一，测不出学生最优性）"""
+    scores = {}
+
+    def scorer(student_id, mentor_id):
+        if (student_id, mentor_id) not in scores:
+            scores[student_id, mentor_id] = tuple(rng.random() if rng.random() < 0.7 else None for _ in range(2))
+        return scores[student_id, mentor_id]
+    return scorer
+
+
+def reference_match(matcher):
+    students, mentors = list(matcher.students), list(matcher.mentors)
+    pairs = {(sid, mid): matcher.pair_scorer(sid, mid) for sid in students for mid in mentors}
+    student_prefs = [sorted((mid for mid in mentors if pairs[sid, mid][0] is not None),
+                            key=lambda mid: -pairs[sid, mid][0]) for sid in students]
+    mentor_prefs = [sorted((sid for sid in students if pairs[sid, mid][1] is not None),
+                           key=lambda sid: -pairs[sid, mid][1]) for mid in mentors]
+    capacities = [matcher.capacities[mid] for mid in mentors]
+    return hospitals_residents(students, mentors, student_prefs, mentor_prefs, capacities)
+
+
+@pytest.mark.parametrize('seed', range(300))
+def test_random_operations_stay_student_optimal(seed):
+    """随机加入/删除学生和导师，每一步后都与完整的学生提议稳定匹配相同"""
+    rng = random.Random(seed)
+    matcher = IncrementalMatcher(random_scorer(rng))
+    for j in range(rng.randint(1, 6)):
+        matcher.add_mentor(f"m{j}", rng.randint(1, 3))
+    for i in range(rng.randint(2, 30)):
+        matcher.add_student(f"s{i}")
+    for step in range(15):
+        operation = rng.choice(['add_student', 'add_mentor', 'remove_student', 'remove_mentor'])
+        if operation == 'add_student':
+            matcher.add_student(f"s_new{step}")
+        elif operation == 'add_mentor':
+            matcher.add_mentor(f"m_new{step}", rng.randint(1, 3))
+        elif operation == 'remove_student' and matcher.students:
+            matcher.remove_student(rng.choice(list(matcher.students)))
+        elif operation == 'remove_mentor' and matcher.mentors:
+            matcher.remove_mentor(rng.choice(list(matcher.mentors)))
+        assert matcher.matches() == reference_match(matcher), (step, operation)
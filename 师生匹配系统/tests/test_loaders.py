@@ -0,0 +1,45 @@
+import io
+
+from loaders import iter_row_chunks, validate_chunk
+
+
+def jsonl_rows(text):
+    return [row for chunk in iter_row_chunks(io.StringIO(text), 'jsonl') for row in chunk]
+
+
+def test_jsonl_non_object_lines_are_row_errors():
+    text = ('{"id": "s1", "interests": "机器学习", "math": 80, "english": 70, "programming": 90}\n'
+            '[1, 2]\n'
+            '"abc"\n'
+            '{"id": "s2", "interests": "数据挖掘", "math": 60, "english": 60, "programming": 60\n')
+    valid, invalid = validate_chunk(jsonl_rows(text), 'student')
+    assert [row_id for row_id, _ in valid] == ['s1']
+    assert [line for line, _, _ in invalid] == [2, 3, 4]
+    assert '不是 JSON 对象' in invalid[0][2]
+
+
+PROJECT_INFO = {'name': '项目', 'activity_days': ['周一'], 'weekly_start_time': None, 'weekly_end_time': None}
+
+
+def app_row(**fields):
+    row = {'id': 's1', 'interests': '机器学习', 'math': '3', 'programming': 4, 'english': 5.0}
+    row.update(fields)
+    return row
+
+
+def test_skill_scores_must_be_integers_in_range():
+    chunk = [(2, app_row()), (3, app_row(id='s2', math=3.7)), (4, app_row(id='s3', english=6)),
+             (5, app_row(id='s4', programming='0'))]
+    valid, invalid = validate_chunk(chunk, 'student', 'app', PROJECT_INFO)
+    assert valid == [('s1', valid[0][1])]
+    assert valid[0][1]['skills'] == {'math': 3, 'programming': 4, 'english': 5}
+    assert [(line, row_id) for line, row_id, _ in invalid] == [(3, 's2'), (4, 's3'), (5, 's4')]
+    assert '应为整数' in invalid[0][2]
+    assert '超出范围' in invalid[1][2] and '超出范围' in invalid[2][2]
+
+
+def test_integer_fields_reject_fractions():
+    row = {'id': 'm1', 'interests': '机器学习', 'min_math': 60, 'min_english': 60, 'min_programming': 60,
+           'max_students': 2.5}
+    valid, invalid = validate_chunk([(2, row)], 'mentor')
+    assert valid == [] and 'max_students' in invalid[0][2]
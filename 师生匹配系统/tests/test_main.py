@@ -0,0 +1,19 @@
+from main import MATCH_COLUMNS, cli
+
+
+def test_match_cli_writes_csv_to_stdout(tmp_path, capsys):
+    students = tmp_path / 'students.csv'
+    students.write_text('id,name,interests,math,english,programming\n'
+                        's1,张三,机器学习,80,70,90\n'
+                        's2,李四,数据挖掘,60,60,60\n', encoding='utf-8')
+    mentors = tmp_path / 'mentors.csv'
+    mentors.write_text('id,name,interests,min_math,min_english,min_programming,max_students\n'
+                       'm1,王老师,机器学习,60,60,60,1\n', encoding='utf-8')
+    for solver in ('stable', 'optimal', 'recommend'):
+        code = cli(['match', '--students', str(students), '--mentors', str(mentors), '--output', '-',
+                    '--solver', solver])
+        lines = capsys.readouterr().out.splitlines()
+        assert code == 0
+        assert lines[0] == ','.join(MATCH_COLUMNS)
+        assert len(lines) == 3
+        assert lines[1].startswith('s1,张三,m1,')
@@ -0,0 +1,38 @@
+from profile_store import CORE_STUDENT_SCHEMA, ProfileStore
+
+
+def student(i):
+    return {'interests': [f'方向{i % 7}', f'方向{i % 3}'], 'scores': {'math': i, 'english': 60.0, 'programming': 70.0},
+            'other_info': {'name': f'学生{i}'}}
+
+
+def test_churn_keeps_store_bounded_and_order_stable():
+    store = ProfileStore(CORE_STUDENT_SCHEMA)
+    for i in range(10):
+        store.upsert(f's{i}', student(i))
+    names = store.lookup('other_info')
+    for round_ in range(200):
+        # 批量编辑：删除最早的一条，再以新 id 加入一条
+        store.remove(store.live_ids()[0])
+        store.upsert(f'n{round_}', student(round_))
+    assert len(store) == 10
+    assert len(store.ids) < 2 * store.compact_min_dead + 10
+    assert len(store.alive) <= 2 * store.compact_min_dead + 64
+    assert store.live_ids() == [f'n{i}' for i in range(190, 200)]
+    assert [store.row_of[pid] for pid in store.live_ids()] == sorted(store.row_of.values())
+    assert store.profile('n195') == student(195)
+    assert store.column('math').tolist() == [float(i) for i in range(190, 200)]
+    # 压缩前取得的 RowLookup 仍然有效
+    assert names['n199'] == {'name': '学生199'}
+
+
+def test_compact_bumps_version():
+    store = ProfileStore(CORE_STUDENT_SCHEMA)
+    for i in range(store.compact_min_dead + 1):
+        store.upsert(f's{i}', student(i))
+    version = store.version
+    for i in range(store.compact_min_dead):
+        store.remove(f's{i}')
+    assert len(store.ids) == 1
+    assert store.version == version + store.compact_min_dead + 1
+    assert store.rows([f's{store.compact_min_dead}']).tolist() == [0]
@@ -0,0 +1,22 @@
+import numpy as np
+
+import app
+from benchmark import SUITE_PROJECT, SyntheticData
+from ranker import FEATURES, grid_features, pair_features
+
+HOURS = FEATURES.index('shared_hours')
+
+
+def test_shared_hours_feature_follows_weekly_slots():
+    system = app.MatchingSystem()
+    students, mentors = SyntheticData(60, seed=5).app(SUITE_PROJECT)
+    system.add_mentors(mentors)
+    system.add_students(students)
+    student_ids, mentor_ids = system.project_members(SUITE_PROJECT['name'])
+    expected = system.shared_hours(student_ids, mentor_ids)
+    assert len(np.unique(expected)) > 1
+
+    grid = grid_features(system.student_store, system.mentor_store, student_ids, mentor_ids)
+    np.testing.assert_array_equal(grid[..., HOURS], expected)
+    pairs = pair_features(system.student_store, system.mentor_store, student_ids, mentor_ids[:1] * len(student_ids))
+    np.testing.assert_array_equal(pairs[:, HOURS], expected[:, 0])
@@ -0,0 +1,30 @@
+import threading
+
+from storage import SQLiteStorage
+
+
+def test_shared_connection_across_threads(tmp_path):
+    """多个线程（会话）共用一个 SQLiteStorage 时，写入和读取互不干扰"""
+    storage = SQLiteStorage(str(tmp_path / 'matching.db'))
+    errors = []
+
+    def session(worker):
+        try:
+            project = f'项目{worker}'
+            storage.save_project({'name': project})
+            for run in range(20):
+                storage.save_students([(f's{worker}_{run}', {'other_info': {'project': project}})])
+                storage.record_matches(project, {f's{worker}_{run}': f'm{worker}'})
+                assert len(storage.load_students(project)) == run + 1
+                assert storage.match_history(project) == {f's{worker}_{run}': f'm{worker}'}
+                storage.list_projects()
+        except Exception as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=session, args=(worker,)) for worker in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    storage.close()
+    assert errors == []
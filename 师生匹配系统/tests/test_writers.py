@@ -0,0 +1,41 @@
+import pytest
+
+from main import MATCH_COLUMNS, MATCH_TYPES
+from writers import RowWriter
+
+pq = pytest.importorskip('pyarrow.parquet')
+
+
+def match_row(student_id, mentor_id=None):
+    matched = mentor_id is not None
+    return {
+        'student_id': student_id,
+        'student_name': f'学生{student_id}',
+        'mentor_id': mentor_id,
+        'mentor_name': f'导师{mentor_id}' if matched else None,
+        'common_count': 2 if matched else 0,
+        'common_interests': '机器学习、数据挖掘' if matched else '',
+        'meets_requirements': True if matched else None,
+        'explanation': '满足导师最低要求' if matched else '未匹配',
+    }
+
+
+def test_parquet_schema_fixed_when_first_chunk_unmatched(tmp_path):
+    target = str(tmp_path / 'matches.parquet')
+    with RowWriter(target, MATCH_COLUMNS, types=MATCH_TYPES) as writer:
+        writer.write([match_row('s1'), match_row('s2')])
+        writer.write([match_row('s3', 'm1')])
+    table = pq.read_table(target)
+    assert table.column_names == list(MATCH_COLUMNS)
+    assert str(table.schema.field('mentor_id').type) == 'string'
+    assert str(table.schema.field('common_count').type) == 'int64'
+    assert str(table.schema.field('meets_requirements').type) == 'bool'
+    assert table.to_pylist() == [match_row('s1'), match_row('s2'), match_row('s3', 'm1')]
+
+
+def test_parquet_without_rows_keeps_schema(tmp_path):
+    target = str(tmp_path / 'empty.parquet')
+    with RowWriter(target, MATCH_COLUMNS, types=MATCH_TYPES):
+        pass
+    schema = pq.read_schema(target)
+    assert str(schema.field('meets_requirements').type) == 'bool'
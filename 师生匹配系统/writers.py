@@ -0,0 +1,84 @@
+import csv
+import json
+import sys
+
+from loaders import detect_format
+
+
+class RowWriter:
+    """按块流式写出结果行（CSV / JSONL / Parquet），任意时刻只有一块数据在内存中
+
+    target 为文件路径，'-' 表示标准输出（仅支持 CSV 和 JSONL）；fmt 默认按文件名后缀判断，标准输出默认为 CSV。
+    types 为 {列名: Arrow 类型名}（如 'int64'、'bool'），未列出的列为字符串；
+    Parquet 的列类型在写出前一次确定，不随某一块数据中是否有空值而变化。
+    """
+
+    def __init__(self, target, columns, fmt=None, types=None):
+        self.columns = list(columns)
+        if fmt is None:
+            fmt = 'csv' if target == '-' else detect_format(target)
+        self.fmt = fmt
+        self.rows_written = 0
+        self._parquet = None
+        if self.fmt == 'parquet':
+            if target == '-':
+                raise ValueError("Parquet 格式不能写到标准输出")
+            try:
+                import pyarrow
+                import pyarrow.parquet
+            except ImportError:
+                raise ImportError("写出 Parquet 文件需要安装 pyarrow") from None
+            self._pa = pyarrow
+            self._pq = pyarrow.parquet
+            types = types or {}
+            self._schema = pyarrow.schema([(column, pyarrow.type_for_alias(types.get(column, 'string')))
+                                           for column in self.columns])
+            self.target = target
+            self._stream = None
+            return
+        if self.fmt not in ('csv', 'jsonl'):
+            raise ValueError(f"不支持的格式: {self.fmt}")
+        if target == '-':
+            self._stream, self._owned = sys.stdout, False
+        else:
+            # CSV 带 BOM，便于用 Excel 直接打开中文内容
+            encoding = 'utf-8-sig' if self.fmt == 'csv' else 'utf-8'
+            self._stream, self._owned = open(target, 'w', encoding=encoding, newline=''), True
+        if self.fmt == 'csv':
+            self._csv = csv.DictWriter(self._stream, self.columns)
+            self._csv.writeheader()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write(self, rows):
+        """写出一块结果行（字典列表，键为 columns）"""
+        if not rows:
+            return
+        if self.fmt == 'csv':
+            self._csv.writerows(rows)
+        elif self.fmt == 'jsonl':
+            self._stream.writelines(json.dumps({c: row.get(c) for c in self.columns}, ensure_ascii=False) + '\n'
+                                    for row in rows)
+        else:
+            self._write_parquet(rows)
+        self.rows_written += len(rows)
+
+    def _write_parquet(self, rows):
+        if self._parquet is None:
+            self._parquet = self._pq.ParquetWriter(self.target, self._schema)
+        self._parquet.write_table(self._pa.Table.from_pylist(rows, schema=self._schema))
+
+    def close(self):
+        if self.fmt == 'parquet':
+            if self._parquet is None:
+                # 没有任何结果时也写出一个只有表头的文件
+                self._parquet = self._pq.ParquetWriter(self.target, self._schema)
+            self._parquet.close()
+        elif self._owned:
+            self._stream.close()
+        else:
+            self._stream.flush()